@@ -5,13 +5,58 @@ Created on Sep 18, 2013
 '''
 import unittest
 
+import tests.TestAggregate as TestAggregate
+import tests.TestAsync as TestAsync
+import tests.TestBench as TestBench
+import tests.TestBulkInsert as TestBulkInsert
+import tests.TestCache as TestCache
+import tests.TestCompile as TestCompile
 import tests.TestConditions as TestConditions
 import tests.TestDbSqlite3 as TestDbSqlite3
 import tests.TestDbSqlServer as TestDbSqlServer
+import tests.TestExists as TestExists
 import tests.TestFields as TestFields
+import tests.TestGroupCommit as TestGroupCommit
+import tests.TestInList as TestInList
+import tests.TestInstrument as TestInstrument
+import tests.TestJoin as TestJoin
+import tests.TestLimit as TestLimit
+import tests.TestNodes as TestNodes
+import tests.TestOptimize as TestOptimize
+import tests.TestPage as TestPage
+import tests.TestPool as TestPool
+import tests.TestPrepare as TestPrepare
+import tests.TestReturning as TestReturning
+import tests.TestStream as TestStream
+import tests.TestUnion as TestUnion
+import tests.TestUpsert as TestUpsert
 import tests.TestWhere as TestWhere 
 class Test(unittest.TestCase):
     
+    def testAggregate(self):
+        suite = TestConditions.unittest.TestLoader().loadTestsFromModule(TestAggregate)
+        unittest.TextTestRunner(verbosity=2).run(suite)
+        
+    def testAsync(self):
+        suite = TestConditions.unittest.TestLoader().loadTestsFromModule(TestAsync)
+        unittest.TextTestRunner(verbosity=2).run(suite)
+        
+    def testBench(self):
+        suite = TestConditions.unittest.TestLoader().loadTestsFromModule(TestBench)
+        unittest.TextTestRunner(verbosity=2).run(suite)
+        
+    def testBulkInsert(self):
+        suite = TestConditions.unittest.TestLoader().loadTestsFromModule(TestBulkInsert)
+        unittest.TextTestRunner(verbosity=2).run(suite)
+        
+    def testCache(self):
+        suite = TestConditions.unittest.TestLoader().loadTestsFromModule(TestCache)
+        unittest.TextTestRunner(verbosity=2).run(suite)
+        
+    def testCompile(self):
+        suite = TestConditions.unittest.TestLoader().loadTestsFromModule(TestCompile)
+        unittest.TextTestRunner(verbosity=2).run(suite)
+        
     def testConditions(self):
         suite = TestConditions.unittest.TestLoader().loadTestsFromModule(TestConditions)
         unittest.TextTestRunner(verbosity=2).run(suite)
@@ -24,10 +69,70 @@ class Test(unittest.TestCase):
         suite = TestConditions.unittest.TestLoader().loadTestsFromModule(TestDbSqlServer)
         unittest.TextTestRunner(verbosity=2).run(suite)
         
+    def testExists(self):
+        suite = TestConditions.unittest.TestLoader().loadTestsFromModule(TestExists)
+        unittest.TextTestRunner(verbosity=2).run(suite)
+        
     def testFields(self):
         suite = TestConditions.unittest.TestLoader().loadTestsFromModule(TestFields)
         unittest.TextTestRunner(verbosity=2).run(suite)
         
+    def testGroupCommit(self):
+        suite = TestConditions.unittest.TestLoader().loadTestsFromModule(TestGroupCommit)
+        unittest.TextTestRunner(verbosity=2).run(suite)
+        
+    def testInList(self):
+        suite = TestConditions.unittest.TestLoader().loadTestsFromModule(TestInList)
+        unittest.TextTestRunner(verbosity=2).run(suite)
+        
+    def testInstrument(self):
+        suite = TestConditions.unittest.TestLoader().loadTestsFromModule(TestInstrument)
+        unittest.TextTestRunner(verbosity=2).run(suite)
+        
+    def testJoin(self):
+        suite = TestConditions.unittest.TestLoader().loadTestsFromModule(TestJoin)
+        unittest.TextTestRunner(verbosity=2).run(suite)
+        
+    def testLimit(self):
+        suite = TestConditions.unittest.TestLoader().loadTestsFromModule(TestLimit)
+        unittest.TextTestRunner(verbosity=2).run(suite)
+        
+    def testNodes(self):
+        suite = TestConditions.unittest.TestLoader().loadTestsFromModule(TestNodes)
+        unittest.TextTestRunner(verbosity=2).run(suite)
+        
+    def testOptimize(self):
+        suite = TestConditions.unittest.TestLoader().loadTestsFromModule(TestOptimize)
+        unittest.TextTestRunner(verbosity=2).run(suite)
+        
+    def testPage(self):
+        suite = TestConditions.unittest.TestLoader().loadTestsFromModule(TestPage)
+        unittest.TextTestRunner(verbosity=2).run(suite)
+        
+    def testPool(self):
+        suite = TestConditions.unittest.TestLoader().loadTestsFromModule(TestPool)
+        unittest.TextTestRunner(verbosity=2).run(suite)
+        
+    def testPrepare(self):
+        suite = TestConditions.unittest.TestLoader().loadTestsFromModule(TestPrepare)
+        unittest.TextTestRunner(verbosity=2).run(suite)
+        
+    def testReturning(self):
+        suite = TestConditions.unittest.TestLoader().loadTestsFromModule(TestReturning)
+        unittest.TextTestRunner(verbosity=2).run(suite)
+        
+    def testStream(self):
+        suite = TestConditions.unittest.TestLoader().loadTestsFromModule(TestStream)
+        unittest.TextTestRunner(verbosity=2).run(suite)
+        
+    def testUnion(self):
+        suite = TestConditions.unittest.TestLoader().loadTestsFromModule(TestUnion)
+        unittest.TextTestRunner(verbosity=2).run(suite)
+        
+    def testUpsert(self):
+        suite = TestConditions.unittest.TestLoader().loadTestsFromModule(TestUpsert)
+        unittest.TextTestRunner(verbosity=2).run(suite)
+        
     def testWhere(self):
         suite = TestConditions.unittest.TestLoader().loadTestsFromModule(TestWhere)
         unittest.TextTestRunner(verbosity=2).run(suite)
@@ -4,8 +4,6 @@
 # Author: Daniel Kettle
 # Date:   July 29 2013
 #
-# TODO: Group(), Having(), Union(), Except(), Intersect()
-#
 
 '''
 From the wiki of the pyodbc project:
@@ -24,38 +22,57 @@ There are actually two or three SQL Server drivers written and distrubuted by Mi
 import sys, os
 sys.path.append(os.path.join('..'))
 
-from squall import Sql, Verbatim, Select, Condition, Field
+from squall import Sql, Verbatim, Select, Condition, Field, Insert, BulkInsert, \
+                   Update, Delete, Table, Fields
 from squallerrors import *
+from squallcompiler import StatementCache
+from squallstream import ResultStream, closing, fetchhint
+from squallpool import ConnectionPool, PooledAdapter
+from squallinstrument import InstrumentedAdapter
+from squallprepare import PreparingAdapter
+from squallcache import ResultCache, CachingAdapter
+from squalloptimize import simplify
+from squallinlist import InListPlanner, CHUNKS, TABLE, TVP
 import pyodbc
 import datetime as dt
+import functools
+import itertools
+import time
 
-class SqlAdapter(object):
+class SqlAdapter(PooledAdapter, InstrumentedAdapter, PreparingAdapter, CachingAdapter):
     '''
     API for calling odbc (sql server)
     Expects the odbc module as module parameter
+    
+    conn and cursor are the adapter's single connection, or the current
+    thread's pooled connection when connect() was given pool parameters.
     '''
 
+    dialect = 'sqlserver'
+    paramstyle = pyodbc.paramstyle
+    # Compiled sql templates keyed by query shape, see squallcompiler
+    statements = StatementCache()
+    # Sql Server caps a statement at 2100 parameters and a VALUES clause
+    # at 1000 rows; stay one parameter under the cap for the driver
+    max_variables = 2099
+    max_rows = 1000
+    # Run conditions through squalloptimize.simplify() before compiling
+    simplify = False
+    # WhereIn lists longer than inlist_params values are run in chunks, or
+    # through a temporary table (a table-valued parameter when inlist_tvp
+    # names a table type) when longer than inlist_chunks, see squallinlist
+    inlist_params = 1000
+    inlist_chunks = 10000
+    inlist_tvp = None
+    inlist_tables = itertools.count()
+    # Size in bytes and expiry in seconds of the result cache of Selects,
+    # made when the adapter is created with result_cache=True, see squallcache
+    result_cache_bytes = 64 * 1024 * 1024
+    result_cache_ttl = 60
     
     
-    
+    # Most recently created adapter, the default for transaction objects
     _instance = None
-    def __new__(self, *args, **kwargs):
-        '''
-        :Description:
-            Singleton pattern that instantiates an SqlAdapter object
-            
-        :Parameters:
-            - *args: iterable position-based parameters, received from 
-                     squallsql SqlAdapter object init.
-                     (Currently do nothing here)
-                     
-            - **kwargs: dictionary of parameters, received from 
-                        squallsql SqlAdapter object init.
-                        (Currently do nothing here)
-        '''
-        if not self._instance:
-            self._instance = super().__new__(self)
-        return self._instance
     
     def __init__(self, *args, **kwargs):
         '''
@@ -65,7 +82,16 @@ class SqlAdapter(object):
             > Parse the kwarg 'database' keyword to set the sql server 
               database, otherwise it will use 'master' by default.
         '''
+        super().__init__(*args, **kwargs)
+        self.simplify = kwargs.get('simplify', False)
+        self.inlists = InListPlanner(kwargs.get('inlist_params', self.inlist_params),
+                                     kwargs.get('inlist_chunks', self.inlist_chunks),
+                                     kwargs.get('inlist_tvp', self.inlist_tvp))
+        if kwargs.get('result_cache', False):
+            self.results = ResultCache(kwargs.get('result_cache_bytes', self.result_cache_bytes),
+                                       kwargs.get('result_cache_ttl', self.result_cache_ttl))
         self.database = kwargs.get('database', 'master') 
+        SqlAdapter._instance = self
         
     def sql_compat(self, sql, param=()):
         '''
@@ -90,6 +116,11 @@ class SqlAdapter(object):
                   INSTEAD of a username/password pair for login to connection
                 - dsn: string; (NOT IMPLEMENTED)
                 - dbq: string; microsoft access database file (NOT IMPLEMENTED)
+                - pool_max: int; if given, connections come from a ConnectionPool
+                  of at most this many connections, one leased per thread
+                - pool_min: int; connections the pool keeps open, defaults to 1
+                - pool_idle: float; seconds before idle pooled connections close
+                - pool_timeout: float; seconds to wait for a pooled connection
         '''
         #TODO: Connection checking
         
@@ -120,8 +151,22 @@ class SqlAdapter(object):
             
         # Converts array to string separated by ; characters into configuration
         conn_str = ';'.join(self.connection_str)
+        if not kwargs.get('pool_max') is None:
+            self.pool = ConnectionPool(lambda: pyodbc.connect(conn_str),
+                                       minsize=kwargs.get('pool_min', 1),
+                                       maxsize=kwargs.get('pool_max'),
+                                       idle_timeout=kwargs.get('pool_idle', 300),
+                                       timeout=kwargs.get('pool_timeout', 30))
+            return self.pool
         self.conn = pyodbc.connect(conn_str)
-        self.cursor = self.conn.cursor()
+        self.cursor = self.new_cursor(self.conn)
+    
+    def new_cursor(self, conn):
+        cursor = conn.cursor()
+        # Send executemany() parameters as one array instead of row by row
+        if hasattr(cursor, 'fast_executemany'):
+            cursor.fast_executemany = True
+        return cursor
 
 #     
     def disconnect(self):
@@ -129,8 +174,30 @@ class SqlAdapter(object):
         :Description:
             Disconnect the driver from the database.
         '''
+        if not self.pool is None:
+            self.pool.close()
+            self.pool = None
+            return
         self.conn.close()
     
+    def compile(self, sqlobject):
+        '''
+        :Description:
+            Compiles a squall object into sql with placeholders in the
+            paramstyle of the pyodbc module. Templates are reused from the
+            statement cache when an object of the same shape was compiled
+            before, so only its values need to be collected.
+            
+            When the adapter was created with simplify=True, the condition
+            is simplified first (see squalloptimize).
+            
+        :Returns:
+            - tuple; (sql string, parameters)
+        '''
+        if self.simplify:
+            sqlobject = simplify(sqlobject)
+        return self.statements.compile(sqlobject, self.paramstyle, self.dialect)
+    
     def sql(self, sql, param=()):
         '''
         :Description:
@@ -138,10 +205,122 @@ class SqlAdapter(object):
             
         :Parameters:
             - sql: string; sql statement
+            - param: tuple; values bound to the placeholders in sql
         '''
         self.cursor.execute(sql, param)
         return self.conn
     
+    def sqlmany(self, sql, params):
+        '''
+        :Description:
+            Executes the sql string once for every parameter sequence in
+            params, in a single executemany() call.
+            
+        :Parameters:
+            - sql: string; sql statement
+            - params: list; one parameter tuple per execution
+        '''
+        self.cursor.executemany(sql, params)
+        return self.conn
+    
+    def stream(self, sql, param=(), batchsize=None, event=None, onclose=None):
+        '''
+        :Description:
+            Executes the sql string on a cursor of its own and returns the
+            rows as a ResultStream that fetches them in batches.
+            
+        :Parameters:
+            - sql: string; sql statement
+            - param: tuple; values bound to the placeholders in sql
+            - batchsize: int; rows per fetchmany() call, None for adaptive
+            - event: StatementEvent; timed execution, finished by the stream
+            - onclose: method; called once the stream is closed
+            
+        :Returns:
+            - ResultStream; iterator over the rows, holds the cursor open
+              until exhausted or closed
+        '''
+        if event is None:
+            event = self.event(Verbatim(sql))
+        event.executing(sql).begin()
+        cursor = self.conn.cursor()
+        if not batchsize is None:
+            # DB-API fetch hint, drivers that prefetch read a batch at a time
+            cursor.arraysize = batchsize
+        try:
+            with event.timing('execute_time'):
+                cursor.execute(sql, param)
+        except Exception as e:
+            cursor.close()
+            event.finish(e)
+            raise
+        # A pooled connection stays checked out until the stream is done
+        return ResultStream(cursor, batchsize, closing(onclose, self.hold()), event)
+    
+    def inlisttype(self, values):
+        '''
+        :Description:
+            Column type of a temporary table for values. Strings take the
+            collation of the database rather than the one of tempdb, so the
+            comparison with the column of the query does not conflict.
+        '''
+        if all(isinstance(v, int) and not isinstance(v, bool) for v in values):
+            return 'BIGINT'
+        if all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in values):
+            return 'FLOAT'
+        if all(isinstance(v, str) for v in values):
+            size = max([len(v) for v in values] + [1])
+            return 'NVARCHAR({}) COLLATE DATABASE_DEFAULT'.format(
+                size if size <= 4000 else 'MAX')
+        if all(isinstance(v, (bytes, bytearray)) for v in values):
+            size = max([len(v) for v in values] + [1])
+            return 'VARBINARY({})'.format(size if size <= 8000 else 'MAX')
+        return 'SQL_VARIANT'
+    
+    def inlisttable(self, values):
+        '''
+        :Description:
+            A new local temporary table with a single column v for the
+            values of a WhereIn list. NULLs never match IN, so they are
+            left out.
+            
+        :Returns:
+            - tuple; (name of the table, its CREATE TABLE statement, rows
+              to insert into it)
+        '''
+        values = [v for v in dict.fromkeys(values) if not v is None]
+        table = '#squall_in_{}'.format(next(self.inlist_tables))
+        return (table, 'CREATE TABLE {} (v {})'.format(table, self.inlisttype(values)),
+                [(v,) for v in values])
+    
+    def loadinlist(self, values):
+        '''
+        :Description:
+            Loads the values of a WhereIn list into a new local temporary
+            table, see inlisttable().
+            
+        :Returns:
+            - string; name of the table
+        '''
+        table, create, rows = self.inlisttable(values)
+        self.cursor.execute(create)
+        if len(rows) > 0:
+            self.cursor.executemany('INSERT INTO {} (v) VALUES (?)'.format(table), rows)
+        return table
+    
+    def dropinlists(self, tables, conn=None):
+        '''
+        :Description:
+            Drops temporary tables made by loadinlist().
+            
+        :Parameters:
+            - conn: connection; the tables were made on, defaults to the
+              current one
+        '''
+        conn = self.conn if conn is None else conn
+        for table in tables:
+            conn.execute("IF OBJECT_ID('tempdb..{0}') IS NOT NULL DROP TABLE {0}".format(table))
+    
     def commit(self):
         '''
         Deprecated in favour of Transaction objects
@@ -177,6 +356,10 @@ class SqlAdapter(object):
                 - 
         '''
         
+        # Session settings go back to their defaults for the connection's next user
+        batchsuffix = ['COMMIT TRANSACTION;', 'SET NOCOUNT OFF;', 'SET XACT_ABORT OFF;']
+        batchabort = 'IF @@TRANCOUNT > 0 ROLLBACK TRANSACTION;\nSET NOCOUNT OFF;\nSET XACT_ABORT OFF;'
+        
         def __init__(self, *args, **kwargs):
             self.adapter = kwargs.get('adapter', SqlAdapter._instance)
             self.tname = kwargs.get("name", "Default Transaction")
@@ -196,6 +379,8 @@ class SqlAdapter(object):
                 self.tpreamble = '{}\n{}'.format(self.rollbackstring, 
                                                  self.tpreamble)
             self.output = {}
+            # Tables written to, for the adapter's result cache
+            self.written = set()
             # Tried using a generator, the generator got added
             
         def add(self, *args):
@@ -222,6 +407,7 @@ class SqlAdapter(object):
             output = self.output
             self.output = {}
             self.tobjects = []
+            self.written = set()
             return output
         
         def run(self, *args, **kwargs):
@@ -245,6 +431,19 @@ class SqlAdapter(object):
                       no return statements will be called unless embedded into the error
                       message or object. 
                     - force: either "commit" or "rollback" is acceptable.
+                    - stream: boolean; Select output is a ResultStream that fetches
+                      rows in batches as it is iterated, instead of a list
+                    - batchsize: int; rows per batch when streaming, adaptive if None
+                    - cancel: threading.Event; checked before every statement and
+                      before the commit. Once set, the transaction is rolled back
+                      and TransactionCancelledException is raised.
+                    - batch: boolean; send the whole transaction as one script in
+                      a single round trip instead of one call per statement, see
+                      scripts(). Select output is always fetched as lists, and
+                      sql objects other than Selects and writes with returning
+                      columns must not return rows.
+                    - cache: boolean; False to run the Selects without the
+                      adapter's result cache, see squallcache
                             
             :Exceptions:
                 - EmptyTransactionException: Called when *args is empty and nothing
@@ -262,33 +461,350 @@ class SqlAdapter(object):
                 - None if rollback occured and transaction failed,
                 - list if successful commit, list contains all transaction objects
             '''
-            #Handle force cases first
-            if kwargs.get('force') == 'rollback':
-                self.clear()
-                self.adapter.rollback()
-            elif kwargs.get('force') == 'commit':
-                self.adapter.commit()
+            # Pooled adapters lease this thread a connection until the end
+            with self.adapter.checkout():
+                #Handle force cases first
+                if kwargs.get('force') == 'rollback':
+                    self.clear()
+                    self.adapter.rollback()
+                elif kwargs.get('force') == 'commit':
+                    self.adapter.commit()
                 
-            if len(self.tobjects) == 0:
-                raise EmptyTransactionException('No objects to execute')
-            for tobj in self.tobjects:
-                if not isinstance(tobj, Sql):
-                    raise InvalidSquallObjectException('{} is invalid'.format(
-                        str(tobj)))
+                if len(self.tobjects) == 0:
+                    raise EmptyTransactionException('No objects to execute')
+                for tobj in self.tobjects:
+                    if not isinstance(tobj, Sql):
+                        raise InvalidSquallObjectException('{} is invalid'.format(
+                            str(tobj)))
+            
+            
+                if kwargs.get('batch', False):
+                    # One round trip, the batch commits by itself
+                    for squallobj in self.tobjects:
+                        self.written.update(self.adapter.writes(squallobj))
+                    self.__batch(kwargs.get('cancel'))
+                else:
+                    self.execute(**kwargs)
+                    cancel = kwargs.get('cancel')
+                    if not cancel is None and cancel.is_set():
+                        self.__cancel()
+                    self.adapter.commit()
+                self.adapter.invalidate(self.written)
             
+                if not kwargs.get('raise_exception') is None:
+                    raise CommitException('Committed Transaction')
+                return self.clear()
             
-            # Of Sql() in transaction queue, get output of selects, run others
+            
+        def execute(self, **kwargs):
+            '''
+            :Description:
+                Runs every statement of the transaction on the adapter, one
+                call per statement, without committing; Select results are
+                added to self.output. run() wraps this in a commit, batch
+                mode sends scripts() instead.
+                
+            :Parameters:
+                - **kwargs: dict; stream, batchsize, cancel and cache, see run()
+            '''
+            # Consecutive writes that compile to the same sql are collected
+            # and sent with one executemany() call
+            pending = None
+            cancel = kwargs.get('cancel')
+            stream = kwargs.get('stream', False)
+            cache = kwargs.get('cache', True)
             for squallobj in self.tobjects:
-                if isinstance(squallobj, Select):
-                    self.output[str(squallobj)] = self.adapter.sql_compat(str(squallobj))
+                if not cancel is None and cancel.is_set():
+                    self.__cancel()
+                self.written.update(self.adapter.writes(squallobj))
+                plan = self.adapter.inlists.plan(squallobj, stream)
+                if plan is None and isinstance(squallobj, (Insert, Update, Delete)) and \
+                   not isinstance(squallobj, BulkInsert) and squallobj.returning is None:
+                    start = time.perf_counter()
+                    sql, params = self.adapter.compile(squallobj)
+                    elapsed = time.perf_counter() - start
+                    if not pending is None and pending[0] == sql:
+                        pending[1].append(params)
+                        pending[2].add(squallobj, elapsed)
+                        continue
+                    self.__flush(pending)
+                    pending = (sql, [params], self.adapter.event(squallobj, elapsed))
+                    continue
+                self.__flush(pending)
+                pending = None
+                if isinstance(squallobj, BulkInsert):
+                    self.__bulk(squallobj)
+                    continue
+                event = self.adapter.event(squallobj)
+                statement, tables = squallobj, []
+                if not plan is None:
+                    event.inlist = plan.report()
+                    if plan.strategy == CHUNKS:
+                        self.output[str(squallobj)] = self.__chunks(plan, event)
+                        continue
+                    if plan.strategy == TVP:
+                        statement = plan.substituted(plan.parameters())
+                    else:
+                        with event.timing('execute_time'):
+                            for inlist in plan.inlists:
+                                tables.append(self.adapter.loadinlist(inlist.values))
+                        statement = plan.substituted(tables)
+                with event.timing('compile_time'):
+                    sql, params = self.adapter.compile(statement)
+                if isinstance(squallobj, Select) and stream and \
+                   not squallobj.existsflag:
+                    self.output[str(squallobj)] = self.adapter.stream(
+                        sql, params, fetchhint(squallobj, kwargs.get('batchsize')), event,
+                        functools.partial(self.adapter.dropinlists, tables,
+                                          self.adapter.conn) if tables else None)
+                    continue
+                lookup = None
+                if isinstance(squallobj, Select) and plan is None and cache:
+                    lookup = self.adapter.lookup(squallobj, sql, params, self.written)
+                try:
+                    with event.executing(sql):
+                        if not lookup is None and not lookup.rows is None:
+                            event.cached = True
+                            event.result = lookup.rows
+                        else:
+                            with event.timing('execute_time'):
+                                self.adapter.sql(sql, params)
+                        if isinstance(squallobj, Select):
+                            if not event.cached:
+                                with event.timing('fetch_time'):
+                                    event.result = self.adapter.cursor.fetchall()
+                                if not lookup is None:
+                                    lookup.store(event.result)
+                            event.rowcount = len(event.result)
+                            self.output[str(squallobj)] = squallobj.result(event.result)
+                        elif not getattr(squallobj, 'returning', None) is None:
+                            with event.timing('fetch_time'):
+                                event.result = self.adapter.cursor.fetchall()
+                            event.rowcount = len(event.result)
+                            self.output[str(squallobj)] = event.result
+                        else:
+                            event.rowcount = self.adapter.cursor.rowcount
+                finally:
+                    self.adapter.dropinlists(tables)
+            self.__flush(pending)
+            
+        def scripts(self):
+            '''
+            :Description:
+                Compiles the transaction into the parameterized scripts sent by
+                batch mode: SET NOCOUNT ON and SET XACT_ABORT ON, so only Selects
+                and writes with returning columns produce result sets and any
+                error rolls everything back, then
+                BEGIN TRANSACTION, every statement and COMMIT TRANSACTION.
+                A transaction with more parameters than the adapter's
+                max_variables is split over several scripts that share the
+                one transaction. Long WhereIn lists are sent as table-valued
+                parameters when the adapter has inlist_tvp, otherwise the
+                scripts load them into temporary tables (see inlisttable()),
+                dropped again before the commit.
+                
+                self.resultsets holds the sql object of every result set the
+                scripts produce, in order.
+                
+            :Exceptions:
+                - InvalidSqlValueException: a statement binds more parameters
+                  than max_variables, which no split of the scripts can send
+                
+            :Returns:
+                - list; (sql string, parameters) per script
+            '''
+            statements = []
+            tables = []
+            self.resultsets = []
+            for squallobj in self.tobjects:
+                returns = isinstance(squallobj, Select) or \
+                          not getattr(squallobj, 'returning', None) is None
+                if isinstance(squallobj, BulkInsert):
+                    chunks = list(squallobj.chunks(self.adapter.paramstyle,
+                                                   self.adapter.max_variables,
+                                                   self.adapter.max_rows,
+                                                   self.adapter.dialect))
+                    statements.extend(chunks)
+                    if returns:
+                        self.resultsets.extend(squallobj for c in chunks)
                 else:
-                    self.adapter.sql(str(squallobj))
-            self.adapter.commit()
+                    if returns:
+                        self.resultsets.append(squallobj)
+                    plan = self.adapter.inlists.plan(squallobj, True)
+                    if not plan is None and plan.strategy == TVP:
+                        squallobj = plan.substituted(plan.parameters())
+                    elif not plan is None and plan.strategy == TABLE:
+                        loaded = []
+                        for inlist in plan.inlists:
+                            table, create, rows = self.adapter.inlisttable(inlist.values)
+                            statements.append((create, []))
+                            if len(rows) > 0:
+                                statements.extend(BulkInsert(Table(table), Fields('v'), rows).chunks(
+                                    self.adapter.paramstyle, self.adapter.max_variables,
+                                    self.adapter.max_rows, self.adapter.dialect))
+                            loaded.append(table)
+                        tables.extend(loaded)
+                        squallobj = plan.substituted(loaded)
+                    sql, values = self.adapter.compile(squallobj)
+                    if len(values) > self.adapter.max_variables:
+                        raise InvalidSqlValueException(
+                            'A {} binds {} parameters, Sql Server takes at most {}'.format(
+                                type(squallobj).__name__, len(values),
+                                self.adapter.max_variables))
+                    statements.append((sql, values))
+            statements.extend(('DROP TABLE {}'.format(table), []) for table in tables)
+            scripts = []
+            sql = ['SET NOCOUNT ON;', 'SET XACT_ABORT ON;', 'BEGIN TRANSACTION;']
+            params = []
+            for statement, values in statements:
+                if len(params) > 0 and \
+                   len(params) + len(values) > self.adapter.max_variables:
+                    scripts.append(('\n'.join(sql), params))
+                    sql, params = [], []
+                sql.append('{};'.format(statement.rstrip().rstrip(';')))
+                params.extend(values)
+            sql.extend(self.batchsuffix)
+            scripts.append(('\n'.join(sql), params))
+            return scripts
+        
+        def __batch(self, cancel=None):
+            '''
+            :Description:
+                Sends the scripts of the transaction and walks every result
+                set with nextset(), handing them to the Selects in order.
+            '''
+            # The whole batch is one execution to the instrumentation
+            event = self.adapter.event(self.tobjects[0])
+            for squallobj in self.tobjects[1:]:
+                event.add(squallobj)
+            with event.timing('compile_time'):
+                scripts = self.scripts()
+            rowsets = []
+            conn = self.adapter.conn
+            autocommit = conn.autocommit
+            # The scripts begin and commit the transaction themselves
+            conn.autocommit = True
+            try:
+                with event.executing(scripts[0][0], len(scripts)):
+                    for sql, params in scripts:
+                        if not cancel is None and cancel.is_set():
+                            raise TransactionCancelledException(
+                                'Transaction cancelled and rolled back')
+                        cursor = self.adapter.cursor
+                        with event.timing('execute_time'):
+                            cursor.execute(sql, params)
+                        # Errors of later statements surface while walking the sets
+                        with event.timing('fetch_time'):
+                            while True:
+                                if not cursor.description is None:
+                                    rowsets.append(cursor.fetchall())
+                                if not cursor.nextset():
+                                    break
+                    event.rowcount = sum(len(rows) for rows in rowsets)
+            except Exception:
+                try:
+                    self.adapter.cursor.execute(self.batchabort)
+                except Exception:
+                    pass
+                self.clear()
+                raise
+            finally:
+                conn.autocommit = autocommit
+            # The chunks of a BulkInsert each return a set of its rows
+            outputs = {}
+            for squallobj, rows in zip(self.resultsets, rowsets):
+                outputs.setdefault(id(squallobj), (squallobj, []))[1].extend(rows)
+            for squallobj, rows in outputs.values():
+                if isinstance(squallobj, Select):
+                    rows = squallobj.result(rows)
+                self.output[str(squallobj)] = rows
             
-            if not kwargs.get('raise_exception') is None:
-                raise CommitException('Committed Transaction')
-            return self.clear()
+        def __chunks(self, plan, event):
+            '''
+            :Description:
+                Runs a Select once per chunk of its WhereIn list, see
+                squallinlist.
+                
+            :Returns:
+                - list; the rows of every chunk
+            '''
+            rows = []
+            with event.executing(executions=0):
+                chunks = plan.chunked()
+                while True:
+                    with event.timing('compile_time'):
+                        chunk = next(chunks, None)
+                        if chunk is None:
+                            break
+                        sql, params = self.adapter.compile(chunk)
+                    if event.sql is None:
+                        event.sql = sql
+                    event.executions += 1
+                    with event.timing('execute_time'):
+                        self.adapter.sql(sql, params)
+                    with event.timing('fetch_time'):
+                        rows.extend(self.adapter.cursor.fetchall())
+                    event.rowcount = len(rows)
+                event.result = rows
+            return rows
             
+        def __cancel(self):
+            self.adapter.conn.rollback()
+            self.clear()
+            raise TransactionCancelledException('Transaction cancelled and rolled back')
+            
+        def __flush(self, pending):
+            '''
+            :Description:
+                Executes a run of same-sql writes collected by run(), as one
+                executemany() call when there is more than one of them.
+            '''
+            if pending is None:
+                return
+            sql, params, event = pending
+            with event.executing(sql, len(params)):
+                with event.timing('execute_time'):
+                    if len(params) == 1:
+                        self.adapter.sql(sql, params[0])
+                    else:
+                        self.adapter.sqlmany(sql, params)
+                event.rowcount = self.adapter.cursor.rowcount
+            
+        def __bulk(self, bulkinsert):
+            '''
+            :Description:
+                Executes a BulkInsert chunk by chunk; its rows are compiled
+                lazily, so compiling and executing the chunks interleave.
+            '''
+            event = self.adapter.event(bulkinsert)
+            chunks = bulkinsert.chunks(self.adapter.paramstyle,
+                                       self.adapter.max_variables,
+                                       self.adapter.max_rows,
+                                       self.adapter.dialect)
+            rowcount = 0
+            returned = [] if not bulkinsert.returning is None else None
+            with event.executing(executions=0):
+                while True:
+                    with event.timing('compile_time'):
+                        chunk = next(chunks, None)
+                    if chunk is None:
+                        break
+                    sql, params = chunk
+                    if event.sql is None:
+                        event.sql = sql
+                    event.executions += 1
+                    with event.timing('execute_time'):
+                        self.adapter.sql(sql, params)
+                    if not returned is None:
+                        with event.timing('fetch_time'):
+                            returned.extend(self.adapter.cursor.fetchall())
+                        rowcount = len(returned)
+                    else:
+                        rowcount += self.adapter.cursor.rowcount
+                    event.rowcount = rowcount
+                if not returned is None:
+                    event.result = returned
+                    self.output[str(bulkinsert)] = returned
             
         def __repr__(self):
             ret = []
@@ -338,6 +854,9 @@ class SqlAdapter(object):
             self.key = key
             self.null = nullable
         
+        def __compile__(self, compiler):
+            return str(self)
+        
         def __repr__(self):
             null = ' NULL' if self.null == True else ' NOT NULL'
             datatype = ' {}'.format(self.datatype) if self.datatype else ''
@@ -380,6 +899,7 @@ class SqlAdapter(object):
                       be used to specify whether NULL or NOT NULL.
                       (Use with Create() objects)
             '''
+            self.rawvalue = val
             if isinstance(val, str):
                 val = """'{}'""".format(val)
             self.value = val
@@ -395,6 +915,17 @@ class SqlAdapter(object):
             typ = ' ' + self._type if True else '' 
             return '{}{}{}'.format(self.value, typ, null)
         
+        def __compile__(self, compiler):
+            # Typed or nullable values describe columns for Create() objects
+            if self._type or not self.null is None:
+                return str(self)
+            return compiler.bind(self.rawvalue)
+        
+        def __shape__(self, compiler):
+            if self._type or not self.null is None:
+                return (type(self), str(self))
+            return (type(self), compiler.bind(self.rawvalue))
+        
     class Exists(Sql):
         
         def __init__(self, exists, selector, statement, *args, Else=None):
@@ -418,4 +949,13 @@ class SqlAdapter(object):
             exists = " " if self.exists else " NOT "
             #vobj = Verbatim("""IF NOT EXISTS(SELECT * FROM sys.tables WHERE name = 't') CREATE TABLE t(x INTEGER, y INTEGER, z INTEGER, CONSTRAINT x_pk PRIMARY KEY(x))""")
             return "IF{}EXISTS({}) {}".format(exists, self.selector, self.statement)
+        
+        def __compile__(self, compiler):
+            exists = " " if self.exists else " NOT "
+            return "IF{}EXISTS({}) {}".format(exists, compiler.process(self.selector),
+                                              compiler.process(self.statement))
+        
+        def __shape__(self, compiler):
+            return (type(self), self.exists, compiler.process(self.selector),
+                    compiler.process(self.statement))
     
\ No newline at end of file
@@ -4,7 +4,7 @@
 # Author: Daniel Kettle
 # Date:   July 29 2013
 #
-# FIXME: _instance to SqlAdapter(), remove kwargs dependency on adapter keyword.
+# FIXME: remove kwargs dependency on adapter keyword.
 #        add kwargs for all parameters. table=Table(), fields=Field(), etc.
 '''
 squallsqlite3 is the Squall SqlAdapter class for sqlite3 databases
@@ -18,27 +18,65 @@ Basic Overview:
 '''
 
 import sys
-from squall import Sql, Verbatim, Select
+import concurrent.futures
+import functools
+import itertools
+import queue
+import threading
+import time
+from squall import Sql, Verbatim, Select, Insert, BulkInsert, Update, Delete
 from squallerrors import *
+from squallcompiler import StatementCache
+from squallstream import ResultStream, closing, fetchhint
+from squallpool import ConnectionPool, PooledAdapter, Lease
+from squallinstrument import InstrumentedAdapter
+from squallprepare import PreparingAdapter
+from squallcache import ResultCache, CachingAdapter
+from squalloptimize import simplify
+from squallinlist import InListPlanner, CHUNKS
 import sqlite3
 
-class SqlAdapter(object):
+class SqlAdapter(PooledAdapter, InstrumentedAdapter, PreparingAdapter, CachingAdapter):
     '''
     :Description:
         API for calling sqlite3 database
+        
+        conn and cursor are the adapter's single connection, or the current
+        thread's pooled connection when connect() was given pool parameters.
     '''
-    conn = None
-    cursor = None
+    dialect = 'sqlite3'
+    paramstyle = sqlite3.paramstyle
+    # Compiled sql templates keyed by query shape, see squallcompiler
+    statements = StatementCache()
+    # SQLITE_MAX_VARIABLE_NUMBER, 999 unless the library says otherwise
+    max_variables = 999
+    max_rows = None
+    # Run conditions through squalloptimize.simplify() before compiling
+    simplify = False
+    # WhereIn lists longer than inlist_params values are run in chunks, or
+    # through a temporary table when longer than inlist_chunks, see squallinlist
+    inlist_params = 500
+    inlist_chunks = 5000
+    inlist_tables = itertools.count()
+    # Size in bytes and expiry in seconds of the result cache of Selects,
+    # made when the adapter is created with result_cache=True, see squallcache
+    result_cache_bytes = 64 * 1024 * 1024
+    result_cache_ttl = 60
     
     # - Begin Specific SQL Definitions
     # - End Specific SQL Definitions
     
+    # Most recently created adapter, the default for transaction objects
     _instance = None
-    def __new__(self, *args, **kwargs):
-        if not self._instance:
-            self._instance = super().__new__(self)
-        return self._instance
-        
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.simplify = kwargs.get('simplify', False)
+        self.inlists = InListPlanner(kwargs.get('inlist_params', self.inlist_params),
+                                     kwargs.get('inlist_chunks', self.inlist_chunks))
+        if kwargs.get('result_cache', False):
+            self.results = ResultCache(kwargs.get('result_cache_bytes', self.result_cache_bytes),
+                                       kwargs.get('result_cache_ttl', self.result_cache_ttl))
+        SqlAdapter._instance = self
     
     def connect(self, *args, **kwargs):
         '''
@@ -49,8 +87,13 @@ class SqlAdapter(object):
                 - host: string; hostname -- in sqlite3, only localhost is applicable
                   and all other values will be ignored.
                 - database: string; location of database file
+                - pool_max: int; if given, connections come from a ConnectionPool
+                  of at most this many connections, one leased per thread
+                - pool_min: int; connections the pool keeps open, defaults to 1
+                - pool_idle: float; seconds before idle pooled connections close
+                - pool_timeout: float; seconds to wait for a pooled connection
         '''
-        if not self.conn is None:
+        if not self.conn is None or not self.pool is None:
             return self.conn
         db_host = 'localhost'
         self.db_name = kwargs.get('database', None)
@@ -59,20 +102,79 @@ class SqlAdapter(object):
                 'Did not find database name parameter with SqlAdapter init')
         if not kwargs.get('host') is None:
             db_host = kwargs.get('host', db_host)
+        if not kwargs.get('pool_max') is None:
+            # Pooled connections move between threads, one thread at a time
+            self.pool = ConnectionPool(
+                lambda: sqlite3.connect(self.db_name, check_same_thread=False),
+                minsize=kwargs.get('pool_min', 1),
+                maxsize=kwargs.get('pool_max'),
+                idle_timeout=kwargs.get('pool_idle', 300),
+                timeout=kwargs.get('pool_timeout', 30))
+            with self.checkout():
+                self.__limits()
+            return self.pool
         self.conn = sqlite3.connect(self.db_name)
         self.cursor = self.conn.cursor() # We need this cursor in the class
+        self.__limits()
         return self.conn
     
+    def __limits(self):
+        if hasattr(self.conn, 'getlimit'):
+            self.max_variables = self.conn.getlimit(sqlite3.SQLITE_LIMIT_VARIABLE_NUMBER)
+    
     def disconnect(self):
         '''
         :Description:
             Disconnect the driver from the database.
         '''
+        if not self.pool is None:
+            self.pool.close()
+            self.pool = None
+            return
         self.conn.close()
         self.conn = None
     
-    def sql(self, sqlobject):
-        self.cursor.execute(str(sqlobject))
+    def compile(self, sqlobject):
+        '''
+        :Description:
+            Compiles a squall object into sql with placeholders in the
+            paramstyle of the sqlite3 module. Templates are reused from the
+            statement cache when an object of the same shape was compiled
+            before, so only its values need to be collected.
+            
+            When the adapter was created with simplify=True, the condition
+            is simplified first (see squalloptimize).
+            
+        :Returns:
+            - tuple; (sql string, parameters)
+        '''
+        if self.simplify:
+            sqlobject = simplify(sqlobject)
+        return self.statements.compile(sqlobject, self.paramstyle, self.dialect)
+    
+    def sql(self, sql, param=()):
+        '''
+        :Description:
+            Executes the sql string
+            
+        :Parameters:
+            - sql: string; sql statement
+            - param: tuple; values bound to the placeholders in sql
+        '''
+        self.cursor.execute(str(sql), param)
+        return self.conn
+    
+    def sqlmany(self, sql, params):
+        '''
+        :Description:
+            Executes the sql string once for every parameter sequence in
+            params, in a single executemany() call.
+            
+        :Parameters:
+            - sql: string; sql statement
+            - params: list; one parameter tuple per execution
+        '''
+        self.cursor.executemany(sql, params)
         return self.conn
     
     def sql_compat(self, sql, param=()):
@@ -84,6 +186,79 @@ class SqlAdapter(object):
         self.cursor.execute(sql, param)
         return self.cursor.fetchall()
     
+    def stream(self, sql, param=(), batchsize=None, event=None, onclose=None):
+        '''
+        :Description:
+            Executes the sql string on a cursor of its own and returns the
+            rows as a ResultStream that fetches them in batches.
+            
+        :Parameters:
+            - sql: string; sql statement
+            - param: tuple; values bound to the placeholders in sql
+            - batchsize: int; rows per fetchmany() call, None for adaptive
+            - event: StatementEvent; timed execution, finished by the stream
+            - onclose: method; called once the stream is closed
+            
+        :Returns:
+            - ResultStream; iterator over the rows, holds the cursor open
+              until exhausted or closed
+        '''
+        if event is None:
+            event = self.event(Verbatim(sql))
+        event.executing(sql).begin()
+        cursor = self.conn.cursor()
+        if not batchsize is None:
+            # DB-API fetch hint, drivers that prefetch read a batch at a time
+            cursor.arraysize = batchsize
+        try:
+            with event.timing('execute_time'):
+                cursor.execute(sql, param)
+        except Exception as e:
+            cursor.close()
+            event.finish(e)
+            raise
+        # A pooled connection stays checked out until the stream is done
+        return ResultStream(cursor, batchsize, closing(onclose, self.hold()), event)
+    
+    def loadinlist(self, values):
+        '''
+        :Description:
+            Loads the values of a WhereIn list into a new temporary table
+            with a single column v. NULLs never match IN, so they are left out.
+            
+        :Returns:
+            - string; name of the table
+        '''
+        table = 'squall_in_{}'.format(next(self.inlist_tables))
+        self.cursor.execute('CREATE TEMP TABLE {} (v)'.format(table))
+        self.cursor.executemany('INSERT INTO {} (v) VALUES (?)'.format(table),
+                                ((v,) for v in dict.fromkeys(values) if not v is None))
+        return table
+    
+    def dropinlists(self, tables, conn=None):
+        '''
+        :Description:
+            Drops temporary tables made by loadinlist().
+            
+        :Parameters:
+            - conn: connection; the tables were made on, defaults to the
+              current one
+        '''
+        conn = self.conn if conn is None else conn
+        for table in tables:
+            conn.execute('DROP TABLE IF EXISTS temp.{}'.format(table))
+    
+    def groupcommit(self, **kwargs):
+        '''
+        :Description:
+            Starts a GroupCommitWriter on the adapter's database, for many
+            threads committing small transactions at once.
+            
+        :Parameters:
+            - **kwargs: dict; window and maxsize, see GroupCommitWriter
+        '''
+        return GroupCommitWriter(self, **kwargs)
+    
     def commit(self):
         '''
         Deprecated in favour of Transaction objects
@@ -126,18 +301,24 @@ class SqlAdapter(object):
                 - adapter: object; committing and rolling back statements hinges on
                   this object. Requires commit() and rollback(). Raises a 
                   MissingDatabaseAdapterException if None is supplied.
-                  Defaults to the instance of the driver class this method is 
-                  implemented in.
+                  Defaults to the most recently created instance of the driver 
+                  class this method is implemented in.
                 - precallback: method; during run() method, this will get called 
                   before commit or rollback statement.
                   TODO: list params method can use
                 - postcallback: method; during run() method, this will get called
                   after commit or rollback statement.
                   TODO: list params method can use
+                  
+            Squall objects given precallback or postcallback keywords have them
+            called before and after their own execution, with the statement
+            event of squallinstrument as keyword arguments.
         '''
         def __init__(self, *args, **kwargs):
             self.tobjects = []
             self.output = {}
+            # Tables written to, for the adapter's result cache
+            self.written = set()
             self.add(*args)
             self.adapter = kwargs.get('adapter', SqlAdapter._instance)
             if self.adapter is None:
@@ -167,6 +348,7 @@ class SqlAdapter(object):
             output = self.output
             self.output = {}
             self.tobjects = []
+            self.written = set()
             return output
             
         def run(self, *args, **kwargs):
@@ -190,6 +372,14 @@ class SqlAdapter(object):
                       no return statements will be called unless embedded into the error
                       message or object. 
                     - force: either "commit" or "rollback" is acceptable.
+                    - stream: boolean; Select output is a ResultStream that fetches
+                      rows in batches as it is iterated, instead of a list
+                    - batchsize: int; rows per batch when streaming, adaptive if None
+                    - cancel: threading.Event; checked before every statement and
+                      before the commit. Once set, the transaction is rolled back
+                      and TransactionCancelledException is raised.
+                    - cache: boolean; False to run the Selects without the
+                      adapter's result cache, see squallcache
                             
             :Exceptions:
                 - EmptyTransactionException: Called when *args is empty and nothing
@@ -207,34 +397,213 @@ class SqlAdapter(object):
                 - None if rollback occured and transaction failed,
                 - list if successful commit, list contains all transaction objects
             '''
-            #Handle force cases first
-            if kwargs.get('force') == 'rollback':
-                self.clear()
-                self.adapter.rollback()
-            elif kwargs.get('force') == 'commit':
+            # Pooled adapters lease this thread a connection until the end
+            with self.adapter.checkout():
+                #Handle force cases first
+                if kwargs.get('force') == 'rollback':
+                    self.clear()
+                    self.adapter.rollback()
+                elif kwargs.get('force') == 'commit':
+                    self.adapter.commit()
+                
+                if len(self.tobjects) == 0:
+                    raise EmptyTransactionException('No objects to execute')
+                # Ensure each object is compatible
+                for tobj in self.tobjects:
+                    if not isinstance(tobj, Sql):
+                        raise InvalidSquallObjectException('{} is invalid'.format(
+                            str(tobj)))
+                
+                self.execute(**kwargs)
+                cancel = kwargs.get('cancel')
+                if not cancel is None and cancel.is_set():
+                    self.__cancel()
                 self.adapter.commit()
+                self.adapter.invalidate(self.written)
+            
+                if not kwargs.get('raise_exception') is None:
+                    raise CommitException('Committed Transaction')
+                return self.clear()
                 
-            if len(self.tobjects) == 0:
-                raise EmptyTransactionException('No objects to execute')
-            # Ensure each object is compatible
-            for tobj in self.tobjects:
-                if not isinstance(tobj, Sql):
-                    raise InvalidSquallObjectException('{} is invalid'.format(
-                        str(tobj)))
+        def execute(self, **kwargs):
+            '''
+            :Description:
+                Runs every statement of the transaction on the adapter without
+                committing; Select results are added to self.output. run() wraps
+                this in a commit, other callers (such as a group commit writer)
+                decide themselves when to commit or roll back.
                 
+            :Parameters:
+                - **kwargs: dict; stream, batchsize, cancel and cache, see run()
+            '''
+            # Consecutive writes that compile to the same sql are collected
+            # and sent with one executemany() call
+            pending = None
+            cancel = kwargs.get('cancel')
+            stream = kwargs.get('stream', False)
+            cache = kwargs.get('cache', True)
             for squallobj in self.tobjects:
-                if isinstance(squallobj, Select):
-                    self.output[str(squallobj)] = self.adapter.sql_compat(str(squallobj))
-                else:
-                    self.adapter.sql(str(squallobj)) # This will raise a rollback exception 
-                # via sqlite3, so we don't have to check for this. Other db's will have
-                # to reimplement this.
-            self.adapter.commit()
-            
-            if not kwargs.get('raise_exception') is None:
-                raise CommitException('Committed Transaction')
-            return self.clear()
+                if not cancel is None and cancel.is_set():
+                    self.__cancel()
+                self.written.update(self.adapter.writes(squallobj))
+                plan = self.adapter.inlists.plan(squallobj, stream)
+                if plan is None and isinstance(squallobj, (Insert, Update, Delete)) and \
+                   not isinstance(squallobj, BulkInsert) and squallobj.returning is None:
+                    start = time.perf_counter()
+                    sql, params = self.adapter.compile(squallobj)
+                    elapsed = time.perf_counter() - start
+                    if not pending is None and pending[0] == sql:
+                        pending[1].append(params)
+                        pending[2].add(squallobj, elapsed)
+                        continue
+                    self.__flush(pending)
+                    pending = (sql, [params], self.adapter.event(squallobj, elapsed))
+                    continue
+                self.__flush(pending)
+                pending = None
+                if isinstance(squallobj, BulkInsert):
+                    self.__bulk(squallobj)
+                    continue
+                event = self.adapter.event(squallobj)
+                statement, tables = squallobj, []
+                if not plan is None:
+                    event.inlist = plan.report()
+                    if plan.strategy == CHUNKS:
+                        self.output[str(squallobj)] = self.__chunks(plan, event)
+                        continue
+                    with event.timing('execute_time'):
+                        for inlist in plan.inlists:
+                            tables.append(self.adapter.loadinlist(inlist.values))
+                    statement = plan.substituted(tables)
+                with event.timing('compile_time'):
+                    sql, params = self.adapter.compile(statement)
+                if isinstance(squallobj, Select) and stream and \
+                   not squallobj.existsflag:
+                    self.output[str(squallobj)] = self.adapter.stream(
+                        sql, params, fetchhint(squallobj, kwargs.get('batchsize')), event,
+                        functools.partial(self.adapter.dropinlists, tables,
+                                          self.adapter.conn) if tables else None)
+                    continue
+                lookup = None
+                if isinstance(squallobj, Select) and plan is None and cache:
+                    lookup = self.adapter.lookup(squallobj, sql, params, self.written)
+                try:
+                    with event.executing(sql):
+                        if not lookup is None and not lookup.rows is None:
+                            event.cached = True
+                            event.result = lookup.rows
+                        else:
+                            # This will raise a rollback exception via sqlite3, so we
+                            # don't have to check for this. Other db's will have to
+                            # reimplement this.
+                            with event.timing('execute_time'):
+                                self.adapter.sql(sql, params)
+                        if isinstance(squallobj, Select):
+                            if not event.cached:
+                                with event.timing('fetch_time'):
+                                    event.result = self.adapter.cursor.fetchall()
+                                if not lookup is None:
+                                    lookup.store(event.result)
+                            event.rowcount = len(event.result)
+                            self.output[str(squallobj)] = squallobj.result(event.result)
+                        elif not getattr(squallobj, 'returning', None) is None:
+                            with event.timing('fetch_time'):
+                                event.result = self.adapter.cursor.fetchall()
+                            event.rowcount = len(event.result)
+                            self.output[str(squallobj)] = event.result
+                        else:
+                            event.rowcount = self.adapter.cursor.rowcount
+                finally:
+                    self.adapter.dropinlists(tables)
+            self.__flush(pending)
                 
+        def __chunks(self, plan, event):
+            '''
+            :Description:
+                Runs a Select once per chunk of its WhereIn list, see
+                squallinlist.
+                
+            :Returns:
+                - list; the rows of every chunk
+            '''
+            rows = []
+            with event.executing(executions=0):
+                chunks = plan.chunked()
+                while True:
+                    with event.timing('compile_time'):
+                        chunk = next(chunks, None)
+                        if chunk is None:
+                            break
+                        sql, params = self.adapter.compile(chunk)
+                    if event.sql is None:
+                        event.sql = sql
+                    event.executions += 1
+                    with event.timing('execute_time'):
+                        self.adapter.sql(sql, params)
+                    with event.timing('fetch_time'):
+                        rows.extend(self.adapter.cursor.fetchall())
+                    event.rowcount = len(rows)
+                event.result = rows
+            return rows
+            
+        def __cancel(self):
+            self.adapter.conn.rollback()
+            self.clear()
+            raise TransactionCancelledException('Transaction cancelled and rolled back')
+            
+        def __flush(self, pending):
+            '''
+            :Description:
+                Executes a run of same-sql writes collected by run(), as one
+                executemany() call when there is more than one of them.
+            '''
+            if pending is None:
+                return
+            sql, params, event = pending
+            with event.executing(sql, len(params)):
+                with event.timing('execute_time'):
+                    if len(params) == 1:
+                        self.adapter.sql(sql, params[0])
+                    else:
+                        self.adapter.sqlmany(sql, params)
+                event.rowcount = self.adapter.cursor.rowcount
+            
+        def __bulk(self, bulkinsert):
+            '''
+            :Description:
+                Executes a BulkInsert chunk by chunk; its rows are compiled
+                lazily, so compiling and executing the chunks interleave.
+            '''
+            event = self.adapter.event(bulkinsert)
+            chunks = bulkinsert.chunks(self.adapter.paramstyle,
+                                       self.adapter.max_variables,
+                                       self.adapter.max_rows,
+                                       self.adapter.dialect)
+            rowcount = 0
+            returned = [] if not bulkinsert.returning is None else None
+            with event.executing(executions=0):
+                while True:
+                    with event.timing('compile_time'):
+                        chunk = next(chunks, None)
+                    if chunk is None:
+                        break
+                    sql, params = chunk
+                    if event.sql is None:
+                        event.sql = sql
+                    event.executions += 1
+                    with event.timing('execute_time'):
+                        self.adapter.sql(sql, params)
+                    if not returned is None:
+                        with event.timing('fetch_time'):
+                            returned.extend(self.adapter.cursor.fetchall())
+                        rowcount = len(returned)
+                    else:
+                        rowcount += self.adapter.cursor.rowcount
+                    event.rowcount = rowcount
+                if not returned is None:
+                    event.result = returned
+                    self.output[str(bulkinsert)] = returned
+            
         def pretend(self):
             if len(self.tobjects) == 0:
                 raise EmptyTransactionException('No objects to execute')
@@ -244,9 +613,10 @@ class SqlAdapter(object):
                         str(tobj)))
                     
             try:
-                for squallobj in self.tobjects:
-                    self.adapter.sql(str(squallobj))
-                self.adapter.rollback()
+                with self.adapter.checkout():
+                    for squallobj in self.tobjects:
+                        self.adapter.sql(*self.adapter.compile(squallobj))
+                    self.adapter.rollback()
             except Exception:
                 raise RollbackException(
                     'Exception raised: {}'.format(sys.exc_info()[0]))
@@ -255,3 +625,195 @@ class SqlAdapter(object):
         def __repr__(self):
             return '\n'.join(str(x) for x in self.tobjects)
         
+
+
+class GroupCommitWriter(object):
+    '''
+    :Description:
+        Applies transactions submitted from many threads inside one sqlite
+        transaction per batch, so a burst of small writes pays for one commit
+        (and one fsync) instead of one each.
+        
+        A background thread owns a connection of its own. It waits for a
+        transaction, keeps collecting for up to window seconds or until
+        maxsize transactions are queued, and runs the batch between
+        BEGIN IMMEDIATE and COMMIT. Every member runs inside a savepoint of
+        its own: a member that fails is rolled back to its savepoint and
+        gets its exception back, the rest of the batch still commits.
+        
+        Example:
+            writer = sqlobj.sqladapter.groupcommit(window=0.005)
+            writer.run(Insert(Table('t'), Fields('x'), [Value(1)]))
+            writer.close()
+        
+    :Parameters:
+        - adapter: SqlAdapter; connected adapter, gives the database file
+        - window: float; seconds a batch stays open after its first member
+        - maxsize: int; most transactions committed together
+    '''
+    
+    def __init__(self, adapter, window=0.002, maxsize=64):
+        if getattr(adapter, 'db_name', None) in (None, ':memory:', ''):
+            # The writer's own connection has to reach the same database
+            raise InvalidDatabaseNameException(
+                'Group commit needs an adapter connected to a database file')
+        self.adapter = adapter
+        self.window = window
+        self.maxsize = maxsize
+        self.queue = queue.Queue()
+        self.lock = threading.Lock()
+        self.closed = False
+        # Metrics
+        self.batches = 0
+        self.members = 0
+        self.failures = 0
+        self.largest = 0
+        self.thread = threading.Thread(target=self.__work, name='squall-groupcommit',
+                                       daemon=True)
+        self.thread.start()
+        
+    def submit(self, *args):
+        '''
+        :Description:
+            Queues a transaction for the next batch.
+            
+        :Parameters:
+            - *args: a transaction object of the adapter, or squall objects
+              to make one of
+              
+        :Returns:
+            - concurrent.futures.Future; resolves to the transaction's
+              output once its batch has committed, or to its exception
+        '''
+        if len(args) == 1 and isinstance(args[0], SqlAdapter.transaction):
+            trans = args[0]
+        else:
+            trans = SqlAdapter.transaction(*args, adapter=self.adapter)
+        if len(trans.tobjects) == 0:
+            raise EmptyTransactionException('No objects to execute')
+        future = concurrent.futures.Future()
+        with self.lock:
+            if self.closed:
+                raise GroupCommitClosedException('Group commit writer is closed')
+            self.queue.put((trans, future))
+        return future
+    
+    def run(self, *args, timeout=None):
+        '''
+        :Description:
+            Submits a transaction and waits for its batch to commit.
+            
+        :Returns:
+            - dict; the transaction's output
+        '''
+        return self.submit(*args).result(timeout)
+    
+    def close(self):
+        '''
+        :Description:
+            Stops accepting transactions, commits whatever is still queued
+            and closes the writer's connection.
+        '''
+        with self.lock:
+            if self.closed:
+                return
+            self.closed = True
+            self.queue.put(None)
+        self.thread.join()
+        
+    def stats(self):
+        '''
+        :Returns:
+            - dict; batches committed, transactions in them, failed members
+              and the average and largest batch size
+        '''
+        with self.lock:
+            return {'batches': self.batches,
+                    'members': self.members,
+                    'failures': self.failures,
+                    'largest': self.largest,
+                    'avg_batch': self.members / self.batches if self.batches else 0.0}
+        
+    def __work(self):
+        conn = sqlite3.connect(self.adapter.db_name, isolation_level=None,
+                               check_same_thread=False)
+        # The adapter's conn and cursor resolve to this connection in this thread
+        lease = Lease(conn, conn.cursor())
+        lease.refs += 1
+        self.adapter.threadlocal.lease = lease
+        try:
+            done = False
+            while not done:
+                item = self.queue.get()
+                if item is None:
+                    break
+                batch = [item]
+                deadline = time.monotonic() + self.window
+                while len(batch) < self.maxsize:
+                    remaining = deadline - time.monotonic()
+                    try:
+                        item = self.queue.get(timeout=remaining) if remaining > 0 \
+                               else self.queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if item is None:
+                        done = True
+                        break
+                    batch.append(item)
+                self.__commit(batch)
+        finally:
+            del self.adapter.threadlocal.lease
+            conn.close()
+            
+    def __commit(self, batch):
+        batch = [(t, f) for t, f in batch if f.set_running_or_notify_cancel()]
+        if len(batch) == 0:
+            return
+        cursor = self.adapter.cursor
+        results = []
+        written = set()
+        try:
+            cursor.execute('BEGIN IMMEDIATE')
+            for i, (trans, future) in enumerate(batch):
+                savepoint = 'squall_{}'.format(i)
+                cursor.execute('SAVEPOINT {}'.format(savepoint))
+                try:
+                    # Other members' writes are visible here before they commit
+                    trans.execute(cache=False)
+                except Exception as e:
+                    cursor.execute('ROLLBACK TO {}'.format(savepoint))
+                    trans.clear()
+                    results.append((future, None, e))
+                else:
+                    written.update(trans.written)
+                    results.append((future, trans.clear(), None))
+                cursor.execute('RELEASE {}'.format(savepoint))
+            cursor.execute('COMMIT')
+        except Exception as e:
+            # BEGIN, a savepoint or the commit itself failed (the database is
+            # locked, ...): nothing of the batch is kept and every member
+            # gets an exception, so no caller waits forever on its future
+            try:
+                cursor.execute('ROLLBACK')
+            except Exception:
+                pass
+            for trans, future in batch[len(results):]:
+                trans.clear()
+            errors = [error for future, output, error in results]
+            errors += [None] * (len(batch) - len(results))
+            results = [(future, None, error or e)
+                       for (trans, future), error in zip(batch, errors)]
+        else:
+            self.adapter.invalidate(written)
+        failed = 0
+        for future, output, error in results:
+            if error is None:
+                future.set_result(output)
+            else:
+                failed += 1
+                future.set_exception(error)
+        with self.lock:
+            self.batches += 1
+            self.members += len(results)
+            self.failures += failed
+            self.largest = max(self.largest, len(results))
@@ -0,0 +1,392 @@
+#!/usr/bin/env python
+'''
+:Description:
+    Benchmark suite for squall.
+
+    Three groups of benchmarks are run:
+        - render: str() and compile() throughput of representative trees,
+          wide Fields, deeply nested Where chains, a WhereIn with 10k ids
+          and a large Insert batch
+        - sqlite: ops/sec and p50/p99 latency of squallsqlite3 transactions
+          and prepared statements against a database file and :memory:
+        - memory: peak memory of big Selects, fetched whole and streamed, and
+          the memory held by the squall objects of a 1M-row insert workload
+
+    Results are written as JSON. Given a baseline file, every result is
+    compared against it and anything worse than the tolerance is reported
+    as a regression.
+
+    Usage:
+        python benchmarks/squallbench.py --output bench.json
+        python benchmarks/squallbench.py --baseline benchmarks/baseline.json
+        python benchmarks/squallbench.py --save-baseline benchmarks/baseline.json
+'''
+import os, sys
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'adapters'))
+
+import argparse
+import gc
+import json
+import platform
+import shutil
+import sqlite3
+import tempfile
+import time
+import tracemalloc
+import squallsql
+from squall import *
+
+# Each group sizes its work by scale, --quick divides it
+SCALE = {'full': 1.0, 'quick': 0.1}
+# Bytes per row of the insert workloads of bench_nodes before squall objects
+# had __slots__, recorded at 100k rows on python 3.11
+UNSLOTTED = {'statements': 807.06, 'values': 527.98}
+
+
+def result(value, unit, better):
+    '''
+    :Parameters:
+        - value: float; the measurement
+        - unit: string; e.g. 'ops/s', 's', 'bytes'
+        - better: string; 'higher' or 'lower'
+    '''
+    return {'value': value, 'unit': unit, 'better': better}
+
+
+def throughput(method, mintime=0.2, repeat=5):
+    '''
+    :Description:
+        Calls method in a loop for at least mintime seconds, repeat times.
+
+    :Returns:
+        - float; calls per second of the fastest repetition
+    '''
+    best = 0.0
+    for r in range(repeat):
+        calls = 0
+        start = time.perf_counter()
+        elapsed = 0.0
+        while elapsed < mintime:
+            method()
+            calls += 1
+            elapsed = time.perf_counter() - start
+        best = max(best, calls / elapsed)
+    return best
+
+
+def percentile(samples, p):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(p / 100.0 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def latency(method, count):
+    '''
+    :Description:
+        Times count calls of method one by one.
+
+    :Returns:
+        - dict; ops/sec, p50 and p99 latency results
+    '''
+    samples = []
+    for i in range(count):
+        start = time.perf_counter()
+        method(i)
+        samples.append(time.perf_counter() - start)
+    return {'ops': result(count / sum(samples), 'ops/s', 'higher'),
+            'p50': result(percentile(samples, 50), 's', 'lower'),
+            'p99': result(percentile(samples, 99), 's', 'lower')}
+
+
+def nested_where(depth):
+    where = Where('c{}'.format(depth), '=', Value(depth))
+    for i in range(depth - 1, -1, -1):
+        where = Where('c{}'.format(i), '=', Value(i), conditions=[where])
+    return where
+
+
+def trees(scale):
+    '''
+    :Returns:
+        - dict; name: squall object, the trees of the render group
+    '''
+    ids = list(range(int(10000 * scale)))
+    rows = [(i, 'name{}'.format(i), i * 0.5, None) for i in range(int(10000 * scale))]
+    return {'wide_fields': Select(Table('t'), Fields(*['c{}'.format(i) for i in range(500)])),
+            'deep_where': Select(Table('t'), Fields('x'), nested_where(100)),
+            'wherein_10k': Select(Table('t'), Fields('x'), WhereIn('x', ids)),
+            'insert_batch': BulkInsert(Table('t'), Fields('a', 'b', 'c', 'd'), rows)}
+
+
+def bench_render(scale):
+    results = {}
+    for name, tree in trees(scale).items():
+        results['render.{}.str'.format(name)] = result(
+            throughput(lambda: str(tree)), 'ops/s', 'higher')
+        results['render.{}.compile'.format(name)] = result(
+            throughput(lambda: tree.compile('qmark')), 'ops/s', 'higher')
+    return results
+
+
+def connect(database):
+    driver = squallsql.SqlAdapter(driver='squallsqlite3')
+    driver.Connect(database=database)
+    driver.Transaction(Verbatim('CREATE TABLE t(x INTEGER, y, z, PRIMARY KEY(x ASC));')).run()
+    return driver
+
+
+def bench_sqlite(scale):
+    results = {}
+    tmp = tempfile.mkdtemp(prefix='squallbench')
+    try:
+        for label, database, count in (('memory', ':memory:', int(5000 * scale)),
+                                       ('file', os.path.join(tmp, 'bench.db'),
+                                        max(int(500 * scale), 20))):
+            driver = connect(database)
+            byid = Select(Table('t'), Fields('x', 'y', 'z'),
+                          Where('x', '=', Param('x'))).prepare(driver)
+            ops = {
+                'insert': lambda i: driver.Transaction(
+                    Insert(Table('t'), Fields('x', 'y', 'z'),
+                           [Value(i), Value('y'), Value(i)])).run(),
+                'select_pk': lambda i: driver.Transaction(
+                    Select(Table('t'), Fields('x', 'y', 'z'),
+                           Where('x', '=', Value(i)))).run(),
+                'select_pk_prepared': lambda i: byid(x=i),
+                'update': lambda i: driver.Transaction(
+                    Update(Table('t'), Fields('z'), [Value(-i)],
+                           condition=Where('x', '=', Value(i)))).run(),
+                'insert_100': lambda i: driver.Transaction(*[
+                    Insert(Table('t'), Fields('x', 'y', 'z'),
+                           [Value(count + i * 100 + j), Value('y'), Value(j)])
+                    for j in range(100)]).run()}
+            for name, op in ops.items():
+                n = count if name != 'insert_100' else max(count // 10, 10)
+                for metric, value in latency(op, n).items():
+                    results['sqlite.{}.{}.{}'.format(label, name, metric)] = value
+            driver.Disconnect()
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+    return results
+
+
+def peak(method):
+    '''
+    :Returns:
+        - int; peak bytes allocated while method runs
+    '''
+    gc.collect()
+    tracemalloc.start()
+    try:
+        method()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def retained(build):
+    '''
+    :Returns:
+        - int; bytes still allocated by what build returns
+    '''
+    gc.collect()
+    # Collections triggered by millions of new objects would dominate the run
+    gc.disable()
+    tracemalloc.start()
+    try:
+        kept = build()
+        return tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+        gc.enable()
+
+
+def bench_nodes(count):
+    '''
+    :Description:
+        Memory held per row by the squall objects of an insert workload:
+        one Insert statement per row, as a transaction of single inserts
+        builds them, rows of Value objects for a BulkInsert, and frozen
+        Insert statements.
+    '''
+    table, fields = Table('t'), Fields('a', 'b', 'c')
+    statements = retained(lambda: [Insert(table, fields,
+                                          [Value(i), Value('name'), Value(i * 0.5)])
+                                   for i in range(count)])
+    values = retained(lambda: BulkInsert(table, fields,
+                                         [[Value(i), Value('name'), Value(i * 0.5)]
+                                          for i in range(count)]))
+    frozen = retained(lambda: [freeze(Insert(table, fields,
+                                             [Value(i), Value('name'), Value(i * 0.5)]))
+                               for i in range(count)])
+    # Per row, so quick and full runs can be compared
+    results = {'memory.insert_rows.statements': result(statements / count, 'bytes/row', 'lower'),
+               'memory.insert_rows.values': result(values / count, 'bytes/row', 'lower'),
+               'memory.insert_rows.frozen': result(frozen / count, 'bytes/row', 'lower')}
+    for name, before in UNSLOTTED.items():
+        results['memory.insert_rows.{}'.format(name)]['unslotted'] = before
+    return results
+
+
+def bench_memory(scale):
+    # Bytes per row settle well before a million rows, tracemalloc makes those slow
+    results = bench_nodes(int(100000 * scale))
+    rows = int(100000 * scale)
+    driver = connect(':memory:')
+    driver.Transaction(BulkInsert(Table('t'), Fields('x', 'y', 'z'),
+                                  ((i, 'value{}'.format(i), i * 0.5)
+                                   for i in range(rows)))).run()
+    query = Select(Table('t'), Fields('x', 'y', 'z'))
+
+    def fetchall():
+        return len(driver.Transaction(query).run()[str(query)])
+
+    def stream():
+        count = 0
+        for row in driver.Transaction(query).run(stream=True)[str(query)]:
+            count += 1
+        return count
+
+    results['memory.select_{}.fetchall'.format(rows)] = result(peak(fetchall), 'bytes', 'lower')
+    results['memory.select_{}.stream'.format(rows)] = result(peak(stream), 'bytes', 'lower')
+    driver.Disconnect()
+    return results
+
+
+GROUPS = {'render': bench_render,
+          'sqlite': bench_sqlite,
+          'memory': bench_memory}
+
+
+def run(groups=None, scale='full'):
+    '''
+    :Parameters:
+        - groups: list; names of GROUPS to run, all if None
+        - scale: string; 'full' or 'quick'
+
+    :Returns:
+        - dict; JSON-ready report with a 'results' entry per benchmark
+    '''
+    groups = groups or sorted(GROUPS.keys())
+    results = {}
+    for name in groups:
+        results.update(GROUPS[name](SCALE[scale]))
+    return {'meta': {'groups': groups,
+                     'python': platform.python_version(),
+                     'sqlite': sqlite3.sqlite_version,
+                     'platform': platform.platform(),
+                     'scale': scale,
+                     'time': time.strftime('%Y-%m-%dT%H:%M:%S')},
+            'results': results}
+
+
+def compare(report, baseline, tolerance=0.2):
+    '''
+    :Description:
+        Compares every result of report with the same result in baseline.
+
+    :Parameters:
+        - tolerance: float; relative change in the worse direction that is
+          still not considered a regression
+
+    :Returns:
+        - list; (name, baseline value, current value, change, status) rows,
+          status is 'ok', 'regression', 'improvement', 'new' or 'missing'
+    '''
+    rows = []
+    current, previous = report['results'], baseline['results']
+    groups = report['meta'].get('groups', GROUPS.keys())
+    for name in sorted(set(current) | set(previous)):
+        if not name.split('.')[0] in groups:
+            continue
+        if not name in previous:
+            rows.append((name, None, current[name]['value'], None, 'new'))
+            continue
+        if not name in current:
+            rows.append((name, previous[name]['value'], None, None, 'missing'))
+            continue
+        old, new = previous[name]['value'], current[name]['value']
+        change = (new - old) / old if old else 0.0
+        # Positive when the result got worse
+        worse = -change if current[name]['better'] == 'higher' else change
+        if worse > tolerance:
+            status = 'regression'
+        elif worse < -tolerance:
+            status = 'improvement'
+        else:
+            status = 'ok'
+        rows.append((name, old, new, change, status))
+    return rows
+
+
+def table(rows):
+    lines = ['{:<44} {:>14} {:>14} {:>9}  {}'.format(
+        'benchmark', 'baseline', 'current', 'change', 'status')]
+    for name, old, new, change, status in rows:
+        lines.append('{:<44} {:>14} {:>14} {:>9}  {}'.format(
+            name,
+            '-' if old is None else '{:.6g}'.format(old),
+            '-' if new is None else '{:.6g}'.format(new),
+            '-' if change is None else '{:+.1%}'.format(change),
+            status.upper() if status == 'regression' else status))
+    return '\n'.join(lines)
+
+
+def footprint(report):
+    '''
+    :Returns:
+        - list; lines comparing the bytes per row of the insert workloads
+          with the recorded figures from before __slots__ (see UNSLOTTED)
+    '''
+    lines = []
+    for name, value in sorted(report['results'].items()):
+        if 'unslotted' in value:
+            lines.append('{:<44} {:>9.1f} -> {:.1f} bytes/row before/after __slots__ ({:+.1%})'.format(
+                name, value['unslotted'], value['value'],
+                (value['value'] - value['unslotted']) / value['unslotted']))
+    return lines
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='squall benchmarks')
+    parser.add_argument('groups', nargs='*',
+                        help='groups to run: {}, all by default'.format(
+                            ', '.join(sorted(GROUPS.keys()))))
+    parser.add_argument('--quick', action='store_true', help='smaller workloads')
+    parser.add_argument('--output', help='write the JSON report to this file')
+    parser.add_argument('--baseline', help='JSON report to compare against')
+    parser.add_argument('--save-baseline', help='write the report as the new baseline')
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help='relative slowdown allowed before a regression (0.2)')
+    args = parser.parse_args(argv)
+    for name in args.groups:
+        if not name in GROUPS:
+            parser.error('unknown group {}'.format(name))
+
+    report = run(args.groups, 'quick' if args.quick else 'full')
+    text = json.dumps(report, indent=2, sort_keys=True)
+    for path in (args.output, args.save_baseline):
+        if path:
+            with open(path, 'w') as f:
+                f.write(text + '\n')
+    if not args.output and not args.baseline:
+        print(text)
+    for line in footprint(report):
+        sys.stderr.write(line + '\n')
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline['meta'].get('scale') != report['meta']['scale']:
+            print('Baseline was recorded at {} scale, this run is {}'.format(
+                baseline['meta'].get('scale'), report['meta']['scale']))
+        rows = compare(report, baseline, args.tolerance)
+        print(table(rows))
+        if any(row[4] == 'regression' for row in rows):
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
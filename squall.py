@@ -4,16 +4,21 @@
 # Date:   July 25 2013
 #
 from collections.abc import Iterable
+import copy
+import itertools
 
-__all__ = ['Sql', 'Drop', 'Create', 'Select', 'Insert', 'Update', 'Delete', 'Condition',
-           'Where', 'WhereIn', 'Having', 'Exists', 'Order',
-           'Table', 'Fields', 'Value', 'Group', 'Verbatim']
+__all__ = ['Sql', 'Drop', 'Create', 'Select', 'SelectExists', 'Union', 'Intersect', 'Except',
+           'Insert', 'BulkInsert', 'Upsert', 'Update', 'Delete', 'Condition', 'Where', 'WhereIn',
+           'Having', 'And', 'Or', 'Not', 'Exists', 'Order', 'Table', 'Join', 'LeftJoin',
+           'RightJoin', 'FullJoin', 'CrossJoin', 'Fields', 'Value', 'Param', 'Limit', 'Group',
+           'Count', 'Sum', 'Avg', 'Min', 'Max', 'Verbatim', 'freeze', 'thaw']
 
 # Only import what we need
 import datetime as dt
 from squallerrors import InvalidSqlCommandException, InvalidSqlConditionException, \
                          InvalidSqlWhereClauseException, InvalidSqlValueException, \
-                         InvalidDistinctFieldFormat
+                         InvalidDistinctFieldFormat, ImmutableSquallObjectException
+from squallcompiler import Compiler
 
 
 ADAPTERS = {'sqlite3' : None,
@@ -33,10 +38,164 @@ class Squall():
         There is no functionality difference in this class as of its
         first version. Future versions may expand on this class's
         functionality.
+        
+        Squall objects keep their attributes in __slots__ instead of a
+        per-instance __dict__, so the millions of Value objects of a bulk
+        insert cost little more than the values they hold. Subclasses that
+        do not declare __slots__ of their own still work, they just get a
+        __dict__ back. See freeze() for immutable objects.
     '''
+    __slots__ = ()
     def __init__(self):
         pass
     
+    def __compile__(self, compiler):
+        '''
+        :Description:
+            Renders the object for the Compiler. Objects without any values
+            to bind render the same way str() does; objects that do hold
+            values override this and bind them through the compiler.
+        '''
+        return str(self)
+    
+    def __shape__(self, compiler):
+        '''
+        :Description:
+            Describes the structure of the object for the ShapeCompiler,
+            binding values in the same order as __compile__ does. Objects
+            that render no values are described by their sql text.
+        '''
+        return (type(self), str(self))
+    
+    def compile(self, paramstyle='qmark', dialect=None):
+        '''
+        :Description:
+            Compiles the object into sql with placeholders instead of inlined
+            Value() literals.
+            
+        :Parameters:
+            - paramstyle: string; DB-API paramstyle of the database driver
+            - dialect: string; adapter dialect for sql that differs between
+              databases, e.g. 'sqlserver'
+            
+        :Returns:
+            - tuple; (sql string, parameters) ready for cursor.execute()
+        '''
+        return Compiler(paramstyle, dialect).compile(self)
+
+
+# Frozen subclass of every squall class that has been frozen, see freeze()
+FROZEN = {}
+
+
+def attributes(node):
+    '''
+    :Returns:
+        - generator; (name, value) of every attribute node has set, in its
+          __slots__ and in its __dict__ if it has one
+    '''
+    for cls in type(node).__mro__:
+        slots = cls.__dict__.get('__slots__', ())
+        for name in (slots,) if isinstance(slots, str) else slots:
+            if name in ('__dict__', '__weakref__'):
+                continue
+            try:
+                yield name, object.__getattribute__(node, name)
+            except AttributeError:
+                pass
+    for item in getattr(node, '__dict__', {}).items():
+        yield item
+
+
+def immutable(self, name, *args):
+    raise ImmutableSquallObjectException(
+        'Cannot change {} of frozen {}'.format(name, type(self).__thawed__.__name__))
+
+
+def thaw(node):
+    '''
+    :Description:
+        Mutable shallow copy of a squall object; its children stay as they
+        are, frozen or not. copy.copy() of a frozen object does the same.
+    '''
+    cls = getattr(type(node), '__thawed__', type(node))
+    duplicate = cls.__new__(cls)
+    for name, value in attributes(node):
+        object.__setattr__(duplicate, name, value)
+    return duplicate
+
+
+def thawed(cls, *args, **kwargs):
+    # New objects made through a frozen class (type(node)(...)) are mutable
+    return cls.__thawed__(*args, **kwargs)
+
+
+def refreeze(node, protocol):
+    # Pickled as a mutable copy, frozen again when unpickled
+    return (freeze, (thaw(node),))
+
+
+def deepthaw(node, memo):
+    duplicate = thaw(node)
+    memo[id(node)] = duplicate
+    for name, value in list(attributes(duplicate)):
+        object.__setattr__(duplicate, name, copy.deepcopy(value, memo))
+    return duplicate
+
+
+def frozen(cls):
+    '''
+    :Returns:
+        - class; the frozen subclass of cls, which adds no attributes and
+          refuses to set or delete them
+    '''
+    frozencls = FROZEN.get(cls)
+    if frozencls is None:
+        frozencls = FROZEN.setdefault(cls, type(cls.__name__, (cls,), {
+            '__slots__': (),
+            '__module__': cls.__module__,
+            '__doc__': cls.__doc__,
+            '__thawed__': cls,
+            '__new__': thawed,
+            '__setattr__': immutable,
+            '__delattr__': immutable,
+            '__copy__': thaw,
+            '__deepcopy__': deepthaw,
+            '__reduce_ex__': refreeze}))
+    return frozencls
+
+
+def freeze(node):
+    '''
+    :Description:
+        Makes a squall object and every squall object it holds immutable:
+        setting or deleting an attribute raises
+        ImmutableSquallObjectException. A frozen statement can be shared
+        between threads and cached without being changed behind your back.
+        Lists the objects hold (Where conditions, Insert values) are not
+        copied, so leave them alone too.
+        
+        Frozen objects are still instances of their class, render and
+        compile the same way, and copy.copy() or thaw() gives a mutable
+        copy back.
+        
+    :Returns:
+        - node, frozen
+    '''
+    stack = [node]
+    while len(stack) > 0:
+        item = stack.pop()
+        if isinstance(item, (list, tuple)):
+            stack.extend(item)
+            continue
+        if not isinstance(item, Squall) or hasattr(type(item), '__thawed__'):
+            continue
+        for name, value in attributes(item):
+            stack.append(value)
+        item.__class__ = frozen(type(item))
+    return node
+
+    
 class Sql(Squall):
     '''
     :Description:
@@ -71,18 +230,24 @@ class Sql(Squall):
           
         - table: string; name of the table to act on. 
     '''
+    __slots__ = ()
     
     '''
     :Class Variables:
         - COMMANDS: list; values of acceptable commands. See Class :Parameters:
           section or print(str(Sql(...).COMMANDS)) 
+        - STATEMENT: tuple; the attributes __init__ sets. Statement classes
+          (Select, Insert, ...) declare them in their __slots__; Value,
+          Table, Fields and the other parts of a statement do not carry them.
     '''
     COMMANDS = ['SELECT', 'INSERT', 'UPDATE', 'DELETE', 'CREATE', 'DROP']
+    STATEMENT = ('command', 'precallback', 'postcallback', 'table', 'fields',
+                 'values', 'condition')
     
     def __init__(self, command='', table=None, field=None, 
                  values=[], *args, **kwargs):
         super().__init__()
-        self.command = Command(command)
+        self.command = Command.named(command)
         self.precallback = kwargs.get('precallback')
         self.postcallback = kwargs.get('postcallback')
         if not str(self.command) in self.COMMANDS or \
@@ -119,21 +284,60 @@ class Sql(Squall):
         # Need to differentiate from "FROM", "SET", and "VALUES"
         return "{} {} {} {} {}".format(self.command, str(self.field), self.table,
                                        str(self.values), str(self.condition))
+    
+    def prepare(self, adapter):
+        '''
+        :Description:
+            Compiles the statement once for adapter and returns a callable
+            that only binds the values of its Param() placeholders and runs
+            the same sql on every call. See squallprepare.
+            
+            Example:
+                byid = Select(Table('t'), Fields('x', 'y'),
+                              Where('x', '=', Param('x'))).prepare(sqlobj)
+                rows = byid(x=42)
+            
+        :Parameters:
+            - adapter: squallsql.SqlAdapter or a database specific SqlAdapter
+            
+        :Returns:
+            - PreparedStatement
+        '''
+        return getattr(adapter, 'sqladapter', adapter).prepare(self)
 
 class Command(Squall):
+    __slots__ = ('command',)
+    # One Command per name, shared by every statement, see named()
+    shared = {}
+    
     def __init__(self, command):
         super().__init__()
         self.command = str(command).upper()
+    
+    @classmethod
+    def named(cls, command):
+        '''
+        :Returns:
+            - Command; the shared Command object of that name
+        '''
+        name = str(command).upper()
+        shared = cls.shared.get(name)
+        if shared is None:
+            shared = cls.shared.setdefault(name, cls(name))
+        return shared
         
     def __repr__(self):
         return self.command
             
 class Condition(Squall):
+    __slots__ = ('field', 'operator', 'value', 'rawvalue')
     
     def __init__(self, field, operator, value):
         super().__init__()
         self.field = field
         self.operator = operator
+        # Keep the unrendered value around so compile() can bind it
+        self.rawvalue = value
         if isinstance(value, Sql):
             if isinstance(value, Select):
                 self.value = "({})".format(str(value))
@@ -155,8 +359,26 @@ class Condition(Squall):
         return "{} {} {}".format(self.field,
                                  self.operator,
                                  self.value).strip()
+    
+    def __compile_value__(self, compiler):
+        if isinstance(self.rawvalue, Select):
+            return "({})".format(compiler.process(self.rawvalue))
+        return compiler.process(self.rawvalue)
+    
+    def __compile__(self, compiler):
+        return "{} {} {}".format(compiler.process(self.field),
+                                 self.operator,
+                                 self.__compile_value__(compiler)).strip()
+    
+    def __shape_value__(self, compiler):
+        return compiler.process(self.rawvalue)
+    
+    def __shape__(self, compiler):
+        return (type(self), compiler.process(self.field), self.operator,
+                self.__shape_value__(compiler))
 
 class Drop(Sql):
+    __slots__ = Sql.STATEMENT + ('exists',)
     
     def __init__(self, table, exists=None, **kwargs):
         super().__init__('DROP', table, exists, **kwargs)
@@ -169,6 +391,7 @@ class Drop(Sql):
         return "DROP {} {}".format('TABLE', self.table)
 
 class Create(Sql):
+    __slots__ = Sql.STATEMENT + ('constraints',)
     
     def __init__(self, table, fields, constraints = [], **kwargs):
         super().__init__('CREATE', table, fields, constraints, **kwargs)
@@ -182,16 +405,8 @@ class Create(Sql):
                                             ', '.join(self.constraints))
     
 
-class Union(Sql):
-    
-    def __init__(self, *args, **kwargs):
-        '''
-        :Description:
-            Concats 
-        '''
-        
-
 class Select(Sql):
+    __slots__ = Sql.STATEMENT + ('existsflag', 'lastqueryresults', 'limit', 'group', 'having')
     
     def __init__(self, table, fields, 
                  condition='', **kwargs):
@@ -199,12 +414,17 @@ class Select(Sql):
         :Description:
         :Parameters:
             - **kwargs: dict;
-                - precallback: method; passed to the Transaction object which passes
-                  it to the sqlobj (adapter) .select() statement
-                - postcallback: method; passed to the Transaction object which passes
-                  it to the sqlobj (adapter) .select() statement. Adding a method 
-                  here which garners the kwargs.get('result') call will fetch 
-                  results of the statement.
+                - limit: Limit or int; most rows returned, see Limit
+                - group: Group, string or list; columns the rows are grouped
+                  by, rendered after the Where and before any ORDER BY
+                - having: Having or predicate; condition on the groups, see
+                  Group
+                - precallback: method; called by the transaction with the
+                  statement event (see squallinstrument) as keyword arguments
+                  before the select is executed
+                - postcallback: method; called by the transaction with the
+                  statement event as keyword arguments once the select has run.
+                  kwargs.get('result') holds the fetched rows of the statement.
         '''
         super().__init__('SELECT', table=table, fields=fields, **kwargs)
         self.table = table
@@ -215,16 +435,293 @@ class Select(Sql):
             # FIXME: Bad coding practice, may get rid of
             self.existsflag = True
         self.lastqueryresults = ''
+        self.limit = kwargs.get('limit')
+        if isinstance(self.limit, int):
+            self.limit = Limit(self.limit)
+        self.group = kwargs.get('group')
+        if not self.group is None and not isinstance(self.group, Group):
+            self.group = Group(*([self.group] if isinstance(self.group, str) else self.group))
+        self.having = tohaving(kwargs.get('having'))
+        if not self.having is None and not self.group is None and \
+           not self.group.having is None:
+            raise InvalidSqlConditionException(
+                'Select has the HAVING clauses of both {} and {}'.format(self.group, self.having))
+        
+    def tail(self):
+        '''
+        :Returns:
+            - the part of the select after FROM: its condition, or a
+              Grouping when the select is grouped
+        '''
+        if self.group is None and self.having is None:
+            return self.condition
+        return Grouping(self.condition, self.group, self.having)
+    
+    def exists(self, compiler=None, shape=False):
+        '''
+        :Description:
+            Renders the select as an existence check for the dialect of
+            compiler, see SelectExists. The database stops at the first
+            matching row; its fields, limit and ORDER BY are left out so
+            nothing has to be sorted first.
+            
+        :Returns:
+            - string; or a tuple describing the shape
+        '''
+        dialect = None if compiler is None else compiler.dialect
+        render = str if compiler is None else compiler.process
+        condition = self.condition
+        if isinstance(condition, Exists):
+            # Select(table, fields, Exists(...)) only has the conditions of the Exists
+            condition = condition.conditions
+        predicate, trailing = untrail(condition)
+        parts = [render(p) for p in [predicate, self.group, self.having] + trailing
+                 if not p is None and not isinstance(p, Order)]
+        if shape:
+            return (type(self), self.existsflag, dialect in ('sqlserver', 'firebird'),
+                    render(self.table), tuple(parts))
+        tail = clauses(*parts)
+        if dialect == 'sqlserver':
+            return clauses('SELECT TOP 1 1 FROM {}'.format(render(self.table)), tail)
+        if dialect == 'firebird':
+            return clauses('SELECT FIRST 1 1 FROM {}'.format(render(self.table)), tail)
+        return 'SELECT EXISTS({})'.format(clauses('SELECT 1 FROM {}'.format(render(self.table)), tail))
+    
+    def result(self, rows):
+        '''
+        :Returns:
+            - the output of the select for its fetched rows: the rows, or
+              a bool for an existence check
+        '''
+        if self.existsflag:
+            return len(rows) > 0 and bool(rows[0][0])
+        return rows
         
     def __repr__(self):
         if self.existsflag:
-            return '''SELECT EXISTS({} FROM {} {})'''.format( 
-             self.fields, self.table)
+            return self.exists()
+ 
+        if not self.limit is None:
+            return self.limit.limited(self)
             
         return '''SELECT {} FROM {} {}'''.format( 
-             self.fields, self.table, self.condition) 
+             self.fields, self.table, self.tail()) 
+    
+    def __compile__(self, compiler):
+        if self.existsflag:
+            return self.exists(compiler)
+        if not self.limit is None:
+            return self.limit.limited(self, compiler)
+        return '''SELECT {} FROM {} {}'''.format(
+             compiler.process(self.fields), compiler.process(self.table),
+             compiler.process(self.tail()))
+    
+    def __shape__(self, compiler):
+        if self.existsflag:
+            return self.exists(compiler, shape=True)
+        if not self.limit is None:
+            return self.limit.limited(self, compiler, shape=True)
+        return (type(self), self.existsflag, compiler.process(self.fields),
+                compiler.process(self.table), compiler.process(self.tail()))
+        
+class SelectExists(Select):
+    '''
+    :Description:
+        Whether any row matches, without fetching the rows: transactions
+        output True or False instead of a list of rows.
+        
+            - sqlite3, mysql, postgres (and str()): SELECT EXISTS(SELECT 1 FROM ...)
+            - sqlserver: SELECT TOP 1 1 FROM ...
+            - firebird: SELECT FIRST 1 1 FROM ...
+        
+        SelectExists(Table('t'), Where('x', '=', Value(4)))
+        >> SELECT EXISTS(SELECT 1 FROM t WHERE x = 4)
+        
+    :Parameters:
+        - table: Table, Join or Select; a Select is checked for rows with
+          its table, condition and grouping
+        - condition: Where; the rows looked for
+        - **kwargs: dict; group, having, precallback and postcallback, see
+          Select
+    '''
+    __slots__ = ()
+    
+    def __init__(self, table, condition='', **kwargs):
+        if isinstance(table, Select):
+            select = table
+            table, condition = select.table, select.condition
+            kwargs.setdefault('group', select.group)
+            kwargs.setdefault('having', select.having)
+        kwargs.pop('limit', None)
+        super().__init__(table, Fields('1'), condition, **kwargs)
+        self.existsflag = True
+        
+    
+class Compound(Squall):
+    '''
+    :Description:
+        The Selects of a Union, Intersect or Except joined by their set
+        operator. Rendered as a derived table, (a UNION b) AS compound, when
+        a limited set operation selects from it; body() renders it bare.
+        
+        sqlite does not take parentheses around the Selects of a set
+        operation, so a Select that is itself a set operation or is limited
+        is selected from as a derived table instead:
+        SELECT * FROM (a UNION b) AS s1 EXCEPT c.
+    '''
+    __slots__ = ('operator', 'selects')
+    
+    def __init__(self, operator, selects):
+        self.operator = operator
+        self.selects = selects
+        
+    def body(self, render=str):
+        members = []
+        for i, select in enumerate(self.selects):
+            sql = render(select).strip()
+            if isinstance(select, Union) or not select.limit is None:
+                sql = 'SELECT * FROM ({}) AS s{}'.format(sql, i + 1)
+            members.append(sql)
+        return ' {} '.format(self.operator).join(members)
+        
+    def __repr__(self):
+        return '({}) AS compound'.format(self.body())
+    
+    def __compile__(self, compiler):
+        return '({}) AS compound'.format(self.body(compiler.process))
+    
+    def __shape__(self, compiler):
+        return (type(self), self.operator, tuple(compiler.process(s) for s in self.selects))
+    
+    
+class Union(Select):
+    '''
+    :Description:
+        Combines the rows of Selects in the database, so only the final
+        rows are fetched instead of every Select's rows being merged in
+        python. Union drops duplicate rows, Union(..., all=True) keeps them;
+        Intersect and Except work the same way.
         
+        Union(Select(Table('a'), Fields('x')), Select(Table('b'), Fields('x')),
+              order=Order(fields=Fields('x')), limit=10)
+        >> SELECT * FROM (SELECT x FROM a UNION SELECT x FROM b) AS compound ORDER BY x LIMIT 10
+        
+        Without a limit the Selects are combined directly, a UNION b ORDER
+        BY x; a limit selects from them as a derived table so it renders
+        for every dialect, see Limit. The Selects must return the same
+        number of columns, and the order names the columns of the first.
+        A Select is only ordered in a Union together with a limit, the
+        database ignores the order of the rows it combines.
+        A Union runs, streams and caches like a Select.
+        
+    :Parameters:
+        - *selects: Select; two or more, set operations included
+        - **kwargs: dict;
+            - all: boolean; keep duplicate rows. INTERSECT ALL and EXCEPT
+              ALL are postgres only
+            - order: Order; order of the combined rows
+            - limit: Limit or int; most combined rows returned
+            - precallback, postcallback: see Select
+    '''
+    __slots__ = ()
+    
+    operator = 'UNION'
+    
+    def __init__(self, *selects, **kwargs):
+        if len(selects) < 2:
+            raise InvalidSqlValueException(
+                '{} needs two or more Selects'.format(type(self).__name__))
+        for select in selects:
+            if not isinstance(select, Select):
+                raise InvalidSqlValueException(
+                    '{} is not a Select'.format(str(select)))
+            if select.limit is None and ordered(select.condition):
+                raise InvalidSqlConditionException(
+                    'The ORDER BY of {} has no effect in a {}, order the combined rows '
+                    'with order='.format(str(select), type(self).__name__))
+        operator = self.operator
+        if kwargs.get('all', False):
+            operator = '{} ALL'.format(operator)
+        order = kwargs.get('order')
+        if not order is None and not isinstance(order, Order):
+            raise InvalidSqlConditionException(
+                '{} is not an Order object'.format(str(order)))
+        super().__init__(Compound(operator, list(selects)), Fields('*'),
+                         '' if order is None else order, **kwargs)
+        
+    def __repr__(self):
+        if not self.limit is None:
+            return self.limit.limited(self)
+        return clauses(self.table.body(), str(self.condition))
+    
+    def __compile__(self, compiler):
+        if not self.limit is None:
+            return self.limit.limited(self, compiler)
+        return clauses(self.table.body(compiler.process), compiler.process(self.condition))
+    
+    
+class Intersect(Union):
+    __slots__ = ()
+    
+    operator = 'INTERSECT'
+    
+    
+class Except(Union):
+    __slots__ = ()
+    
+    operator = 'EXCEPT'
+    
+    
+def tofields(fields):
+    '''
+    :Returns:
+        - Fields; fields given as a Fields object, a column name or a list
+          of them, None for None
+    '''
+    if fields is None or isinstance(fields, Fields):
+        return fields
+    if isinstance(fields, str):
+        return Fields(fields)
+    return Fields(*fields)
+
+def returned(statement, compiler=None):
+    '''
+    :Description:
+        Renders the returning columns of an Insert, Update or Delete for the
+        dialect of compiler:
+        
+            - sqlserver: OUTPUT INSERTED.c, or DELETED.c for a Delete, put
+              before VALUES, WHERE or the end of a MERGE; columns that
+              already name INSERTED or DELETED are kept as they are
+            - mysql: raises, mysql cannot return the rows it wrote
+            - others (and str()): RETURNING c at the end of the statement
+            
+    :Returns:
+        - tuple; (OUTPUT clause, RETURNING clause), empty strings for
+          clauses the dialect does not use
+    '''
+    if statement.returning is None:
+        return '', ''
+    dialect = None if compiler is None else compiler.dialect
+    fields = statement.returning.fields
+    if dialect == 'mysql':
+        raise InvalidSqlCommandException(
+            'mysql cannot return the rows of {}'.format(type(statement).__name__))
+    if dialect == 'sqlserver':
+        prefix = 'DELETED' if isinstance(statement, Delete) else 'INSERTED'
+        return 'OUTPUT {}'.format(', '.join(
+            f if '.' in f else '{}.{}'.format(prefix, f) for f in fields)), ''
+    return '', 'RETURNING {}'.format(', '.join(fields))
+
+def clauses(*parts):
+    '''
+    :Returns:
+        - string; the non empty parts separated by single spaces
+    '''
+    return ' '.join(p.strip() for p in parts if p.strip() != '')
+
 class Insert(Sql):
+    __slots__ = Sql.STATEMENT + ('field', 'returning')
     def __init__(self, table, field, values, *args, **kwargs):
         '''
         :Description:
@@ -237,42 +734,315 @@ class Insert(Sql):
             - table; Table(): Sql Object with Table name
             - fields; Fields(): Sql Object with column names
             - values; list: List of Sql Value() Objects
+            - **kwargs: dict;
+                - returning: Fields() or list; columns of the inserted rows
+                  to return, such as generated keys, see returned(). The
+                  transaction output holds the rows like it does for a Select.
         '''
         super().__init__('INSERT', table, field, values, *args, **kwargs)
         self.table = table
         self.field = field
         self.values = values
+        self.returning = tofields(kwargs.get('returning'))
         
     def __repr__(self):
         mf = self.field
         if self.field.fields != '':
             mf = '{}{}{}'.format(' (', mf, ')')
-        return "INSERT INTO {}{} VALUES ({})".format(self.table, 
+        return clauses("INSERT INTO {}{} VALUES ({})".format(self.table, 
                                 mf,
-                                ', '.join(str(x) for x in self.values).strip())
+                                ', '.join(str(x) for x in self.values).strip()),
+                       returned(self)[1])
+    
+    def __compile__(self, compiler):
+        mf = compiler.process(self.field)
+        if self.field.fields != '':
+            mf = '{}{}{}'.format(' (', mf, ')')
+        output, returning = returned(self, compiler)
+        return clauses("INSERT INTO {}{}".format(compiler.process(self.table), mf), output,
+                       "VALUES ({})".format(
+                           ', '.join(compiler.process(x) for x in self.values).strip()),
+                       returning)
+    
+    def __shape__(self, compiler):
+        return (type(self), compiler.process(self.field), compiler.process(self.table),
+                tuple(compiler.process(x) for x in self.values),
+                compiler.process(self.returning))
+
+class BulkInsert(Insert):
+    '''
+    :Description:
+        Insert of many rows at once, rendered as multi-row
+        INSERT ... VALUES (...), (...), ... statements.
+
+        Rows are consumed lazily, so a generator can be given to load
+        millions of rows without holding them all in memory. Use chunks() to
+        get statements that respect the backend's limits on bound parameters
+        and rows per VALUES clause; Transaction objects do this for you.
+
+    :Parent:
+        Insert
+
+    :Parameters:
+        - table; Table(): Sql Object with Table name
+        - field; Fields(): Sql Object with column names. If empty, the
+          length of the first row decides the number of columns.
+        - rows; iterable: each row is a list or tuple of python values or
+          Value() objects
+    '''
+    __slots__ = ('rows',)
+    def __init__(self, table, field, rows, *args, **kwargs):
+        super().__init__(table, field, [], *args, **kwargs)
+        self.rows = rows
+
+    def __repr__(self):
+        mf = self.field
+        if self.field.fields != '':
+            mf = '{}{}{}'.format(' (', mf, ')')
+        # Rows may be a generator, so only the template of a row is rendered
+        row = ', '.join('?' for f in self.field.fields) if self.field.fields != '' else '?'
+        return clauses("INSERT INTO {}{} VALUES ({}), ...".format(self.table, mf, row),
+                       returned(self)[1])
+
+    def __row_values__(self, row, columns):
+        if len(row) != columns:
+            raise InvalidSqlValueException(
+                'Non-Equal fields [{}] to values [{}] ratio'.format(columns, len(row)))
+        for v in row:
+            if isinstance(v, Value):
+                v = v.value
+                if isinstance(v, tuple) or isinstance(v, list):
+                    if len(v) == 1:
+                        v = v[0]
+            yield v
+
+    def __template__(self, paramstyle, columns, rows, dialect=None):
+        compiler = Compiler(paramstyle, dialect)
+        values = ', '.join('({})'.format(', '.join(compiler.bind(None) for c in range(columns)))
+                           for r in range(rows))
+        return self.__render__(compiler, values)
+
+    def __render__(self, compiler, values):
+        '''
+        :Description:
+            Renders the statement around values, the already bound
+            (...), (...) rows.
+        '''
+        mf = compiler.process(self.field)
+        if self.field.fields != '':
+            mf = '{}{}{}'.format(' (', mf, ')')
+        output, returning = returned(self, compiler)
+        return clauses("INSERT INTO {}{}".format(compiler.process(self.table), mf), output,
+                       "VALUES {}".format(values), returning)
+
+    def chunks(self, paramstyle='qmark', max_variables=None, max_rows=None, dialect=None):
+        '''
+        :Description:
+            Generator of multi-row insert statements. Each chunk holds as many
+            rows as the limits allow; rows are pulled from self.rows only as
+            chunks are generated.
+
+        :Parameters:
+            - paramstyle: string; DB-API paramstyle of the database driver
+            - max_variables: int; maximum bound parameters per statement,
+              None for no limit
+            - max_rows: int; maximum rows in one VALUES clause, None for no limit
+            - dialect: string; dialect of the adapter, see squallcompiler
+
+        :Returns:
+            - generator of (sql string, parameters) tuples
+        '''
+        rows = iter(self.rows)
+        if self.field.fields != '':
+            columns = len(self.field.fields)
+            first = []
+        else:
+            first = list(itertools.islice(rows, 1))
+            if len(first) == 0:
+                return
+            columns = len(first[0])
+
+        size = max_rows
+        if not max_variables is None:
+            if columns > max_variables:
+                raise InvalidSqlValueException(
+                    '{} columns exceed the limit of {} parameters per statement'.format(
+                        columns, max_variables))
+            size = max_variables // columns if size is None else min(size, max_variables // columns)
+
+        templates = {}
+        rows = itertools.chain(first, rows)
+        while True:
+            chunk = list(itertools.islice(rows, size))
+            if len(chunk) == 0:
+                return
+            params = []
+            for row in chunk:
+                params.extend(self.__row_values__(row, columns))
+            # Only full chunks and the last partial chunk need a template
+            if not len(chunk) in templates:
+                templates[len(chunk)] = self.__template__(paramstyle, columns, len(chunk),
+                                                          dialect)
+            if paramstyle in ('named', 'pyformat'):
+                params = dict(('p{}'.format(i + 1), v) for i, v in enumerate(params))
+            else:
+                params = tuple(params)
+            yield templates[len(chunk)], params
+            if size is None:
+                return
+
+    def __compile__(self, compiler):
+        # Compiles every row into one statement, ignoring any backend limits
+        rows = list(self.rows)
+        self.rows = rows
+        columns = len(self.field.fields) if self.field.fields != '' else len(rows[0])
+        values = ', '.join('({})'.format(', '.join(compiler.bind(v)
+                                                   for v in self.__row_values__(row, columns)))
+                           for row in rows)
+        return self.__render__(compiler, values)
+
+    def __shape__(self, compiler):
+        # Unhashable on purpose; the rows make every bulk insert its own shape,
+        # so the StatementCache compiles these without caching them.
+        return [type(self)]
+
+class Upsert(BulkInsert):
+    '''
+    :Description:
+        Inserts rows, updating the existing row instead where a row with
+        the same keys is already in the table. The database decides per
+        row in one statement, so there is no Select first and no race
+        between checking and writing:
+        
+            - sqlite3 (3.24+), postgres (and str()):
+              INSERT ... ON CONFLICT (keys) DO UPDATE SET c = excluded.c
+            - mysql: INSERT ... ON DUPLICATE KEY UPDATE c = VALUES(c); mysql
+              picks the unique index itself, keys are not rendered
+            - sqlserver: MERGE INTO t WITH (HOLDLOCK) USING (VALUES ...)
+              ... WHEN MATCHED THEN UPDATE ... WHEN NOT MATCHED THEN INSERT
+        
+        Upsert(Table('t'), Fields('id', 'name'), [(1, 'a'), (2, 'b')], keys=['id'])
+        >> INSERT INTO t (id, name) VALUES (?, ?), ... ON CONFLICT (id) DO UPDATE SET name = excluded.name
+        
+        Rows are sent in multi-row chunks like a BulkInsert. Keys must be
+        covered by a unique index or primary key (sqlite, postgres and mysql
+        refuse the statement otherwise) and a chunk may not hold the same
+        keys twice on postgres and sqlserver.
     
+    :Parent:
+        BulkInsert
+    
+    :Parameters:
+        - table; Table(): Sql Object with Table name
+        - field; Fields(): Sql Object with column names, including the keys
+        - rows; iterable: each row is a list or tuple of python values or
+          Value() objects
+        - keys; Fields() or list: columns that identify a row
+        - **kwargs: dict;
+            - update: Fields() or list; columns overwritten on existing rows,
+              every column but the keys by default. Empty to keep existing
+              rows as they are (DO NOTHING).
+    '''
+    __slots__ = ('keys', 'update')
+    
+    def __init__(self, table, field, rows, keys, *args, **kwargs):
+        super().__init__(table, field, rows, *args, **kwargs)
+        if field.fields == '':
+            raise InvalidSqlValueException('Upsert needs the names of its columns')
+        columns = list(field.fields)
+        self.keys = list(keys.fields if isinstance(keys, Fields) else keys)
+        update = kwargs.get('update')
+        if update is None:
+            update = [c for c in columns if not c in self.keys]
+        self.update = list(update.fields if isinstance(update, Fields) else update)
+        for name in self.keys + self.update:
+            if not name in columns:
+                raise InvalidSqlValueException(
+                    'Upsert column <{}> is not one of {}'.format(name, field))
+        if len(self.keys) == 0:
+            raise InvalidSqlValueException('Upsert needs the columns that identify a row')
+    
+    def __repr__(self):
+        row = ', '.join('?' for f in self.field.fields)
+        return self.__render__(None, '({}), ...'.format(row))
+    
+    def __render__(self, compiler, values):
+        render = str if compiler is None else compiler.process
+        dialect = None if compiler is None else compiler.dialect
+        table, columns = render(self.table), ', '.join(self.field.fields)
+        output, returning = returned(self, compiler)
+        if dialect == 'sqlserver':
+            match = ' AND '.join('target.{0} = source.{0}'.format(k) for k in self.keys)
+            sql = 'MERGE INTO {} WITH (HOLDLOCK) AS target USING (VALUES {}) AS source ({}) ' \
+                  'ON {}'.format(table, values, columns, match)
+            if len(self.update) > 0:
+                sql += ' WHEN MATCHED THEN UPDATE SET {}'.format(', '.join(
+                    '{0} = source.{0}'.format(c) for c in self.update))
+            return '{};'.format(clauses('{} WHEN NOT MATCHED THEN INSERT ({}) VALUES ({})'.format(
+                sql, columns, ', '.join('source.{}'.format(c) for c in self.field.fields)), output))
+        sql = 'INSERT INTO {} ({}) VALUES {}'.format(table, columns, values)
+        if dialect == 'mysql':
+            # Assigning a key to itself keeps the row as it is
+            update = self.update if len(self.update) > 0 else self.keys[:1]
+            return '{} ON DUPLICATE KEY UPDATE {}'.format(sql, ', '.join(
+                '{0} = VALUES({0})'.format(c) for c in update))
+        if len(self.update) == 0:
+            return clauses('{} ON CONFLICT ({}) DO NOTHING'.format(sql, ', '.join(self.keys)),
+                           returning)
+        return clauses('{} ON CONFLICT ({}) DO UPDATE SET {}'.format(
+            sql, ', '.join(self.keys), ', '.join('{0} = excluded.{0}'.format(c)
+                                                 for c in self.update)), returning)
+
 class Delete(Sql):
+    __slots__ = Sql.STATEMENT + ('returning',)
     def __init__(self, table, *args, **kwargs):
         '''
         :Parameters:
             - **kwargs; dict
                 - condition; Where object
+                - returning; Fields() or list: columns of the deleted rows to
+                  return, see returned()
         '''
         super().__init__('DELETE', table, *args, condition=kwargs.get('condition', None))
         self.table = table
         self.condition = kwargs.get('condition', '')
+        self.returning = tofields(kwargs.get('returning'))
         
     def __repr__(self):
+        if not self.returning is None:
+            return clauses("DELETE FROM {}".format(self.table), str(self.condition),
+                           returned(self)[1])
         return "DELETE FROM {} {}".format(self.table, self.condition)
+    
+    def __compile__(self, compiler):
+        if not self.returning is None:
+            output, returning = returned(self, compiler)
+            return clauses("DELETE FROM {}".format(compiler.process(self.table)), output,
+                           compiler.process(self.condition), returning)
+        return "DELETE FROM {} {}".format(compiler.process(self.table),
+                                          compiler.process(self.condition))
+    
+    def __shape__(self, compiler):
+        return (type(self), compiler.process(self.table),
+                compiler.process(self.condition), compiler.process(self.returning))
         
 class Update(Sql):
+    __slots__ = Sql.STATEMENT + ('field', 'returning')
     def __init__(self, table, fields, values, *args, **kwargs):
+        '''
+        :Parameters:
+            - **kwargs; dict
+                - condition; Where object
+                - returning; Fields() or list: columns of the updated rows to
+                  return, their new values, see returned()
+        '''
         super().__init__('UPDATE', table, fields, values, *args,
                          condition=kwargs.get('condition', None))
         self.table = table
         self.field = fields
         self.values = values
         self.condition = kwargs.get('condition', '')
+        self.returning = tofields(kwargs.get('returning'))
         
     def __parse_values(self, field, value):
         return "{} = {}".format(field, value)
@@ -293,11 +1063,47 @@ class Update(Sql):
         for i in range(0, len(self.values)):
             params.append(self.__parse_values(self.field.fields[i], self.values[i]).strip())
         
+        if not self.returning is None:
+            return clauses("UPDATE {} SET {}{}".format(self.table, ', '.join(params), cond),
+                           returned(self)[1])
         return "UPDATE {} SET {}{}".format(self.table, ', '.join(params), cond)      
+    
+    def __compile__(self, compiler):
+        values = self.values
+        if not isinstance(values, (list, tuple)):
+            values = [values]
+        if len(self.field.fields) != len(values):
+            raise InvalidSqlValueException(
+                'Non-Equal fields [{}] to values [{}] ratio'.format(
+                    len(self.field.fields), len(values)))
+        params = []
+        for i in range(0, len(values)):
+            params.append(self.__parse_values(self.field.fields[i],
+                                              compiler.process(values[i])).strip())
+        # Condition is compiled last so its parameters follow the SET values
+        cond = ''
+        if not self.condition is None:
+            cond = ' {}'.format(compiler.process(self.condition))
+        if not self.returning is None:
+            output, returning = returned(self, compiler)
+            return clauses("UPDATE {} SET {}".format(compiler.process(self.table),
+                                                    ', '.join(params)), output, cond, returning)
+        return "UPDATE {} SET {}{}".format(compiler.process(self.table),
+                                           ', '.join(params), cond)
+    
+    def __shape__(self, compiler):
+        values = self.values
+        if not isinstance(values, (list, tuple)):
+            values = [values]
+        return (type(self), compiler.process(self.field),
+                tuple(compiler.process(x) for x in values),
+                compiler.process(self.condition), compiler.process(self.table),
+                compiler.process(self.returning))
      
 class Where(Condition):
+    __slots__ = ('operand', 'conditions')
     
-    def __init__(self, field, operator, value, **kwargs):
+    def __init__(self, field, operator=None, value=None, **kwargs):
         '''
         :Description:
             This is the main condition that gets used.
@@ -340,8 +1146,16 @@ class Where(Condition):
                 - conditions: list; list of Condition objects to append to Where clause
                 - operand: 'AND' or 'OR', when multiple conditions are given, they are
                   separated by this operand string. Applies to additional Where objects only
+            
+            A predicate tree can be given as the only argument instead of a
+            field, operator and value:
+                Where(Or(Condition('x', '=', Value(1)), Condition('y', '>', Value(2))))
+                >> WHERE x = 1 OR y > 2
                 
         '''
+        if operator is None and value is None and isinstance(field, Condition):
+            # The predicate is the whole clause
+            operator, value = '', ''
         super().__init__(field, operator, value)
         self.operand = kwargs.get('operand', 'AND')
         self.conditions = kwargs.get('conditions', [])
@@ -365,11 +1179,41 @@ class Where(Condition):
         '''
         return Condition(self.field, self.operator, self.value)
         
+    keyword = 'WHERE'
+    
+    def __terms__(self):
+        '''
+        :Description:
+            The Where as a node of a predicate tree: its own clause and the
+            predicate conditions joined by the operand. Conditions that are
+            not predicates (Order, Having, ...) follow the whole clause.
+            
+        :Returns:
+            - tuple; (operator or None, children, trailing conditions)
+        '''
+        if self.operator == '' and isinstance(self.field, Condition):
+            clause = self.field
+        else:
+            clause = Clause(self)
+        children = [clause]
+        trailing = []
+        for cond in self.conditions:
+            if ispredicate(cond):
+                children.append(cond)
+            else:
+                trailing.append(cond)
+        if len(children) == 1:
+            return None, children, trailing
+        return self.operand, children, trailing
+        
     def __repr__(self):
-        conditions = '{}'.format(' '.join(
-            str(cond) for cond in self.conditions).replace("WHERE", self.operand))
-        return "WHERE {} {} {} {}".format(self.field, self.operator,
-                                          self.value, conditions).strip()
+        return render_predicate(self.keyword, self)
+    
+    def __compile__(self, compiler):
+        return render_predicate(self.keyword, self, compiler)
+    
+    def __shape__(self, compiler):
+        return (type(self), render_predicate(self.keyword, self, compiler, shape=True))
         
 class WhereIn(Where):
     '''
@@ -378,9 +1222,32 @@ class WhereIn(Where):
         to specify multiple values in Sql-Acceptable formats.
         It makes specifying a list of values much easier.
     '''
+    __slots__ = ()
     
     def __init__(self, field, values):
         super().__init__(field, 'IN', self.formatValues(values))
+        self.rawvalue = values
+        
+    def __compile_value__(self, compiler):
+        values = self.rawvalue
+        if isinstance(values, Value):
+            return compiler.process(values)
+        elif isinstance(values, list) or isinstance(values, tuple):
+            return "({})".format(', '.join(
+                compiler.process(v) if isinstance(v, Squall) else compiler.bind(v)
+                for v in values))
+        elif isinstance(values, Select):
+            return "({})".format(compiler.process(values))
+        return str(self.value)
+    
+    def __shape_value__(self, compiler):
+        values = self.rawvalue
+        if isinstance(values, list) or isinstance(values, tuple):
+            return tuple(compiler.process(v) if isinstance(v, Squall) else compiler.bind(v)
+                         for v in values)
+        elif isinstance(values, Squall):
+            return compiler.process(values)
+        return self.value
         
     def formatValues(self, values):
         if isinstance(values, Value):
@@ -397,6 +1264,7 @@ class Order(Condition):
     :Description:
         Add a condition to organize rows. Only applicable on Select objects.
     '''
+    __slots__ = ('fields', 'collate', 'nocase', 'sort', 'args')
     
     def __init__(self, *args, **kwargs):
         '''
@@ -427,20 +1295,148 @@ class Order(Condition):
                 return ' {}'.format(string)
             return ''
         
+        fields = self.fields
         if self.args:
-            
-            self.fields = '{}{}'.format(self.fields, Fields(', '.join(self.args)))
-        return "ORDER BY{}{}{}{}".format(space(self.fields), 
+            fields = '{}{}'.format(fields, Fields(', '.join(self.args)))
+        return "ORDER BY{}{}{}{}".format(space(fields), 
                                           space(self.collate), 
                                           space(self.nocase),
                                           space(self.sort))
+    
+    def __compile__(self, compiler):
+        return str(self)
+    
+    def __shape__(self, compiler):
+        # Not str(self), rendering with args appends them to self.fields again
+        return (type(self), compiler.process(self.fields), self.collate,
+                self.nocase, self.sort, self.args)
+        
+class Limit(Squall):
+    '''
+    :Description:
+        Most rows a Select returns, after skipping offset rows. Rendered
+        the way the database of the compiling adapter expects:
+        
+            - sqlite3, mysql, postgres (and str()): LIMIT n OFFSET m
+            - sqlserver: TOP (n), or OFFSET m ROWS FETCH NEXT n ROWS ONLY
+              when there is an offset; OFFSET needs an ORDER BY, so
+              ORDER BY (SELECT NULL) is added to unordered Selects
+            - firebird: FIRST n SKIP m
+        
+        Select(Table('t'), Fields('x'), Order(fields=Fields('x')), limit=Limit(10, offset=20))
+        >> SELECT x FROM t ORDER BY x LIMIT 10 OFFSET 20
+        
+        Count and offset are bound as parameters, so pages of the same
+        query share one compiled statement.
+        
+    :Parameters:
+        - count: int; most rows returned, None for no limit
+        - offset: int; rows skipped first, None for none
+    '''
+    __slots__ = ('count', 'offset')
+    
+    # Largest row count mysql accepts, for an offset without a limit
+    MYSQL_ALL = 18446744073709551615
+    
+    def __init__(self, count=None, offset=None):
+        for value in (count, offset):
+            if not value is None and (not isinstance(value, int) or
+                                      isinstance(value, bool) or value < 0):
+                raise InvalidSqlValueException(
+                    'Limit needs counts of zero or more, got {}'.format(value))
+        self.count = count
+        self.offset = offset or None
         
+    def __repr__(self):
+        parts = []
+        if not self.count is None:
+            parts.append('LIMIT {}'.format(self.count))
+        if not self.offset is None:
+            parts.append('OFFSET {}'.format(self.offset))
+        return ' '.join(parts)
+    
+    def limited(self, select, compiler=None, shape=False):
+        '''
+        :Description:
+            Renders select with this limit for the dialect of compiler, in
+            the order its values are bound.
+            
+        :Parameters:
+            - select: Select
+            - compiler: Compiler; None to inline the values like str() does
+            - shape: boolean; compiler is a ShapeCompiler, return the shape
+            
+        :Returns:
+            - string; or a tuple describing the shape
+        '''
+        dialect = None if compiler is None else compiler.dialect
+        render = str if compiler is None else compiler.process
+        bind = str if compiler is None else compiler.bind
+        head, tail = [], []
+        count, offset = self.count, self.offset
+        if dialect == 'sqlserver' and offset is None and not count is None:
+            head.append('TOP ({})'.format(bind(count)))
+        elif dialect == 'firebird':
+            if not count is None:
+                head.append('FIRST ({})'.format(bind(count)))
+            if not offset is None:
+                head.append('SKIP ({})'.format(bind(offset)))
+        parts = [head, render(select.fields), render(select.table),
+                 render(select.tail())]
+        if dialect == 'sqlserver' and len(head) > 0 and not shape and \
+           parts[1].startswith('DISTINCT '):
+            # T-SQL takes SELECT DISTINCT TOP (n), not TOP (n) DISTINCT
+            head.insert(0, 'DISTINCT')
+            parts[1] = parts[1][len('DISTINCT '):]
+        if dialect == 'sqlserver' and not offset is None:
+            if not ordered(select.condition):
+                tail.append('ORDER BY (SELECT NULL)')
+            tail.append('OFFSET {} ROWS'.format(bind(offset)))
+            if not count is None:
+                tail.append('FETCH NEXT {} ROWS ONLY'.format(bind(count)))
+        elif not dialect in ('sqlserver', 'firebird'):
+            if count is None and not offset is None and dialect != 'postgres':
+                # sqlite and mysql only take an offset after a limit
+                count = -1 if dialect != 'mysql' else self.MYSQL_ALL
+            if not count is None:
+                tail.append('LIMIT {}'.format(bind(count)))
+            if not offset is None:
+                tail.append('OFFSET {}'.format(bind(offset)))
+        if shape:
+            return (type(select), select.existsflag, tuple(head), parts[1], parts[2],
+                    parts[3], tuple(tail))
+        sql = 'SELECT {}{} FROM {} {}'.format(
+            ''.join(h + ' ' for h in head), parts[1], parts[2], parts[3]).rstrip()
+        return ' '.join([sql] + tail)
+    
+    def __shape__(self, compiler):
+        return (type(self), self.count is None, self.offset is None)
+    
+    
+def ordered(condition):
+    '''
+    :Returns:
+        - boolean; whether the condition of a Select has an ORDER BY
+    '''
+    stack = [condition]
+    while len(stack) > 0:
+        node = stack.pop()
+        if isinstance(node, Order):
+            return True
+        if hasattr(node, '__terms__'):
+            operator, children, trailing = node.__terms__()
+            stack.extend(trailing)
+            stack.extend(c for c in children if not c is node and
+                         not isinstance(c, Clause))
+    return False
+
 class Exists(Condition):
     '''
     :Description:
         Appends the IF EXISTS or IF NOT EXISTS sql condition when handling 
         tables or columns.
     '''
+    __slots__ = ('exists', 'conditions')
     
     def __init__(self, exists=True, conditions = []):
         super().__init__('', '', '')
@@ -464,6 +1460,12 @@ class Exists(Condition):
         else:
             return "IF NOT EXISTS"
     
+    def __compile__(self, compiler):
+        return str(self)
+    
+    def __shape__(self, compiler):
+        return (type(self), str(self))
+    
 class Value(Sql):
     '''
     :Description:
@@ -485,6 +1487,7 @@ class Value(Sql):
         
         where '2004-01-01 02:34:56' is the output of a str(datetime) object type
     '''
+    __slots__ = ('value',)
     def __init__(self, *args, **kwargs):
         '''
         :Parameters:
@@ -493,21 +1496,11 @@ class Value(Sql):
         '''
         if len(args) < 1:
             raise InvalidSqlValueException('Non-existant values in initialization')
-        else:
-            self.value = args
-        wastuple = False
-        if isinstance(self.value, tuple):
-            self.value = list(self.value)
-            wastuple = True
-            
+        # The arguments tuple is kept as it is, only copied when sanitized
         if kwargs.get('sanitize_quotes', False):
-            for i in range(len(self.value)):
-                if isinstance(self.value[i], str):
-                    self.value[i] = self.value[i].replace("'", "U+0027")
-        if wastuple:
-            self.value = tuple(self.value)
-            # We want to keep tuple format, but it cannot be changed unless it's
-            # a list. We reconvert it here after any modifications are possible
+            args = tuple(v.replace("'", "U+0027") if isinstance(v, str) else v
+                         for v in args)
+        self.value = args
         
         
     def __repr__(self):
@@ -522,6 +1515,25 @@ class Value(Sql):
         if isinstance(self.value, dt.datetime):
             return "'{}'".format(self.value.strftime("%Y-%M-%D %H-%m-%S"))
         return str(self.value) # FIXME
+    
+    def __compile__(self, compiler):
+        value = self.value
+        if isinstance(value, tuple) or isinstance(value, list):
+            if len(value) == 1:
+                value = value[0]
+        # A list of values, such as Value(ids) in a WhereIn, binds each item
+        if isinstance(value, tuple) or isinstance(value, list):
+            return "({})".format(', '.join(compiler.bind(v) for v in value))
+        return compiler.bind(value)
+    
+    def __shape__(self, compiler):
+        value = self.value
+        if isinstance(value, tuple) or isinstance(value, list):
+            if len(value) == 1:
+                value = value[0]
+        if isinstance(value, tuple) or isinstance(value, list):
+            return (type(self), tuple(compiler.bind(v) for v in value))
+        return (type(self), compiler.bind(value))
 #         if isinstance(self.value, int):
 #             return str(self.value)
 #         elif isinstance(self.value, list):
@@ -535,6 +1547,33 @@ class Value(Sql):
 #             return "'{}'".format(self.value)
 #         return "{}: {}".format(self.value, type(self.value))
     
+class Param(Sql):
+    '''
+    :Description:
+        Named placeholder for a value given later, when a prepared statement
+        is called (see Sql.prepare() and squallprepare). Used wherever a
+        Value() would be:
+        
+        Where('id', '=', Param('id'))
+        >> WHERE id = :id
+        
+        Compiles to a placeholder like any Value(); the compiler binds the
+        Param itself, which the prepared statement replaces by the value
+        of that name on every call.
+    '''
+    __slots__ = ('name',)
+    def __init__(self, name):
+        self.name = name
+        
+    def __repr__(self):
+        return ':{}'.format(self.name)
+    
+    def __compile__(self, compiler):
+        return compiler.bind(self)
+    
+    def __shape__(self, compiler):
+        return (type(self), compiler.bind(self))
+    
 class Type(Sql):
     '''
     :Description:
@@ -543,6 +1582,7 @@ class Type(Sql):
         If a Type object is not specified, the python variable instancetype 
         is used instead.
     '''
+    __slots__ = ('typename',)
     def __init__(self, typename, *args, **kwargs):
         self.typename = typename
    
@@ -555,6 +1595,7 @@ class Key(Sql):
         Defines an attribute of a field column specified in the
         Table() object.
     '''
+    __slots__ = ()
     def __init__(self):
         pass
         
@@ -567,6 +1608,7 @@ class PrimaryKey(Key):
         
         FIXME: Not implemented
     '''
+    __slots__ = ()
     def __init__(self, order='', *args, **kwargs):
         pass
     
@@ -580,6 +1622,7 @@ class ForeignKey(Key):
         
         FIXME: Not implemented
     '''
+    __slots__ = ('table', 'field')
     
     def __init__(self, table, field, *args, **kwargs):
         self.table = table
@@ -591,18 +1634,122 @@ class Table(Sql):
     '''
     :Description:
         A class that represents a table name.
+        
+    :Parameters:
+        - table: string; name of the table
+        - alias: string; name the rest of the statement uses for the
+          table, see Join and Fields(..., table=)
     '''
-    def __init__(self, table):
+    __slots__ = ('table', 'alias')
+    def __init__(self, table, alias=None):
         self.table = table
+        self.alias = alias
         
     def __repr__(self):
+        if not self.alias is None:
+            return '{} AS {}'.format(self.table, self.alias)
         return str(self.table)
     
+    def __shape__(self, compiler):
+        return (type(self), compiler.process(self.table), self.alias)
+    
+class Join(Sql):
+    '''
+    :Description:
+        Tables joined on a condition, given to a Select in place of its
+        Table, so related rows come back in one statement instead of one
+        Select per parent row:
+        
+            users = Table('users', alias='u')
+            orders = Table('orders', alias='o')
+            Select(LeftJoin(users, orders, Condition('u.id', '=', 'o.user_id')),
+                   Fields(Fields('name', table=users), Fields('total', table=orders)))
+            >> SELECT u.name, o.total FROM users AS u LEFT JOIN orders AS o ON u.id = o.user_id
+            
+        Joins nest: Join(Join(a, b, on), c, on) joins c to the rows of a
+        and b. Join is an inner join, LeftJoin, RightJoin and FullJoin are
+        outer joins and CrossJoin takes no condition. sqlite runs right and
+        full joins from 3.39 on, mysql has no full join.
+        
+    :Parameters:
+        - left: Table, Join or string; table name
+        - right: Table, Join or string; table name
+        - on: Condition, And, Or, Not or string; the join condition, see
+          ispredicate(). Values are bound like those of a Where.
+    '''
+    __slots__ = ('left', 'right', 'on')
+    
+    operator = 'INNER JOIN'
+    
+    def __init__(self, left, right, on=None):
+        tables = []
+        for table in (left, right):
+            if isinstance(table, str):
+                table = Table(table)
+            if not isinstance(table, (Table, Join)):
+                raise InvalidSqlValueException(
+                    '{} is neither a Table nor a Join'.format(str(table)))
+            tables.append(table)
+        self.left, self.right = tables
+        if (on is None) != (self.operator == 'CROSS JOIN'):
+            raise InvalidSqlConditionException(
+                'Condition <{}> does not fit a {}'.format(on, self.operator))
+        if not on is None and not ispredicate(on):
+            raise InvalidSqlConditionException('{} is not a predicate'.format(on))
+        self.on = on
+        
+    def __render__(self, compiler=None, shape=False):
+        render = str if compiler is None else compiler.process
+        if self.operator == 'FULL JOIN' and not compiler is None and \
+           compiler.dialect == 'mysql':
+            raise InvalidSqlCommandException('mysql has no FULL JOIN')
+        left, right = render(self.left), render(self.right)
+        if isinstance(self.right, Join) and not shape:
+            right = '({})'.format(right)
+        on = '' if self.on is None else render_predicate('ON', self.on, compiler, shape)
+        if shape:
+            return (type(self), left, right, on)
+        return clauses(left, self.operator, right, on)
+    
+    def __repr__(self):
+        return self.__render__()
+    
+    def __compile__(self, compiler):
+        return self.__render__(compiler)
+    
+    def __shape__(self, compiler):
+        return self.__render__(compiler, shape=True)
+    
+    
+class LeftJoin(Join):
+    __slots__ = ()
+    operator = 'LEFT JOIN'
+    
+    
+class RightJoin(Join):
+    __slots__ = ()
+    operator = 'RIGHT JOIN'
+    
+    
+class FullJoin(Join):
+    __slots__ = ()
+    operator = 'FULL JOIN'
+    
+    
+class CrossJoin(Join):
+    __slots__ = ()
+    operator = 'CROSS JOIN'
+    
+    def __init__(self, left, right):
+        super().__init__(left, right)
+    
+    
 class Field(Sql):
     '''
     :Description:
         Wrapper around column name with data type and Key() data
     '''
+    __slots__ = ()
     
 class Fields(Sql):
     '''
@@ -611,18 +1758,29 @@ class Fields(Sql):
         functionality. Represented by a comma-delimited string
         of values
     '''
+    __slots__ = ('fields', 'distinct')
     
     def __init__(self, *args, **kwargs):
         '''
         :Parameters:
-            - *args: list[string]; name of columns/fields
+            - *args: list[string]; name of columns/fields, or Fields objects
+              whose columns are added
             - **kwargs: dict;
                 - 'distinct': list[string] field names
                   Example: Fields('x', distinct=['x']) == SELECT DISTINCT x FROM tabl
+                - 'table': Table or string; qualifies every field with the
+                  alias (or name) of the table, for Selects from a Join
+                  Example: Fields('id', 'name', table=Table('users', alias='u'))
+                  == u.id, u.name
         '''
         # A Wildcard eliminates the need for any additional fields
         self.distinct = kwargs.get('distinct', [])
         self.__reload_distinction__()
+        if any(isinstance(f, Fields) for f in args):
+            args = tuple(itertools.chain.from_iterable(
+                f.fields if isinstance(f, Fields) else [f] for f in args))
+        if any(isinstance(f, Aggregate) for f in args):
+            args = tuple(str(f) if isinstance(f, Aggregate) else f for f in args)
         if len(args) == 0:
             args = '' # Empty, so INSERT statements don't fail, need empty string
         elif '*' in args:
@@ -631,6 +1789,12 @@ class Fields(Sql):
             if not type(args) in [list, tuple]:
                 raise InvalidSqlValueException(
                         'Field Value is neither a wildcard char nor a list or tuple')
+        table = kwargs.get('table')
+        if not table is None:
+            if isinstance(table, Table):
+                table = table.table if table.alias is None else table.alias
+            args = ['{}.{}'.format(table, f) for f in args]
+            self.distinct = ['{}.{}'.format(table, f) for f in self.distinct]
         self.fields = args
         
     def __reload_distinction__(self):
@@ -659,29 +1823,197 @@ class Fields(Sql):
                 return 'DISTINCT ({})'.format(', '.join(self.fields))
             # Returning fields only
             return '{}'.format(', '.join(self.fields))
+    
+    def __shape__(self, compiler):
+        return (type(self), tuple(compiler.process(f) for f in self.fields),
+                compiler.process(self.distinct))
 
 
 
+class Aggregate(Sql):
+    '''
+    :Description:
+        Aggregate function of a column, for the Fields of a grouped Select
+        and the conditions of its Having:
+        
+            Fields('customer', Count('*', alias='orders'), Sum('total'))
+            >> customer, COUNT(*) AS orders, SUM(total)
+            Count(distinct='customer')
+            >> COUNT(DISTINCT customer)
+            
+        Fields keeps the rendered function. Leave the alias out of
+        aggregates used in a Having; only the select list names its columns.
+        
+    :Parameters:
+        - field: string; column or expression aggregated, * for Count
+        - distinct: boolean or string; aggregate distinct values only, a
+          string names the column instead of field
+        - alias: string; name of the result column
+    '''
+    __slots__ = ('field', 'distinct', 'alias')
+    # SQL name of the function of the instances
+    function = None
+    
+    def __init__(self, field=None, distinct=False, alias=None):
+        if isinstance(distinct, str):
+            if not field is None and field != distinct:
+                raise InvalidSqlValueException(
+                    '{} of both {} and DISTINCT {}'.format(self.function, field, distinct))
+            field, distinct = distinct, True
+        if field is None:
+            raise InvalidSqlValueException('{} needs a column'.format(self.function))
+        if distinct and field == '*':
+            raise InvalidSqlValueException('{}(DISTINCT *) is not sql'.format(self.function))
+        self.field = field
+        self.distinct = bool(distinct)
+        self.alias = alias
+        
+    def __repr__(self):
+        sql = '{}({}{})'.format(self.function, 'DISTINCT ' if self.distinct else '', self.field)
+        if not self.alias is None:
+            return '{} AS {}'.format(sql, self.alias)
+        return sql
+    
+    
+class Count(Aggregate):
+    __slots__ = ()
+    function = 'COUNT'
+    
+    def __init__(self, field=None, distinct=False, alias=None):
+        if field is None and not isinstance(distinct, str):
+            field = '*'
+        super().__init__(field, distinct, alias)
+    
+    
+class Sum(Aggregate):
+    __slots__ = ()
+    function = 'SUM'
+    
+    
+class Avg(Aggregate):
+    __slots__ = ()
+    function = 'AVG'
+    
+    
+class Min(Aggregate):
+    __slots__ = ()
+    function = 'MIN'
+    
+    
+class Max(Aggregate):
+    __slots__ = ()
+    function = 'MAX'
+    
+
 class Group(Sql):
     '''
     :Description:
         Organises fields in Select statements based on input parameters
+        
+        Select(Table('orders'), Fields('customer', Sum('total')),
+               group=Group('customer', having=Having(Sum('total'), '>', Value(100))))
+        >> SELECT customer, SUM(total) FROM orders GROUP BY customer HAVING SUM(total) > 100
     '''
+    __slots__ = ('fields', 'having')
     def __init__(self, *args, **kwargs):
         '''
         :Parameters:
-            - *args: list[string]; field / column names
+            - *args: list[string]; field / column names, or Fields objects
+            - **kwargs: dict;
+                - having: Having or predicate; condition on the groups,
+                  rendered after the GROUP BY
         '''
-        self.fields = args
-        self.having = kwargs.get('having')
+        self.fields = tuple(itertools.chain.from_iterable(
+            f.fields if isinstance(f, Fields) else [f] for f in args))
+        if len(self.fields) == 0:
+            raise InvalidSqlValueException('Group needs the columns to group by')
+        self.having = tohaving(kwargs.get('having'))
         
     def __repr__(self):
+        if not self.having is None:
+            return 'GROUP BY {} {}'.format(', '.join(self.fields), self.having)
+        return 'GROUP BY {}'.format(', '.join(self.fields))
+    
+    def __compile__(self, compiler):
+        if not self.having is None:
+            return 'GROUP BY {} {}'.format(', '.join(self.fields),
+                                           compiler.process(self.having))
         return 'GROUP BY {}'.format(', '.join(self.fields))
     
+    def __shape__(self, compiler):
+        return (type(self), self.fields, compiler.process(self.having))
+    
+
+def tohaving(having):
+    '''
+    :Returns:
+        - Having; having given as a Having, a predicate or an sql string,
+          None for None
+    '''
+    if having is None or isinstance(having, Having):
+        return having
+    if isinstance(having, str):
+        return Having(having, '', '')
+    return Having(having)
+    
+
+class Grouping(Squall):
+    '''
+    :Description:
+        The part of a grouped Select after FROM, in the order sql takes its
+        clauses: WHERE, GROUP BY, HAVING, then what follows the predicate
+        of the Where (ORDER BY ...), see Select.tail().
+    '''
+    __slots__ = ('condition', 'group', 'having')
+    
+    def __init__(self, condition, group, having):
+        self.condition = condition
+        self.group = group
+        self.having = having
+        
+    def parts(self):
+        predicate, trailing = untrail(self.condition)
+        return [predicate, self.group, self.having] + trailing
+    
+    def __repr__(self):
+        return clauses(*[str(p) for p in self.parts() if not p is None])
+    
+    def __compile__(self, compiler):
+        return clauses(*[compiler.process(p) for p in self.parts() if not p is None])
+    
+    def __shape__(self, compiler):
+        return (type(self), tuple(compiler.process(p) for p in self.parts()))
+    
+
+def untrail(condition):
+    '''
+    :Description:
+        Separates the condition of a Select into its predicate and the
+        clauses that follow the predicate (Order, or the Group and Having
+        given as conditions of a Where).
+        
+    :Returns:
+        - tuple; (predicate without trailing conditions or None, list of the
+          trailing conditions in order)
+    '''
+    if isinstance(condition, Where):
+        trailing = [c for c in condition.conditions if not ispredicate(c)]
+        if len(trailing) == 0:
+            return condition, []
+        predicate = copy.copy(condition)
+        predicate.conditions = [c for c in condition.conditions if ispredicate(c)]
+        return predicate, trailing
+    if isinstance(condition, Condition) and not ispredicate(condition):
+        return None, [condition]
+    if condition == '':
+        return None, []
+    return condition, []
+    
 
 class Having(Where):
+    __slots__ = ()
     
-    def __init__(self, field, operator, value, **kwargs):
+    def __init__(self, field, operator=None, value=None, **kwargs):
         '''
         :Description:
             This is the equivalent of a Where clause applied to 
@@ -690,11 +2022,213 @@ class Having(Where):
         '''
         super().__init__(field, operator, value, **kwargs)
         
+    keyword = 'HAVING'
+
+
+def ispredicate(cond):
+    '''
+    :Description:
+        Whether cond renders as a boolean expression that can be joined
+        with AND/OR: predicate nodes, Where clauses, plain Conditions, sub
+        Selects and sql strings.
+    '''
+    if isinstance(cond, (Predicate, Select, str)):
+        return True
+    if isinstance(cond, Where):
+        return not isinstance(cond, Having)
+    return getattr(type(cond), '__thawed__', type(cond)) is Condition
+
+
+class Clause(object):
+    '''
+    :Description:
+        The "field operator value" part of a Where, as a leaf of the
+        predicate tree.
+    '''
+    __slots__ = ('where',)
+    
+    def __init__(self, where):
+        self.where = where
+
+
+# Binding strength of the boolean operators, leaves bind tightest
+PRECEDENCE = {'OR': 1, 'AND': 2, 'NOT': 3}
+
+
+def predicate_terms(node):
+    terms = getattr(node, '__terms__', None)
+    if terms is None:
+        return None, (node,), ()
+    return terms()
+
+
+def render_predicate(keyword, node, compiler=None, shape=False):
+    '''
+    :Description:
+        Renders a predicate tree in one pass over its nodes, without
+        recursion. Nested groups of the same operator are flattened into
+        their parent and a group is only parenthesised when it binds less
+        tightly than the operator it is an operand of.
+        
+    :Parameters:
+        - keyword: string; WHERE, HAVING or '' for the bare expression
+        - node: Condition; root of the tree
+        - compiler: Compiler; binds values instead of inlining them
+        - shape: boolean; compiler is a ShapeCompiler, return the shape
+        
+    :Returns:
+        - string; or a tuple describing the shape
+    '''
+    parts = [keyword + ' '] if keyword else []
+    trailing = []
+    # Stack of (node, precedence of the enclosing operator, its terms);
+    # separators and parentheses are pushed as (None, text, None)
+    stack = [(node, 0, predicate_terms(node))]
+    while len(stack) > 0:
+        item, precedence, terms = stack.pop()
+        if item is None:
+            parts.append(precedence)
+            continue
+        operator, children, extra = terms
+        if len(extra) > 0:
+            trailing.extend(extra)
+        if operator is None:
+            child = children[0]
+            if child is item:
+                parts.append(render_leaf(item, compiler, shape))
+            else:
+                stack.append((child, precedence, predicate_terms(child)))
+            continue
+        if operator == 'NOT':
+            # Binds tightest, so only its operand may need parentheses
+            child = children[0]
+            stack.append((child, PRECEDENCE['NOT'], predicate_terms(child)))
+            stack.append((None, 'NOT ', None))
+            continue
+        # Flatten nested groups of the same operator
+        flat = []
+        pending = list(reversed(children))
+        while len(pending) > 0:
+            child = pending.pop()
+            childterms = predicate_terms(child)
+            if childterms[0] == operator:
+                trailing.extend(childterms[2])
+                pending.extend(reversed(childterms[1]))
+            else:
+                flat.append((child, childterms))
+        strength = PRECEDENCE.get(operator, 0)
+        grouped = strength < precedence
+        if grouped:
+            stack.append((None, ')', None))
+        separator = (None, ' {} '.format(operator), None)
+        for i in range(len(flat) - 1, -1, -1):
+            stack.append((flat[i][0], strength, flat[i][1]))
+            if i > 0:
+                stack.append(separator)
+        if grouped:
+            stack.append((None, '(', None))
+    for cond in trailing:
+        parts.append(' ')
+        parts.append(render_leaf(cond, compiler, shape))
+    if shape:
+        return tuple(parts)
+    return ''.join(parts).strip()
+
+
+def render_leaf(node, compiler=None, shape=False):
+    if isinstance(node, Clause):
+        if compiler is None:
+            return Condition.__repr__(node.where)
+        if shape:
+            return Condition.__shape__(node.where, compiler)
+        return Condition.__compile__(node.where, compiler)
+    if isinstance(node, str):
+        return node[6:] if node.startswith('WHERE ') else node
+    if compiler is None:
+        text = str(node)
+    else:
+        text = compiler.process(node)
+    if isinstance(node, Select):
+        return text if shape else '({})'.format(text)
+    return text
+
+
+class Predicate(Condition):
+    '''
+    :Description:
+        Base class of the boolean predicate nodes And, Or and Not. A
+        predicate renders as a bare expression; put it in a Where or
+        Having to make a clause of it, or use it as a condition of one.
+        
+        Operands are Condition objects (Condition, Where, WhereIn, other
+        predicates), sub Selects or sql strings.
+    '''
+    __slots__ = ('conditions',)
+    # AND, OR or NOT, the operator of the instances
+    connective = None
+    
+    def __init__(self, *conditions):
+        Squall.__init__(self)
+        if len(conditions) == 0:
+            raise InvalidSqlConditionException(
+                '{} needs at least one condition'.format(type(self).__name__))
+        for cond in conditions:
+            if not ispredicate(cond):
+                raise InvalidSqlConditionException(
+                    '{} is not a predicate'.format(cond))
+        self.conditions = list(conditions)
+        self.field = ''
+        self.operator = self.connective
+        self.value = ''
+        self.rawvalue = ''
+        
+    def __terms__(self):
+        return self.operator, self.conditions, []
+    
     def __repr__(self):
-        conditions = '{}'.format(' '.join(
-            str(cond) for cond in self.conditions).replace("WHERE", self.operand))
-        return "HAVING {} {} {} {}".format(self.field, self.operator,
-                                          self.value, conditions).strip()
+        return render_predicate('', self)
+    
+    def __compile__(self, compiler):
+        return render_predicate('', self, compiler)
+    
+    def __shape__(self, compiler):
+        return (type(self), render_predicate('', self, compiler, shape=True))
+
+
+class And(Predicate):
+    '''
+    :Description:
+        Conjunction of its conditions:
+            And(Condition('x', '=', Value(1)), Condition('y', '=', Value(2)))
+            >> x = 1 AND y = 2
+    '''
+    __slots__ = ()
+    connective = 'AND'
+
+
+class Or(Predicate):
+    '''
+    :Description:
+        Disjunction of its conditions, parenthesised inside an And:
+            And(Condition('x', '=', Value(1)), Or('y = 2', 'z = 3'))
+            >> x = 1 AND (y = 2 OR z = 3)
+    '''
+    __slots__ = ()
+    connective = 'OR'
+
+
+class Not(Predicate):
+    '''
+    :Description:
+        Negation of a single condition:
+            Not(Or('y = 2', 'z = 3'))
+            >> NOT (y = 2 OR z = 3)
+    '''
+    __slots__ = ()
+    connective = 'NOT'
+    
+    def __init__(self, condition):
+        super().__init__(condition)
 
 class Verbatim(Sql):
     '''
@@ -710,9 +2244,27 @@ class Verbatim(Sql):
         If more or fewer ?'s exist than params has in length, 
         an error is raised. 
     '''
-    # TODO
-    def __init__(self, sql):
+    __slots__ = ('sql', 'params')
+    def __init__(self, sql, params=()):
         self.sql = sql
+        self.params = tuple(params)
         
     def __repr__(self):
         return "{}".format(self.sql)
+    
+    def __compile__(self, compiler):
+        if len(self.params) == 0:
+            return str(self)
+        parts = self.sql.split('?')
+        if len(parts) - 1 != len(self.params):
+            raise InvalidSqlValueException(
+                'Verbatim sql has {} placeholders but {} params'.format(
+                    len(parts) - 1, len(self.params)))
+        sql = [parts[0]]
+        for i in range(len(self.params)):
+            sql.append(compiler.bind(self.params[i]))
+            sql.append(parts[i + 1])
+        return ''.join(sql)
+    
+    def __shape__(self, compiler):
+        return (type(self), self.sql, tuple(compiler.bind(p) for p in self.params))
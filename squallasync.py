@@ -0,0 +1,115 @@
+'''
+:Description:
+    Module that contains the AsyncSqlAdapter, awaitable counterparts of
+    running transactions and streaming selects for asyncio applications.
+
+    Neither sqlite3 nor pyodbc has a native asyncio interface, so driver
+    calls run on a bounded thread pool and the event loop only awaits them.
+    Each call leases its own pooled connection, so the adapter has to be
+    connected with pool parameters (see squallpool).
+
+    Example:
+        sqlobj = squallsql.SqlAdapter(driver='squallsqlite3')
+        sqlobj.Connect(database='app.db', pool_max=16)
+        adapter = sqlobj.Async() # or AsyncSqlAdapter(sqlobj)
+        output = await adapter.run(sqlobj.Transaction(select))
+        async for row in adapter.stream(select):
+            ...
+'''
+import asyncio
+import concurrent.futures
+import functools
+import threading
+from squallerrors import AdapterException
+
+
+class AsyncSqlAdapter(object):
+    '''
+    :Description:
+        Runs squall transactions and selects from asyncio code without
+        blocking the event loop.
+
+    :Parameters:
+        - adapter: object; squallsql.SqlAdapter or a database specific
+          SqlAdapter, connected with a connection pool
+        - max_workers: int; number of driver calls in flight at once.
+          Defaults to the pool's maximum size; more workers than pooled
+          connections would only wait on the pool.
+    '''
+
+    def __init__(self, adapter, max_workers=None):
+        self.adapter = getattr(adapter, 'sqladapter', adapter)
+        if self.adapter.pool is None:
+            raise AdapterException(
+                'The asyncio API needs an adapter connected with a connection pool, '
+                'e.g. Connect(..., pool_max=8)')
+        if max_workers is None:
+            max_workers = self.adapter.pool.maxsize
+        self.executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix='squall')
+
+    async def run(self, transaction, **kwargs):
+        '''
+        :Description:
+            Awaitable transaction.run(). If the awaiting task is cancelled
+            before the transaction commits, the transaction is rolled back on
+            its worker thread and the cancellation is re-raised once the
+            rollback has finished.
+
+        :Parameters:
+            - transaction: transaction object of the adapter
+            - **kwargs: dict; passed on to transaction.run()
+
+        :Returns:
+            - dict; the transaction's output
+        '''
+        loop = asyncio.get_running_loop()
+        cancel = threading.Event()
+        future = loop.run_in_executor(
+            self.executor, functools.partial(transaction.run, cancel=cancel, **kwargs))
+        try:
+            return await asyncio.shield(future)
+        except asyncio.CancelledError:
+            cancel.set()
+            try:
+                # Wait for the worker to roll back (or finish committing)
+                await future
+            except Exception:
+                pass
+            raise
+
+    async def stream(self, select, batchsize=None):
+        '''
+        :Description:
+            Asynchronous generator over the rows of a Select, fetched in
+            batches on a worker thread. The pooled connection is held until
+            the generator is exhausted or closed.
+
+        :Parameters:
+            - select: Select object
+            - batchsize: int; rows per fetchmany() call, None for adaptive
+        '''
+        loop = asyncio.get_running_loop()
+
+        def execute():
+            with self.adapter.checkout():
+                sql, params = self.adapter.compile(select)
+                return self.adapter.stream(sql, params, batchsize)
+
+        stream = await loop.run_in_executor(self.executor, execute)
+        try:
+            while True:
+                batch = await loop.run_in_executor(self.executor, stream.nextbatch)
+                if len(batch) == 0:
+                    break
+                for row in batch:
+                    yield row
+        finally:
+            await asyncio.shield(loop.run_in_executor(self.executor, stream.close))
+
+    def close(self, wait=True):
+        '''
+        :Description:
+            Shuts the worker threads down.
+        '''
+        self.executor.shutdown(wait=wait)
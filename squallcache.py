@@ -0,0 +1,315 @@
+'''
+:Description:
+    Module that contains the read-through result cache of Selects.
+
+    Selects on slowly changing lookup tables return the same rows over and
+    over. With a ResultCache, a transaction looks the rows of a Select up by
+    its compiled sql and parameters before executing it, and stores what it
+    fetched on a miss. Entries expire after ttl seconds and the least
+    recently used ones are evicted once the rows held take more than
+    maxbytes.
+
+    Every entry remembers the tables its Select reads, including those of
+    sub selects. When a transaction that wrote to a table (Insert, Update,
+    Delete, BulkInsert, Create or Drop) commits, the entries of that table
+    are dropped. Verbatim sql can write to anything, so committing one
+    drops the whole cache. Only writes made through squall are seen: rows
+    changed by another program stay cached until they expire.
+
+    A Select that reads a table its own transaction already wrote to is not
+    cached, and rows fetched while a table was invalidated are not stored.
+
+    Example:
+        sqlobj = squallsql.SqlAdapter(driver='squallsqlite3', result_cache=True,
+                                      result_cache_bytes=16 * 1024 * 1024,
+                                      result_cache_ttl=30)
+        sqlobj.CacheStats() # hit ratio, bytes used, evictions
+'''
+from collections import OrderedDict
+import sys
+import threading
+import time
+from squall import Squall, Select, Insert, BulkInsert, Update, Delete, Drop, Create, \
+                   Table, Verbatim, attributes
+
+# Stands for every table, e.g. what Verbatim sql writes to
+ALL = '*'
+
+
+def tablename(name):
+    '''
+    :Returns:
+        - string; the table of name without schema, alias or quotes,
+          lowercase: 'dbo.[Users] u' gives 'users'
+    '''
+    name = str(name).split()
+    if len(name) == 0:
+        return ''
+    return name[0].split('.')[-1].strip('[]"`').lower()
+
+
+def tables(statement):
+    '''
+    :Description:
+        Walks statement without recursion for the tables it reads or writes.
+
+    :Returns:
+        - frozenset; table names, see tablename(), or ALL for Verbatim sql
+    '''
+    names = set()
+    stack = [statement]
+    while len(stack) > 0:
+        node = stack.pop()
+        if isinstance(node, (list, tuple)):
+            stack.extend(node)
+            continue
+        if isinstance(node, Verbatim):
+            return frozenset([ALL])
+        if isinstance(node, Table):
+            names.add(tablename(node.table))
+            continue
+        if not isinstance(node, Squall):
+            continue
+        if isinstance(node, (Select, Insert, Update, Delete, Drop, Create)) and \
+           isinstance(node.table, str):
+            names.add(tablename(node.table))
+        if isinstance(node, BulkInsert):
+            # Rows only hold values
+            stack.append(node.table)
+            continue
+        stack.extend(value for name, value in attributes(node))
+    names.discard('')
+    return frozenset(names)
+
+
+def sizeof(rows):
+    '''
+    :Returns:
+        - int; approximate bytes held by a list of rows
+    '''
+    size = sys.getsizeof(rows)
+    for row in rows:
+        size += sys.getsizeof(row)
+        for value in row:
+            size += sys.getsizeof(value)
+    return size
+
+
+class Entry(object):
+    __slots__ = ('rows', 'size', 'expires', 'tables')
+
+    def __init__(self, rows, size, expires, tables):
+        self.rows = rows
+        self.size = size
+        self.expires = expires
+        self.tables = tables
+
+
+class Lookup(object):
+    '''
+    :Description:
+        Result of ResultCache.lookup(): the cached rows, or None on a miss,
+        and what store() needs to keep the rows fetched instead.
+    '''
+    __slots__ = ('cache', 'key', 'tables', 'ticket', 'rows')
+
+    def __init__(self, cache, key, tables, ticket, rows):
+        self.cache = cache
+        self.key = key
+        self.tables = tables
+        self.ticket = ticket
+        self.rows = rows
+
+    def store(self, rows):
+        self.cache.store(self, rows)
+
+
+class ResultCache(object):
+    '''
+    :Description:
+        Thread-safe least recently used cache of Select rows, bounded in
+        bytes, with expiry and invalidation by table.
+
+    :Parameters:
+        - maxbytes: int; approximate bytes of rows kept, see sizeof()
+        - ttl: float; seconds an entry is used for, None for no expiry
+    '''
+
+    def __init__(self, maxbytes=64 * 1024 * 1024, ttl=60):
+        self.maxbytes = maxbytes
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+        # Keys of the entries that read each table
+        self.index = {}
+        # Bumped by every invalidation, see lookup()
+        self.epoch = 0
+        self.versions = {}
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def lookup(self, tables, sql, params):
+        '''
+        :Parameters:
+            - tables: frozenset; the tables the Select reads, see tables()
+            - sql: string; compiled sql
+            - params: tuple or dict; its parameters
+
+        :Returns:
+            - Lookup; or None if the parameters cannot make a key
+        '''
+        key = (sql, tuple(sorted(params.items())) if isinstance(params, dict)
+               else tuple(params))
+        try:
+            hash(key)
+        except TypeError:
+            return None
+        with self.lock:
+            entry = self.entries.get(key)
+            if not entry is None and not entry.expires is None and \
+               entry.expires <= time.monotonic():
+                self.remove(key)
+                self.expirations += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                # Rows fetched after this are only stored if none of the
+                # tables were invalidated in the meantime
+                ticket = (self.epoch, tuple(self.versions.get(t, 0) for t in tables))
+                return Lookup(self, key, tables, ticket, None)
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return Lookup(self, key, tables, None, list(entry.rows))
+
+    def store(self, lookup, rows):
+        '''
+        :Description:
+            Keeps the rows fetched after a missed lookup.
+        '''
+        size = sizeof(rows)
+        if size > self.maxbytes:
+            return
+        expires = None if self.ttl is None else time.monotonic() + self.ttl
+        with self.lock:
+            if lookup.ticket != (self.epoch, tuple(self.versions.get(t, 0)
+                                                   for t in lookup.tables)):
+                return
+            if lookup.key in self.entries:
+                self.remove(lookup.key)
+            self.entries[lookup.key] = Entry(list(rows), size, expires, lookup.tables)
+            self.bytes += size
+            for table in lookup.tables:
+                self.index.setdefault(table, set()).add(lookup.key)
+            while self.bytes > self.maxbytes:
+                self.remove(next(iter(self.entries)))
+                self.evictions += 1
+
+    def remove(self, key):
+        # Called with the lock held
+        entry = self.entries.pop(key)
+        self.bytes -= entry.size
+        for table in entry.tables:
+            keys = self.index.get(table)
+            if not keys is None:
+                keys.discard(key)
+                if len(keys) == 0:
+                    del self.index[table]
+
+    def invalidate(self, tables):
+        '''
+        :Description:
+            Drops the entries that read any of tables; ALL drops every entry.
+        '''
+        if len(tables) == 0:
+            return
+        with self.lock:
+            if ALL in tables:
+                self.epoch += 1
+                self.invalidations += len(self.entries)
+                self.entries.clear()
+                self.index.clear()
+                self.bytes = 0
+                return
+            for table in tables:
+                self.versions[table] = self.versions.get(table, 0) + 1
+                for key in list(self.index.get(table, ())):
+                    self.remove(key)
+                    self.invalidations += 1
+
+    def clear(self):
+        self.invalidate([ALL])
+
+    def stats(self):
+        '''
+        :Returns:
+            - dict; entries, bytes, maxbytes, ttl, hits, misses, hit_ratio,
+              evictions, expirations and invalidations of the cache
+        '''
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {'entries': len(self.entries),
+                    'bytes': self.bytes,
+                    'maxbytes': self.maxbytes,
+                    'ttl': self.ttl,
+                    'hits': self.hits,
+                    'misses': self.misses,
+                    'hit_ratio': self.hits / lookups if lookups else 0.0,
+                    'evictions': self.evictions,
+                    'expirations': self.expirations,
+                    'invalidations': self.invalidations}
+
+
+class CachingAdapter(object):
+    '''
+    :Description:
+        Mixin for database specific SqlAdapter classes with an optional
+        ResultCache in results. Transactions ask it for the rows of their
+        Selects and tell it the tables they wrote to once they commit.
+    '''
+    results = None
+
+    def writes(self, statement):
+        '''
+        :Returns:
+            - frozenset; tables statement writes to, empty without a cache
+        '''
+        if self.results is None or isinstance(statement, Select):
+            return frozenset()
+        return tables(statement)
+
+    def lookup(self, select, sql, params, written=()):
+        '''
+        :Parameters:
+            - select: Select; the statement sql was compiled from
+            - written: set; tables its transaction wrote to so far
+
+        :Returns:
+            - Lookup; or None when the Select is not cached
+        '''
+        if self.results is None:
+            return None
+        names = tables(select)
+        if ALL in names or ALL in written or not names.isdisjoint(written):
+            return None
+        return self.results.lookup(names, sql, params)
+
+    def invalidate(self, tables):
+        '''
+        :Description:
+            Drops the cached rows of tables, once writes to them committed.
+        '''
+        if not self.results is None:
+            self.results.invalidate(tables)
+
+    def cachestats(self):
+        '''
+        :Returns:
+            - dict; see ResultCache.stats(), None without a cache
+        '''
+        if self.results is None:
+            return None
+        return self.results.stats()
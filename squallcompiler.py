@@ -0,0 +1,197 @@
+'''
+:Description:
+    Module that compiles squall objects into parameterized sql.
+
+    Rendering a squall object with str() inlines every Value() literal
+    into the sql text, so two statements that only differ by their values
+    produce two different sql strings. The Compiler in this module instead
+    renders placeholders in the paramstyle the database driver expects and
+    collects the literals into a separate parameter sequence that is handed
+    to cursor.execute(sql, params).
+
+    Every squall object implements __compile__(compiler) and returns its
+    sql text; objects that hold values call compiler.bind(value) to get
+    a placeholder back. Objects whose sql differs between databases look at
+    compiler.dialect, the dialect attribute of the adapter compiling them.
+'''
+from collections import OrderedDict
+import threading
+from squallerrors import InvalidParamStyleException
+
+# DB-API 2.0 paramstyles, see PEP 249
+PARAMSTYLES = {'qmark': '?',
+               'numeric': ':{}',
+               'named': ':p{}',
+               'format': '%s',
+               'pyformat': '%(p{})s'}
+
+
+class Compiler(object):
+    '''
+    :Description:
+        Walks a squall object tree once and produces a (sql, params) pair.
+        A Compiler instance collects parameters as it goes, so use a new
+        one per statement.
+
+    :Parameters:
+        - paramstyle: string; one of the DB-API paramstyles found in
+          PARAMSTYLES. Drivers advertise this as module.paramstyle
+          (sqlite3 and pyodbc both use 'qmark').
+        - dialect: string; dialect of the adapter, e.g. 'sqlite3' or
+          'sqlserver'. None renders the same sql as str() does.
+    '''
+
+    def __init__(self, paramstyle='qmark', dialect=None):
+        if not paramstyle in PARAMSTYLES:
+            raise InvalidParamStyleException(
+                'Paramstyle <{}> is not supported'.format(paramstyle))
+        self.paramstyle = paramstyle
+        self.dialect = dialect
+        self.placeholder = PARAMSTYLES[paramstyle]
+        self.params = []
+
+    def bind(self, value):
+        '''
+        :Description:
+            Adds value to the parameter list.
+
+        :Returns:
+            - string; the placeholder to put into the sql text
+        '''
+        self.params.append(value)
+        return self.placeholder.format(len(self.params))
+
+    def process(self, obj):
+        '''
+        :Description:
+            Compiles any part of a squall tree. Squall objects compile
+            themselves, anything else (strings, column names) is rendered
+            as-is, the same way str() would.
+        '''
+        if hasattr(obj, '__compile__'):
+            return obj.__compile__(self)
+        return str(obj)
+
+    def parameters(self):
+        '''
+        :Returns:
+            - tuple for positional paramstyles or dict for named ones
+        '''
+        if self.paramstyle in ('named', 'pyformat'):
+            return dict(('p{}'.format(i + 1), v) for i, v in enumerate(self.params))
+        return tuple(self.params)
+
+    def compile(self, sqlobject):
+        '''
+        :Returns:
+            - tuple; (sql string, parameters)
+        '''
+        sql = self.process(sqlobject)
+        return sql, self.parameters()
+
+
+# Marker that stands in for a bound value inside a shape key
+BIND = object()
+
+
+class ShapeCompiler(Compiler):
+    '''
+    :Description:
+        Walks a squall object tree and builds a hashable key describing its
+        structure (node types, tables, fields, operators) while collecting the
+        values that would be bound, without rendering any sql text.
+
+        Two trees with the same shape compile to the same sql, so the key
+        can be used to look up a previously compiled template. Objects
+        implement __shape__(compiler) and must visit their children in the
+        same order as their __compile__ does, so parameters line up.
+    '''
+
+    def bind(self, value):
+        self.params.append(value)
+        return BIND
+
+    def process(self, obj):
+        if hasattr(obj, '__shape__'):
+            return obj.__shape__(self)
+        if isinstance(obj, list):
+            return tuple(self.process(x) for x in obj)
+        return obj
+
+    def compile(self, sqlobject):
+        '''
+        :Returns:
+            - tuple; (shape key, parameters)
+        '''
+        shape = self.process(sqlobject)
+        return shape, self.parameters()
+
+
+class StatementCache(object):
+    '''
+    :Description:
+        Least recently used cache of compiled sql templates keyed by the
+        shape of the squall tree that produced them. On a hit the tree is
+        only walked to collect its values; the sql text is reused.
+
+    :Parameters:
+        - maxsize: int; maximum number of templates kept before the least
+          recently used one is evicted.
+    '''
+
+    def __init__(self, maxsize=512):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def compile(self, sqlobject, paramstyle='qmark', dialect=None):
+        '''
+        :Description:
+            Drop in replacement for
+            Compiler(paramstyle, dialect).compile(sqlobject)
+
+        :Returns:
+            - tuple; (sql string, parameters)
+        '''
+        shape, params = ShapeCompiler(paramstyle, dialect).compile(sqlobject)
+        key = (paramstyle, dialect, shape)
+        try:
+            with self.lock:
+                sql = self.entries.get(key)
+                if not sql is None:
+                    self.entries.move_to_end(key)
+                    self.hits += 1
+                    return sql, params
+                self.misses += 1
+        except TypeError:
+            # Something unhashable ended up in the shape, don't cache it
+            with self.lock:
+                self.misses += 1
+            return Compiler(paramstyle, dialect).compile(sqlobject)
+
+        sql, params = Compiler(paramstyle, dialect).compile(sqlobject)
+        with self.lock:
+            self.entries[key] = sql
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+        return sql, params
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def stats(self):
+        '''
+        :Returns:
+            - dict; size, maxsize, hits, misses and evictions of the cache
+        '''
+        with self.lock:
+            return {'size': len(self.entries),
+                    'maxsize': self.maxsize,
+                    'hits': self.hits,
+                    'misses': self.misses,
+                    'evictions': self.evictions}
@@ -57,4 +57,32 @@ class InvalidDistinctFieldFormat(AdapterException):
         
 class NotImplementedException(AdapterException):
     def __init__(self, message):
-        AdapterException.__init__(self, message)
\ No newline at end of file
+        AdapterException.__init__(self, message)
+        
+class InvalidParamStyleException(AdapterException):
+    def __init__(self, message):
+        AdapterException.__init__(self, message)
+        
+class PoolTimeoutException(AdapterException):
+    def __init__(self, message):
+        AdapterException.__init__(self, message)
+        
+class PoolClosedException(AdapterException):
+    def __init__(self, message):
+        AdapterException.__init__(self, message)
+        
+class TransactionCancelledException(AdapterException):
+    def __init__(self, message):
+        AdapterException.__init__(self, message)
+        
+class GroupCommitClosedException(AdapterException):
+    def __init__(self, message):
+        AdapterException.__init__(self, message)
+        
+class ImmutableSquallObjectException(AdapterException):
+    def __init__(self, message):
+        AdapterException.__init__(self, message)
+        
+class InvalidParameterException(AdapterException):
+    def __init__(self, message):
+        AdapterException.__init__(self, message)
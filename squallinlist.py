@@ -0,0 +1,320 @@
+'''
+:Description:
+    Module that contains the strategies transactions use to run a WhereIn
+    with a long list of values.
+
+    Every value of a WhereIn list is a bound parameter, which is fine for a
+    few hundred ids but not for fifty thousand: the statement runs into the
+    database's parameter cap and its plan is never reused. An InListPlanner
+    picks a strategy by the length of the longest list in a statement:
+
+        - params: lists of up to `params` values are bound as parameters,
+          as they always were
+        - chunks: a Select whose list is only ANDed with the rest of its
+          condition runs once per chunk of `params` values and the rows of
+          the chunks are concatenated; every row matches exactly one chunk,
+          so this is the union of the chunk results. Used for lists of up to
+          `chunks` values, when the Select has no ORDER BY, GROUP BY, HAVING,
+          DISTINCT, Limit or aggregate that would need the rows all at once
+        - table: the values are loaded into a temporary table and the list
+          is replaced by field IN (SELECT v FROM <temporary table>)
+        - tvp: on Sql Server, given the name of a table type with a single
+          column, the values are sent as one table-valued parameter instead
+
+    The strategy used and the thresholds are reported in the 'inlist' entry
+    of the statement event (see squallinstrument).
+
+    Example:
+        sqlobj = squallsql.SqlAdapter(driver='squallsqlite3',
+                                      inlist_params=500, inlist_chunks=5000)
+'''
+import copy
+import re
+from squall import Condition, Where, WhereIn, Select, Update, Delete, \
+                   Table, Fields, Clause, predicate_terms
+
+PARAMS, CHUNKS, TABLE, TVP = 'params', 'chunks', 'table', 'tvp'
+
+# Fields that make a Select need all of its rows at once
+WHOLE = re.compile(r'\b(?:DISTINCT|COUNT|SUM|AVG|MIN|MAX|TOTAL|GROUP_CONCAT|STRING_AGG)\b',
+                   re.IGNORECASE)
+
+
+class InList(object):
+    '''
+    :Description:
+        A WhereIn of a statement whose list is longer than the planner's
+        parameter threshold.
+
+    :Parameters:
+        - wherein: WhereIn; the node
+        - path: list; nodes from the statement down to the WhereIn's parent
+        - conjunctive: boolean; whether every node on the path joins the
+          WhereIn with AND
+    '''
+    __slots__ = ('wherein', 'path', 'conjunctive')
+
+    def __init__(self, wherein, path, conjunctive):
+        self.wherein = wherein
+        self.path = path
+        self.conjunctive = conjunctive
+
+    @property
+    def values(self):
+        return self.wherein.rawvalue
+
+
+class TableParameter(Select):
+    '''
+    :Description:
+        Sub select of the values of a table-valued parameter, the stand in
+        for a list sent with the tvp strategy:
+            (SELECT v FROM ?)
+
+    :Parameters:
+        - typename: string; table type, e.g. 'dbo.SquallIds'
+        - values: list; one row is sent per value
+    '''
+
+    def __init__(self, typename, values):
+        super().__init__(Table('?'), Fields('v'))
+        self.typename = typename
+        self.values = values
+
+    def parameter(self):
+        '''
+        :Returns:
+            - list; the parameter in the form pyodbc expects for a table
+              type outside of a stored procedure: type name and schema
+              first, then the rows
+        '''
+        schema, name = self.typename.rsplit('.', 1) if '.' in self.typename \
+                       else ('dbo', self.typename)
+        return [name, schema] + [(v,) for v in self.values]
+
+    def __repr__(self):
+        return 'SELECT v FROM ?'
+
+    def __compile__(self, compiler):
+        return 'SELECT v FROM {}'.format(compiler.bind(self.parameter()))
+
+    def __shape__(self, compiler):
+        return (type(self), compiler.bind(self.parameter()))
+
+
+class InListPlan(object):
+    '''
+    :Description:
+        The strategy chosen for a statement and the lists it applies to.
+    '''
+
+    def __init__(self, planner, statement, strategy, inlists):
+        self.planner = planner
+        self.statement = statement
+        self.strategy = strategy
+        self.inlists = inlists
+
+    def size(self):
+        return max(len(inlist.values) for inlist in self.inlists)
+
+    def chunked(self):
+        '''
+        :Returns:
+            - generator; the statement once per chunk of the list's values
+        '''
+        inlist = self.inlists[0]
+        values = unique(inlist.values)
+        step = self.planner.params
+        for i in range(0, len(values), step):
+            yield rewrite(self.statement, [(inlist, values[i:i + step])])
+
+    def substituted(self, tables):
+        '''
+        :Parameters:
+            - tables: list; one temporary table name or TableParameter per
+              list, in the order of self.inlists
+
+        :Returns:
+            - the statement with every list replaced by a sub select of its
+              table
+        '''
+        return rewrite(self.statement,
+                       [(inlist, Select(Table(table), Fields('v')) if isinstance(table, str)
+                         else table)
+                        for inlist, table in zip(self.inlists, tables)])
+
+    def parameters(self):
+        '''
+        :Returns:
+            - list; a TableParameter per list, for the tvp strategy
+        '''
+        return [TableParameter(self.planner.tvp, unique(inlist.values))
+                for inlist in self.inlists]
+
+    def report(self):
+        '''
+        :Returns:
+            - dict; the 'inlist' entry of the statement event
+        '''
+        return {'strategy': self.strategy,
+                'values': self.size(),
+                'lists': len(self.inlists),
+                'params': self.planner.params,
+                'chunks': self.planner.chunks}
+
+
+class InListPlanner(object):
+    '''
+    :Description:
+        Chooses how a statement's long WhereIn lists are run.
+
+    :Parameters:
+        - params: int; lists of up to this many values are bound as
+          parameters, and chunks hold this many values
+        - chunks: int; lists of up to this many values may be run in chunks,
+          longer ones go through a temporary table
+        - tvp: string; Sql Server table type used instead of a temporary
+          table, e.g. 'dbo.SquallIds', see the squallserver adapter
+    '''
+
+    def __init__(self, params=500, chunks=5000, tvp=None):
+        self.params = max(int(params), 1)
+        self.chunks = max(int(chunks), self.params)
+        self.tvp = tvp
+
+    def plan(self, statement, stream=False):
+        '''
+        :Parameters:
+            - statement: Select, Update or Delete
+            - stream: boolean; the rows are streamed from a single cursor
+
+        :Returns:
+            - InListPlan; or None when every list fits in parameters
+        '''
+        inlists = find(statement, self.params)
+        if len(inlists) == 0:
+            return None
+        size = max(len(inlist.values) for inlist in inlists)
+        if size <= self.chunks and not stream and len(inlists) == 1 and \
+           inlists[0].conjunctive and chunkable(statement) and \
+           hashable(inlists[0].values):
+            return InListPlan(self, statement, CHUNKS, inlists)
+        return InListPlan(self, statement, TABLE if self.tvp is None else TVP, inlists)
+
+
+def find(statement, minimum):
+    '''
+    :Description:
+        Walks the condition tree of statement without recursion.
+
+    :Returns:
+        - list; InList for every WhereIn with more than minimum values
+    '''
+    if not isinstance(statement, (Select, Update, Delete)):
+        return []
+    condition = getattr(statement, 'condition', None)
+    if not isinstance(condition, Condition):
+        return []
+    found = []
+    # (node, index of its parent in visited, joined to the statement by AND)
+    visited = [(statement, None, True)]
+    stack = [(condition, 0, True)]
+    while len(stack) > 0:
+        node, parent, conjunctive = stack.pop()
+        if isinstance(node, WhereIn):
+            if isinstance(node.rawvalue, (list, tuple)) and len(node.rawvalue) > minimum:
+                path = []
+                while not parent is None:
+                    path.append(visited[parent][0])
+                    parent = visited[parent][1]
+                found.append(InList(node, path[::-1], conjunctive))
+            continue
+        if not isinstance(node, Condition):
+            continue
+        operator, children, trailing = predicate_terms(node)
+        index = len(visited)
+        visited.append((node, parent, conjunctive))
+        conjunctive = conjunctive and operator in (None, 'AND')
+        for child in reversed(children):
+            if not child is node and not isinstance(child, Clause):
+                stack.append((child, index, conjunctive))
+    return found
+
+
+def chunkable(statement):
+    if not isinstance(statement, Select) or statement.existsflag:
+        return False
+    # The chunks would each return up to the limit, or groups of their rows
+    if not statement.limit is None or not statement.group is None or \
+       not statement.having is None:
+        return False
+    if WHOLE.search(str(statement.fields)):
+        return False
+    # ORDER BY, GROUP BY and HAVING follow the predicate as trailing conditions
+    stack = [statement.condition]
+    while len(stack) > 0:
+        operator, children, trailing = predicate_terms(stack.pop())
+        if len(trailing) > 0:
+            return False
+        stack.extend(c for c in children if isinstance(c, Condition) and
+                     not isinstance(c, WhereIn) and hasattr(c, '__terms__'))
+    return True
+
+
+def hashable(values):
+    try:
+        set(values)
+    except TypeError:
+        return False
+    return True
+
+
+def unique(values):
+    '''
+    :Returns:
+        - list; values without duplicates, in their first order
+    '''
+    if not hashable(values):
+        return list(values)
+    return list(dict.fromkeys(values))
+
+
+def rewrite(statement, replacements):
+    '''
+    :Description:
+        Copies the nodes from statement down to every WhereIn replaced, so
+        the statement given is left as it was.
+
+    :Parameters:
+        - replacements: list; (InList, new values) pairs, values being a
+          list or a sub Select
+
+    :Returns:
+        - the rewritten statement
+    '''
+    copies = {}
+
+    def copied(node):
+        duplicate = copies.get(id(node))
+        if duplicate is None:
+            duplicate = copies[id(node)] = copy.copy(node)
+        return duplicate
+
+    for inlist, values in replacements:
+        node = copied(inlist.wherein)
+        node.rawvalue = values
+        node.value = node.formatValues(values)
+        child = inlist.wherein
+        for parent in reversed(inlist.path):
+            relink(copied(parent), child, copies[id(child)])
+            child = parent
+    return copies.get(id(statement), statement)
+
+
+def relink(parent, old, new):
+    if isinstance(parent, (Select, Update, Delete)):
+        parent.condition = new
+    elif isinstance(parent, Where) and parent.field is old:
+        parent.field = new
+    else:
+        parent.conditions = [new if c is old else c for c in parent.conditions]
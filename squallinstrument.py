@@ -0,0 +1,269 @@
+'''
+:Description:
+    Module that contains the statement instrumentation of the adapters:
+    the StatementEvent every execution emits, the InstrumentedAdapter
+    mixin listeners subscribe to and the SlowQueryLog listener.
+
+    An event is emitted for every driver execution a transaction makes:
+    one per statement, one per run of same-sql writes sent together with
+    executemany() and one per BulkInsert. Listeners and the postcallback
+    of the squall objects involved receive it as a dict:
+
+        - adapter: string; dialect of the adapter, e.g. 'sqlite3'
+        - sql: string; the sql that was executed
+        - fingerprint: string; the sql with literals and placeholder lists
+          collapsed, so statements that only differ by values group together
+        - statements: list; squall objects the execution ran
+        - executions: int; parameter sets (or BulkInsert chunks) sent
+        - compile_time, execute_time, fetch_time, total_time: float; seconds
+        - rowcount: int; rows fetched by a select, rows changed by a write,
+          -1 when the driver does not say
+        - error: Exception or None
+        - inlist: dict or None; the strategy used for a long WhereIn list and
+          the thresholds it was chosen by, see squallinlist
+        - cached: boolean; the rows of a Select came from the adapter's
+          result cache and nothing was executed, see squallcache
+
+    Example:
+        log = SlowQueryLog('slow.log', threshold=0.25)
+        sqlobj.Subscribe(log)
+'''
+import contextlib
+import functools
+import json
+import logging
+import logging.handlers
+import queue
+import re
+import time
+
+
+# Literals first, then runs of placeholders: '(?, ?, ?)' and multi-row
+# VALUES lists fingerprint the same whatever their length
+FINGERPRINT_RULES = [(re.compile(r"'(?:[^']|'')*'"), '?'),
+                     (re.compile(r'\b\d+(?:\.\d+)?\b'), '?'),
+                     (re.compile(r'%\(\w+\)s|%s|:\w+'), '?'),
+                     (re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)'), '(?+)'),
+                     (re.compile(r'\(\?\+\)(?:\s*,\s*\(\?\+\))+'), '(?+)+'),
+                     (re.compile(r'\s+'), ' ')]
+
+
+@functools.lru_cache(maxsize=1024)
+def fingerprint(sql):
+    '''
+    :Description:
+        Normalises sql so statements that only differ by their values, or
+        by the number of values in a list, get the same fingerprint.
+
+    :Returns:
+        - string; the normalised sql
+    '''
+    if sql is None:
+        return None
+    for pattern, replacement in FINGERPRINT_RULES:
+        sql = pattern.sub(replacement, sql)
+    return sql.strip()
+
+
+class StatementEvent(object):
+    '''
+    :Description:
+        Timings of one driver execution, filled in by the transaction that
+        makes it. Used as a context manager around the execution: entering
+        calls the precallbacks of the statements, leaving (with or without
+        an exception) calls their postcallbacks and the adapter's listeners.
+
+    :Parameters:
+        - adapter: InstrumentedAdapter; adapter the execution runs on
+        - statement: Sql; first squall object of the execution
+        - compile_time: float; seconds already spent compiling it
+    '''
+
+    def __init__(self, adapter, statement, compile_time=0.0):
+        self.adapter = adapter
+        self.statements = [statement]
+        self.sql = None
+        self.executions = 0
+        self.compile_time = compile_time
+        self.execute_time = 0.0
+        self.fetch_time = 0.0
+        self.rowcount = -1
+        self.result = None
+        self.error = None
+        self.inlist = None
+        self.cached = False
+        self.finished = False
+
+    def add(self, statement, compile_time=0.0):
+        '''
+        :Description:
+            Adds a statement sent in the same execution, e.g. a write
+            grouped into an executemany() call.
+        '''
+        self.statements.append(statement)
+        self.compile_time += compile_time
+
+    @contextlib.contextmanager
+    def timing(self, attribute):
+        '''
+        :Description:
+            Adds the time spent in the with block to compile_time,
+            execute_time or fetch_time.
+        '''
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            setattr(self, attribute,
+                    getattr(self, attribute) + time.perf_counter() - start)
+
+    def executing(self, sql=None, executions=1):
+        '''
+        :Description:
+            Sets the sql about to be executed; returns the event to be used
+            in a with statement.
+        '''
+        self.sql = sql
+        self.executions = executions
+        return self
+
+    def __enter__(self):
+        self.begin()
+        return self
+
+    def __exit__(self, exctype, error, traceback):
+        self.finish(error)
+
+    def callbacks(self, name):
+        return [c for c in (getattr(s, name, None) for s in self.statements)
+                if not c is None]
+
+    def begin(self):
+        '''
+        :Description:
+            Calls the precallback of every statement before execution.
+        '''
+        callbacks = self.callbacks('precallback')
+        if len(callbacks) > 0:
+            event = self.asdict()
+            for callback in callbacks:
+                callback(**event)
+
+    def finish(self, error=None):
+        '''
+        :Description:
+            Completes the event and hands it to the postcallbacks and
+            listeners. The event is only built when someone receives it.
+        '''
+        if self.finished:
+            return
+        self.finished = True
+        self.error = error
+        callbacks = self.callbacks('postcallback')
+        listeners = self.adapter.listeners
+        if len(callbacks) == 0 and len(listeners) == 0:
+            return
+        event = self.asdict()
+        for callback in callbacks:
+            callback(result=self.result, **event)
+        for listener in listeners:
+            listener(event)
+
+    def asdict(self):
+        '''
+        :Returns:
+            - dict; the event, see the module description
+        '''
+        return {'adapter': self.adapter.dialect,
+                'sql': self.sql,
+                'fingerprint': fingerprint(self.sql),
+                'statements': self.statements,
+                'executions': self.executions,
+                'compile_time': self.compile_time,
+                'execute_time': self.execute_time,
+                'fetch_time': self.fetch_time,
+                'total_time': self.compile_time + self.execute_time + self.fetch_time,
+                'rowcount': self.rowcount,
+                'error': self.error,
+                'inlist': self.inlist,
+                'cached': self.cached}
+
+
+class InstrumentedAdapter(object):
+    '''
+    :Description:
+        Mixin for database specific SqlAdapter classes that keeps the
+        listeners of statement events. Listeners are called with the event
+        dict on the thread that made the execution, so they should return
+        quickly; SlowQueryLog hands its writes to a thread of its own.
+    '''
+    dialect = None
+    listeners = ()
+
+    def subscribe(self, listener):
+        '''
+        :Description:
+            Calls listener(event) after every execution on this adapter.
+        '''
+        # Replaced rather than appended to, so executions on other threads
+        # iterate over a list that never changes under them
+        self.listeners = tuple(self.listeners) + (listener,)
+        return listener
+
+    def unsubscribe(self, listener):
+        self.listeners = tuple(l for l in self.listeners if not l is listener)
+
+    def event(self, statement, compile_time=0.0):
+        '''
+        :Returns:
+            - StatementEvent; for an execution of statement on this adapter
+        '''
+        return StatementEvent(self, statement, compile_time)
+
+
+class SlowQueryLog(object):
+    '''
+    :Description:
+        Statement event listener that writes executions slower than a
+        threshold to a rotating log file, one JSON object per line. Events
+        are queued and written by a background thread, so a slow disk never
+        holds up the execution that triggered the log entry.
+
+    :Parameters:
+        - path: string; log file
+        - threshold: float; seconds of total_time before an event is logged
+        - maxbytes: int; size of the log file before it is rotated
+        - backupcount: int; rotated files kept
+    '''
+
+    def __init__(self, path, threshold=0.5, maxbytes=10 * 1024 * 1024, backupcount=5):
+        self.path = path
+        self.threshold = threshold
+        self.queue = queue.SimpleQueue()
+        self.handler = logging.handlers.RotatingFileHandler(
+            path, maxBytes=maxbytes, backupCount=backupcount, delay=True)
+        self.handler.setFormatter(logging.Formatter('%(message)s'))
+        self.listener = logging.handlers.QueueListener(self.queue, self.handler)
+        self.listener.start()
+        self.logged = 0
+
+    def __call__(self, event):
+        if event['total_time'] < self.threshold:
+            return
+        entry = dict((k, v) for k, v in event.items() if k != 'statements')
+        entry['time'] = time.time()
+        if not entry['error'] is None:
+            entry['error'] = repr(entry['error'])
+        self.queue.put_nowait(logging.makeLogRecord(
+            {'msg': json.dumps(entry, default=str),
+             'levelno': logging.WARNING,
+             'levelname': 'WARNING'}))
+        self.logged += 1
+
+    def close(self):
+        '''
+        :Description:
+            Writes whatever is still queued and closes the log file.
+        '''
+        self.listener.stop()
+        self.handler.close()
@@ -0,0 +1,416 @@
+'''
+:Description:
+    Module that contains the predicate simplification pass run over the
+    condition of a statement before it is compiled.
+
+    Generated filters tend to repeat themselves. simplify() rewrites the
+    condition tree of a Select, Update or Delete into an equivalent but
+    shorter one:
+        - duplicate predicates are removed
+        - x = 1 OR x = 2 OR x IN (3, 4) becomes x IN (1, 2, 3, 4)
+        - ranges on the same column are merged: x > 1 AND x > 5 AND x <= 9
+          becomes x > 5 AND x <= 9, x > 3 OR x > 5 becomes x > 3, and
+          contradictions such as x = 1 AND x = 2 become false, unless they
+          are under a NOT (see reduce)
+        - constant true and false branches (1 = 1, 1 = 0, TRUE, FALSE) are
+          folded away
+
+    Only comparisons of a column with Value() literals are rewritten;
+    anything else (sub selects, sql strings, column to column comparisons)
+    is kept as is, apart from being deduplicated.
+
+    Example:
+        sqlobj = squallsql.SqlAdapter(driver='squallsqlite3', simplify=True)
+        # or, for a single statement
+        select = simplify(select)
+'''
+import copy
+import re
+from squall import Squall, Condition, Where, WhereIn, Having, Select, Value, \
+                   And, Or, Not, Clause, predicate_terms, ispredicate
+
+TRUE = ('TRUE',)
+FALSE = ('FALSE',)
+CONSTANTS = {'1=1': TRUE, 'TRUE': TRUE, '0=0': TRUE,
+             '1=0': FALSE, '0=1': FALSE, 'FALSE': FALSE}
+RANGES = ('<', '<=', '>', '>=')
+# Values that can take part in range merging; bool is an int but not a number here
+NUMBERS = (int, float)
+WHITESPACE = re.compile(r'\s+')
+
+
+def simplify(sqlobject):
+    '''
+    :Description:
+        Returns sqlobject with its condition simplified. The object given
+        is not changed; a shallow copy carries the new condition.
+
+    :Parameters:
+        - sqlobject: Select, Update, Delete or a condition (Where, Having,
+          And, Or, Not, Condition)
+
+    :Returns:
+        - the simplified object, or sqlobject itself when it has no
+          condition to simplify
+    '''
+    if isinstance(sqlobject, Condition):
+        return simplify_condition(sqlobject)
+    condition = getattr(sqlobject, 'condition', None)
+    if not isinstance(condition, Condition):
+        return sqlobject
+    simplified = simplify_condition(condition)
+    if simplified is condition:
+        return sqlobject
+    sqlobject = copy.copy(sqlobject)
+    sqlobject.condition = simplified
+    return sqlobject
+
+
+def simplify_condition(condition):
+    if isinstance(condition, Where):
+        trailing = []
+        tree = build(condition, trailing)
+        tree = reduce(tree)
+        if tree is TRUE:
+            # Nothing left to filter on, only trailing clauses (ORDER BY...)
+            if len(trailing) == 0:
+                return ''
+            if len(trailing) == 1:
+                return trailing[0]
+            tree = leaf(Condition('1', '=', '1'))
+        node = restore(tree)
+        # A WhereIn (or any other Where) holds a whole tree once simplified
+        clause = Having if isinstance(condition, Having) else Where
+        return clause(node, conditions=trailing)
+    if ispredicate(condition):
+        tree = reduce(build(condition, []))
+        return restore(tree)
+    return condition
+
+
+# The tree simplified here is made of tuples:
+#   ('AND', [children]), ('OR', [children]), ('NOT', child), TRUE, FALSE
+#   ('LEAF', node, column key, operator, values) where values is a tuple of
+#   literals, or None when the leaf cannot be reasoned about
+
+def leaf(node):
+    if isinstance(node, Clause):
+        where = node.where
+        field, operator, raw = where.field, where.operator, where.rawvalue
+        if isinstance(where, WhereIn):
+            node = WhereIn(field, raw)
+        else:
+            node = Condition(field, operator, raw)
+    elif isinstance(node, (str, Select)) or not isinstance(node, Condition):
+        constant = constant_of(str(node))
+        if not constant is None:
+            return constant
+        return ('LEAF', node, None, None, None)
+    else:
+        field, operator, raw = node.field, node.operator, node.rawvalue
+    constant = constant_of(str(node))
+    if not constant is None:
+        return constant
+    operator = operator.strip().upper()
+    if operator == '==':
+        operator = '='
+    values = literals(raw, operator)
+    if values is None or not isinstance(field, (str, Squall)):
+        return ('LEAF', node, None, None, None)
+    return ('LEAF', node, str(field), operator, values)
+
+
+def constant_of(text):
+    return CONSTANTS.get(WHITESPACE.sub('', text).upper())
+
+
+def literals(raw, operator):
+    '''
+    :Returns:
+        - tuple; the literal values compared against, None if they are not
+          plain python values
+    '''
+    if operator == 'IN':
+        if isinstance(raw, Value):
+            raw = raw.value
+        if not isinstance(raw, (list, tuple)):
+            return None
+        values = tuple(v.value[0] if isinstance(v, Value) and len(v.value) == 1 else v
+                       for v in raw)
+    elif operator == '=' or operator in RANGES:
+        if not isinstance(raw, Value) or not isinstance(raw.value, (list, tuple)) \
+           or len(raw.value) != 1:
+            return None
+        values = raw.value
+    else:
+        return None
+    for v in values:
+        # NULL never compares equal, and containers are not literals
+        if v is None or isinstance(v, (list, tuple, dict, set, Squall)):
+            return None
+        if operator in RANGES and (isinstance(v, bool) or not isinstance(v, NUMBERS)):
+            return None
+    return tuple(values)
+
+
+def build(node, trailing):
+    '''
+    :Description:
+        Turns a squall condition into the tuple tree, collecting the
+        conditions that follow the predicate (Order, ...) into trailing.
+    '''
+    operator, children, extra = predicate_terms(node)
+    trailing.extend(extra)
+    if operator is None:
+        child = children[0]
+        if child is node:
+            return leaf(node)
+        return build(child, trailing)
+    if operator == 'NOT':
+        return ('NOT', build(children[0], trailing))
+    return (operator, [build(child, trailing) for child in children])
+
+
+def key(tree):
+    if tree[0] == 'LEAF':
+        return str(tree[1])
+    if tree[0] == 'NOT':
+        return ('NOT', key(tree[1]))
+    if len(tree) == 1:
+        return tree[0]
+    return (tree[0], tuple(key(child) for child in tree[1]))
+
+
+def reduce(tree, positive=True):
+    '''
+    :Description:
+        Simplifies the tree. positive is False under an odd number of NOTs.
+
+        A contradiction such as x = 1 AND x = 2 is not false but unknown
+        when x is NULL. That makes no difference to a filter, which drops
+        unknown rows like false ones, but NOT unknown stays unknown where
+        NOT false is true, so under a NOT contradictions are left alone.
+    '''
+    kind = tree[0]
+    if kind == 'NOT':
+        child = reduce(tree[1], not positive)
+        if child is TRUE:
+            return FALSE
+        if child is FALSE:
+            return TRUE
+        if child[0] == 'NOT':
+            return child[1]
+        return ('NOT', child)
+    if not kind in ('AND', 'OR'):
+        return tree
+    absorbing, neutral = (FALSE, TRUE) if kind == 'AND' else (TRUE, FALSE)
+    children = []
+    seen = set()
+    pending = list(reversed(tree[1]))
+    while len(pending) > 0:
+        child = reduce(pending.pop(), positive)
+        if child[0] == kind:
+            # Flatten, the grandchildren are reduced already
+            for grandchild in child[1]:
+                k = key(grandchild)
+                if not k in seen:
+                    seen.add(k)
+                    children.append(grandchild)
+            continue
+        if child is absorbing:
+            return absorbing
+        if child is neutral:
+            continue
+        k = key(child)
+        if k in seen:
+            continue
+        seen.add(k)
+        children.append(child)
+    children = merge_and(children, positive) if kind == 'AND' else merge_or(children)
+    if children is FALSE or children is TRUE:
+        return children
+    if len(children) == 0:
+        return neutral
+    if len(children) == 1:
+        return children[0]
+    return (kind, children)
+
+
+def columns(children, operators):
+    '''
+    :Returns:
+        - dict; column key: indexes of the leaves on that column whose
+          operator is one of operators
+    '''
+    found = {}
+    for i, child in enumerate(children):
+        if child[0] == 'LEAF' and not child[2] is None and child[3] in operators:
+            found.setdefault(child[2], []).append(i)
+    return found
+
+
+def replace(children, groups):
+    '''
+    :Description:
+        Replaces every group of leaves with its merged leaves, put where the
+        first leaf of the group was.
+    '''
+    result = []
+    merged = {}
+    dropped = set()
+    for indexes, leaves in groups:
+        merged[indexes[0]] = leaves
+        dropped.update(indexes[1:])
+    for i, child in enumerate(children):
+        if i in merged:
+            result.extend(merged[i])
+        elif not i in dropped:
+            result.append(child)
+    return result
+
+
+def merge_or(children):
+    groups = []
+    for column, indexes in columns(children, ('=', 'IN')).items():
+        if len(indexes) < 2:
+            continue
+        values = []
+        seen = set()
+        for i in indexes:
+            for v in children[i][4]:
+                if not v in seen:
+                    seen.add(v)
+                    values.append(v)
+        groups.append((indexes, [make(children[indexes[0]], '=' if len(values) == 1
+                                      else 'IN', values)]))
+    for column, indexes in columns(children, RANGES).items():
+        # One sided ranges in the same direction: the weakest one wins
+        for direction in (('>', '>='), ('<', '<=')):
+            same = [i for i in indexes if children[i][3] in direction]
+            if len(same) < 2 or not numeric(children, same):
+                continue
+            lower = direction[0] == '>'
+            best = None
+            for i in same:
+                bound = (children[i][4][0], children[i][3].endswith('='))
+                if best is None or weaker(bound, best, lower):
+                    best = bound
+            operator = direction[1] if best[1] else direction[0]
+            groups.append((same, [make(children[same[0]], operator, [best[0]])]))
+    if len(groups) == 0:
+        return children
+    return replace(children, groups)
+
+
+def weaker(bound, other, lower):
+    '''
+    :Description:
+        Whether bound lets more values through than other; bounds are
+        (value, inclusive) pairs, lower for > and >= bounds.
+    '''
+    if bound[0] == other[0]:
+        return bound[1] and not other[1]
+    return bound[0] < other[0] if lower else bound[0] > other[0]
+
+
+def numeric(children, indexes):
+    return all(isinstance(children[i][4][0], NUMBERS) and
+               not isinstance(children[i][4][0], bool) for i in indexes)
+
+
+def merge_and(children, positive=True):
+    groups = []
+    for column, indexes in columns(children, ('=', 'IN') + RANGES).items():
+        if len(indexes) < 2:
+            continue
+        allowed = None
+        low = high = None
+        for i in indexes:
+            operator, values = children[i][3], children[i][4]
+            if operator in ('=', 'IN'):
+                if allowed is None:
+                    allowed = list(values)
+                else:
+                    values = set(values)
+                    allowed = [v for v in allowed if v in values]
+            elif operator in ('>', '>='):
+                bound = (values[0], operator == '>=')
+                if low is None or not weaker(bound, low, True):
+                    low = bound
+            else:
+                bound = (values[0], operator == '<=')
+                if high is None or not weaker(bound, high, False):
+                    high = bound
+        ranged = [i for i in indexes if children[i][3] in RANGES]
+        if len(ranged) > 0 and not numeric(children, ranged):
+            continue
+        if not allowed is None:
+            if len(ranged) > 0 and not all(isinstance(v, NUMBERS) and
+                                           not isinstance(v, bool) for v in allowed):
+                continue
+            allowed = [v for v in allowed if within(v, low, high)]
+            if len(allowed) == 0:
+                if positive:
+                    return FALSE
+                continue
+            leaves = [make(children[indexes[0]], '=' if len(allowed) == 1 else 'IN', allowed)]
+        else:
+            if not low is None and not high is None:
+                if low[0] > high[0] or (low[0] == high[0] and not (low[1] and high[1])):
+                    if positive:
+                        return FALSE
+                    continue
+                if low[0] == high[0]:
+                    leaves = [make(children[indexes[0]], '=', [low[0]])]
+                    groups.append((indexes, leaves))
+                    continue
+            leaves = []
+            if not low is None:
+                leaves.append(make(children[indexes[0]], '>=' if low[1] else '>', [low[0]]))
+            if not high is None:
+                leaves.append(make(children[indexes[0]], '<=' if high[1] else '<', [high[0]]))
+        groups.append((indexes, leaves))
+    if len(groups) == 0:
+        return children
+    return replace(children, groups)
+
+
+def within(value, low, high):
+    if not low is None:
+        if value < low[0] or (value == low[0] and not low[1]):
+            return False
+    if not high is None:
+        if value > high[0] or (value == high[0] and not high[1]):
+            return False
+    return True
+
+
+def make(template, operator, values):
+    '''
+    :Description:
+        New leaf comparing the column of template with values.
+    '''
+    field = template[1].field
+    if operator == 'IN':
+        node = WhereIn(field, list(values))
+    else:
+        node = Condition(field, operator, Value(values[0]))
+    return ('LEAF', node, template[2], operator, tuple(values))
+
+
+def restore(tree):
+    '''
+    :Description:
+        Turns the tuple tree back into squall predicate nodes.
+    '''
+    if tree is TRUE:
+        return Condition('1', '=', '1')
+    if tree is FALSE:
+        return Condition('1', '=', '0')
+    kind = tree[0]
+    if kind == 'LEAF':
+        return tree[1]
+    if kind == 'NOT':
+        return Not(restore(tree[1]))
+    children = [restore(child) for child in tree[1]]
+    return And(*children) if kind == 'AND' else Or(*children)
@@ -0,0 +1,191 @@
+'''
+:Description:
+    Module that contains keyset pagination of Selects.
+
+    Paging with OFFSET makes the database read and throw away every row of
+    the pages before the one asked for, so each page is slower than the
+    last. A Paginator pages on the key the Select is ordered by instead: the
+    first page is the first `size` rows, every later page is the next `size`
+    rows after the key of the last row seen,
+
+        WHERE <condition of the Select> AND key > :last ORDER BY key LIMIT size
+
+    which an index on the key answers with a seek, the same cost on every
+    page (the limit is rendered for the dialect of the adapter, see Limit).
+    Descending keys compare with < and composite keys (a, b) with
+
+        a >= :a AND (a > :a OR (a = :a AND b > :b))
+
+    the leading a >= :a keeps the seek on the index of a. The key is taken
+    from the Order of the Select and has to be unique and not NULL, or rows
+    are skipped. Both page statements are prepared once (see squallprepare).
+
+    Example:
+        select = Select(Table('t'), Fields('x', 'y'),
+                        Where('y', '=', Value(1), conditions=Order(fields=Fields('x'))))
+        for page in sqlobj.Paginate(select, size=500):
+            for row in page:
+                ...
+'''
+import copy
+from squall import Select, Condition, Where, Order, Fields, Param, Limit, And, Or, \
+                   untrail
+from squallerrors import InvalidSqlConditionException
+
+DIRECTIONS = ('ASC', 'DESC')
+
+
+def orderkeys(order):
+    '''
+    :Description:
+        Columns and directions of an Order, the way the database reads it:
+        a key may carry its own ASC or DESC, the sort of the Order applies
+        to the last key only.
+
+    :Returns:
+        - list; (column, 'ASC' or 'DESC') per key
+    '''
+    if order.collate or order.nocase:
+        raise InvalidSqlConditionException(
+            'Keyset pagination cannot follow a collated {}'.format(order))
+    fields = order.fields
+    if isinstance(fields, Fields):
+        fields = list(fields.fields)
+    elif isinstance(fields, str):
+        fields = fields.split(',')
+    else:
+        fields = list(fields)
+    for arg in order.args:
+        fields.extend(str(arg).split(','))
+    keys = []
+    for field in fields:
+        words = str(field).split()
+        if len(words) == 0:
+            continue
+        direction = 'ASC'
+        if len(words) > 1 and words[-1].upper() in DIRECTIONS:
+            direction = words.pop().upper()
+        keys.append([' '.join(words), direction])
+    if len(keys) > 0 and str(order.sort).upper() in DIRECTIONS:
+        keys[-1][1] = str(order.sort).upper()
+    return [tuple(key) for key in keys]
+
+
+class Paginator(object):
+    '''
+    :Description:
+        Iterates over the rows of a Select one page at a time, see the
+        module description. Iterating yields lists of rows and stops after
+        the first page shorter than size.
+
+    :Parameters:
+        - adapter: database specific SqlAdapter, or squallsql.SqlAdapter
+        - select: Select; ordered on a unique key, either by an Order given
+          as its condition or among the conditions of its Where
+        - size: int; rows per page
+        - **values: dict; values of Param() placeholders of the Select
+    '''
+
+    def __init__(self, adapter, select, size=1000, **values):
+        adapter = getattr(adapter, 'sqladapter', adapter)
+        self.size = max(int(size), 1)
+        self.values = values
+        predicate, trailing, order = split(select.condition)
+        if order is None:
+            raise InvalidSqlConditionException(
+                'Keyset pagination needs a Select ordered on a unique key')
+        self.keys = orderkeys(order)
+        if len(self.keys) == 0:
+            raise InvalidSqlConditionException('{} has no key to page on'.format(order))
+        self.params = ['_after{}'.format(i) for i in range(len(self.keys))]
+        self.first = adapter.prepare(self.page(select, predicate, trailing, None))
+        self.next = adapter.prepare(self.page(select, predicate, trailing, self.seek()))
+
+    def seek(self):
+        '''
+        :Returns:
+            - Condition; the rows after the key values bound to self.params
+        '''
+        terms = []
+        for i, (column, direction) in enumerate(self.keys):
+            operator = '>' if direction == 'ASC' else '<'
+            equal = [Condition(self.keys[j][0], '=', Param(self.params[j])) for j in range(i)]
+            last = Condition(column, operator, Param(self.params[i]))
+            terms.append(And(*(equal + [last])) if len(equal) > 0 else last)
+        if len(terms) == 1:
+            return terms[0]
+        column, direction = self.keys[0]
+        leading = Condition(column, '>=' if direction == 'ASC' else '<=', Param(self.params[0]))
+        return And(leading, Or(*terms))
+
+    def page(self, select, predicate, trailing, seek):
+        '''
+        :Returns:
+            - Select; select limited to a page, after the keys bound to
+              self.params when seek is given. The key columns are selected
+              last, so every row ends with its key.
+        '''
+        order = Order(fields=Fields(*['{} {}'.format(c, d) for c, d in self.keys]))
+        terms = [t for t in (predicate, seek) if not t is None]
+        if len(terms) == 0:
+            if len(trailing) > 0:
+                raise InvalidSqlConditionException(
+                    'Cannot page {} without a Where'.format(select))
+            condition = order
+        else:
+            clause = terms[0] if len(terms) == 1 else And(*terms)
+            condition = Where(clause, conditions=trailing + [order])
+        fields = copy.copy(select.fields) if isinstance(select.fields, Fields) \
+                 else Fields(select.fields)
+        fields.fields = list(fields.fields) + [column for column, direction in self.keys]
+        return Select(select.table, fields, condition, limit=Limit(self.size),
+                      group=select.group, having=select.having,
+                      precallback=select.precallback, postcallback=select.postcallback)
+
+    def fetch(self, after=None):
+        '''
+        :Parameters:
+            - after: tuple; key values of the last row of the previous page,
+              None for the first page
+
+        :Returns:
+            - tuple; (rows of the page, key of its last row or None once
+              there are no more pages)
+        '''
+        if after is None:
+            rows = self.first(**self.values)
+        else:
+            values = dict(zip(self.params, after))
+            values.update(self.values)
+            rows = self.next(**values)
+        count = len(self.keys)
+        last = tuple(rows[-1][-count:]) if len(rows) == self.size else None
+        return [row[:-count] for row in rows], last
+
+    def __iter__(self):
+        after = None
+        while True:
+            rows, after = self.fetch(after)
+            if len(rows) > 0:
+                yield rows
+            if after is None:
+                return
+
+
+def split(condition):
+    '''
+    :Description:
+        Takes the Order out of the condition of a Select.
+
+    :Returns:
+        - tuple; (predicate without trailing conditions or None,
+          other trailing conditions, Order or None)
+    '''
+    predicate, trailing = untrail(condition)
+    if not isinstance(predicate, Condition):
+        predicate = None
+    order = None
+    for cond in trailing:
+        if isinstance(cond, Order):
+            order = cond
+    return predicate, [c for c in trailing if not isinstance(c, Order)], order
@@ -0,0 +1,360 @@
+'''
+:Description:
+    Module that contains the thread-safe ConnectionPool and the
+    PooledAdapter mixin that lets a database specific SqlAdapter
+    borrow its connections from a pool.
+
+    Without a pool an SqlAdapter has one connection and one cursor that
+    every caller shares. With a pool, each thread leases a connection of
+    its own for the length of a transaction, and adapter.conn and
+    adapter.cursor refer to that thread's leased connection and cursor.
+'''
+import contextlib
+import threading
+import time
+from squallerrors import PoolTimeoutException, PoolClosedException
+
+
+def ping(conn):
+    '''
+    :Description:
+        Default health check, runs a trivial query on the connection.
+    '''
+    cursor = conn.cursor()
+    try:
+        cursor.execute('SELECT 1')
+        cursor.fetchall()
+    finally:
+        cursor.close()
+    return True
+
+
+class ConnectionPool(object):
+    '''
+    :Description:
+        Keeps between minsize and maxsize open database connections and
+        hands them out to one caller at a time with checkout()/checkin().
+
+        Idle connections are closed once they have been unused for
+        idle_timeout seconds (the pool never shrinks below minsize) and
+        every idle connection is health checked before being handed out
+        again; connections that fail the check are replaced.
+
+    :Parameters:
+        - connect: method; takes no arguments and returns a new DB-API
+          connection
+        - minsize: int; connections opened up front and kept open
+        - maxsize: int; upper bound of open connections
+        - idle_timeout: float; seconds before an idle connection is closed,
+          None to keep idle connections forever
+        - timeout: float; default seconds checkout() waits for a free
+          connection before raising PoolTimeoutException, None waits forever
+        - health_check: method; takes a connection and returns True if it
+          is usable. Defaults to running SELECT 1, None disables checks.
+    '''
+
+    def __init__(self, connect, minsize=1, maxsize=10, idle_timeout=300,
+                 timeout=30, health_check=ping):
+        self.connect = connect
+        self.minsize = minsize
+        self.maxsize = max(maxsize, minsize, 1)
+        self.idle_timeout = idle_timeout
+        self.timeout = timeout
+        self.health_check = health_check
+        self.lock = threading.Condition()
+        self.idle = []   # [(connection, time it was checked in)]
+        self.size = 0
+        self.closed = False
+        # Metrics
+        self.checkouts = 0
+        self.waits = 0
+        self.timeouts = 0
+        self.created = 0
+        self.discarded = 0
+        self.wait_time = 0.0
+        self.max_wait_time = 0.0
+        self.peak_in_use = 0
+        for i in range(minsize):
+            self.idle.append((self.__open(), time.monotonic()))
+
+    def __open(self):
+        conn = self.connect()
+        with self.lock:
+            self.size += 1
+            self.created += 1
+        return conn
+
+    def __discard(self, conn):
+        with self.lock:
+            self.size -= 1
+            self.discarded += 1
+            self.lock.notify()
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def checkout(self, timeout=-1):
+        '''
+        :Description:
+            Borrows a connection, waiting for one to be checked in if all
+            maxsize connections are in use.
+
+        :Parameters:
+            - timeout: float; seconds to wait, None to wait forever. The
+              pool's default timeout is used if not given.
+
+        :Returns:
+            - connection; must be given back with checkin()
+        '''
+        if timeout == -1:
+            timeout = self.timeout
+        start = time.monotonic()
+        waited = False
+        while True:
+            conn = None
+            stale = []
+            with self.lock:
+                if self.closed:
+                    raise PoolClosedException('Connection pool is closed')
+                now = time.monotonic()
+                # Close whatever has been idle too long, oldest first
+                while not self.idle_timeout is None and len(self.idle) > 0 and \
+                      self.size > self.minsize and \
+                      now - self.idle[0][1] > self.idle_timeout:
+                    stale.append(self.idle.pop(0)[0])
+                    self.size -= 1
+                    self.discarded += 1
+                if len(self.idle) > 0:
+                    conn = self.idle.pop()[0]
+                    create = False
+                elif self.size < self.maxsize:
+                    # Reserve the slot before connecting outside of the lock
+                    self.size += 1
+                    create = True
+                else:
+                    remaining = None
+                    if not timeout is None:
+                        remaining = timeout - (now - start)
+                        if remaining <= 0:
+                            self.timeouts += 1
+                            raise PoolTimeoutException(
+                                'No connection available after {} seconds'.format(timeout))
+                    waited = True
+                    self.lock.wait(remaining)
+                    continue
+            for s in stale:
+                s.close()
+            if create:
+                try:
+                    conn = self.connect()
+                except Exception:
+                    with self.lock:
+                        self.size -= 1
+                        self.lock.notify()
+                    raise
+                with self.lock:
+                    self.created += 1
+            elif not self.health_check is None:
+                try:
+                    healthy = self.health_check(conn)
+                except Exception:
+                    healthy = False
+                if not healthy:
+                    self.__discard(conn)
+                    continue
+            break
+
+        elapsed = time.monotonic() - start
+        with self.lock:
+            self.checkouts += 1
+            if waited:
+                self.waits += 1
+            self.wait_time += elapsed
+            self.max_wait_time = max(self.max_wait_time, elapsed)
+            self.peak_in_use = max(self.peak_in_use, self.size - len(self.idle))
+        return conn
+
+    def checkin(self, conn):
+        '''
+        :Description:
+            Gives a connection back to the pool. Anything left uncommitted
+            on it is rolled back first.
+        '''
+        try:
+            conn.rollback()
+        except Exception:
+            self.__discard(conn)
+            return
+        with self.lock:
+            if self.closed:
+                self.size -= 1
+            else:
+                self.idle.append((conn, time.monotonic()))
+                self.lock.notify()
+                return
+        conn.close()
+
+    @contextlib.contextmanager
+    def connection(self, timeout=-1):
+        '''
+        :Description:
+            Context manager that checks a connection out and back in.
+        '''
+        conn = self.checkout(timeout)
+        try:
+            yield conn
+        finally:
+            self.checkin(conn)
+
+    def close(self):
+        '''
+        :Description:
+            Closes every idle connection. Connections still checked out are
+            closed as they are checked in.
+        '''
+        with self.lock:
+            self.closed = True
+            idle = self.idle
+            self.idle = []
+            self.size -= len(idle)
+            self.lock.notify_all()
+        for conn, since in idle:
+            conn.close()
+
+    def stats(self):
+        '''
+        :Returns:
+            - dict; pool size, connections in use, wait time and utilisation
+              (fraction of maxsize currently checked out)
+        '''
+        with self.lock:
+            in_use = self.size - len(self.idle)
+            return {'size': self.size,
+                    'idle': len(self.idle),
+                    'in_use': in_use,
+                    'minsize': self.minsize,
+                    'maxsize': self.maxsize,
+                    'peak_in_use': self.peak_in_use,
+                    'utilisation': in_use / self.maxsize,
+                    'checkouts': self.checkouts,
+                    'waits': self.waits,
+                    'timeouts': self.timeouts,
+                    'created': self.created,
+                    'discarded': self.discarded,
+                    'wait_time': self.wait_time,
+                    'avg_wait_time': self.wait_time / self.checkouts if self.checkouts else 0.0,
+                    'max_wait_time': self.max_wait_time}
+
+
+class Lease(object):
+    '''
+    :Description:
+        A connection checked out of a pool together with its cursor. refs
+        counts the users of the lease (the thread's transaction, open
+        ResultStreams); the connection goes back to the pool at zero.
+    '''
+    def __init__(self, conn, cursor):
+        self.conn = conn
+        self.cursor = cursor
+        self.refs = 0
+
+
+class PooledAdapter(object):
+    '''
+    :Description:
+        Mixin for database specific SqlAdapter classes. Adapters keep using
+        self.conn and self.cursor; when a pool is configured these resolve
+        to the connection and cursor leased by the current thread inside
+        checkout(), otherwise to the adapter's single connection.
+
+        Adapters create the pool in connect() and can override new_cursor()
+        to configure cursors of pooled connections.
+    '''
+    pool = None
+    dbconn = None
+    dbcursor = None
+
+    def __init__(self, *args, **kwargs):
+        self.threadlocal = threading.local()
+
+    @property
+    def conn(self):
+        lease = getattr(self.threadlocal, 'lease', None)
+        return self.dbconn if lease is None else lease.conn
+
+    @conn.setter
+    def conn(self, conn):
+        self.dbconn = conn
+
+    @property
+    def cursor(self):
+        lease = getattr(self.threadlocal, 'lease', None)
+        return self.dbcursor if lease is None else lease.cursor
+
+    @cursor.setter
+    def cursor(self, cursor):
+        self.dbcursor = cursor
+
+    def new_cursor(self, conn):
+        return conn.cursor()
+
+    @contextlib.contextmanager
+    def checkout(self):
+        '''
+        :Description:
+            Binds a pooled connection to the current thread for the length
+            of the with block. Nested checkouts in the same thread reuse the
+            same connection. Does nothing when no pool is configured.
+        '''
+        if self.pool is None or hasattr(self.threadlocal, 'lease'):
+            yield self.conn
+            return
+        conn = self.pool.checkout()
+        try:
+            lease = Lease(conn, self.new_cursor(conn))
+        except Exception:
+            self.pool.checkin(conn)
+            raise
+        lease.refs += 1
+        self.threadlocal.lease = lease
+        try:
+            yield conn
+        finally:
+            del self.threadlocal.lease
+            self.release(lease)
+
+    def hold(self):
+        '''
+        :Description:
+            Keeps the current thread's leased connection checked out after
+            its checkout() block ends, e.g. for a ResultStream still reading
+            from it.
+
+        :Returns:
+            - method; call it once to let go of the connection, or None if
+              there is nothing to hold
+        '''
+        lease = getattr(self.threadlocal, 'lease', None)
+        if lease is None:
+            return None
+        lease.refs += 1
+        return lambda: self.release(lease)
+
+    def release(self, lease):
+        lease.refs -= 1
+        if lease.refs == 0:
+            try:
+                lease.cursor.close()
+            except Exception:
+                pass
+            self.pool.checkin(lease.conn)
+
+    def poolstats(self):
+        '''
+        :Returns:
+            - dict; see ConnectionPool.stats(), None if there is no pool
+        '''
+        if self.pool is None:
+            return None
+        return self.pool.stats()
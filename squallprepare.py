@@ -0,0 +1,213 @@
+'''
+:Description:
+    Module that contains prepared statements: squall statements compiled
+    once and run many times with new values.
+
+    A hot query is usually built the same way on every call and only its
+    values change. Even with the statement cache of squallcompiler, every
+    Transaction still builds the tree, walks it for its shape and values and
+    plans its WhereIn lists. A PreparedStatement does all of that once:
+
+        byid = Select(Table('t'), Fields('x', 'y'),
+                      Where('x', '=', Param('x'))).prepare(sqlobj)
+        rows = byid(x=42)
+
+    Calling it only puts the values into the parameter list compiled with
+    the statement and executes the same sql string again, so the driver
+    reuses its compiled statement: sqlite3 keeps the statements of a
+    connection in its statement cache keyed by their sql, pyodbc keeps the
+    last statement of a cursor prepared.
+
+    Prepared Selects use the adapter's result cache and prepared writes
+    invalidate it like transactions do, see squallcache.
+
+    Every call emits a statement event (see squallinstrument) and is counted
+    in the stats() of its PreparedStatement; PreparingAdapter.preparedstats()
+    lists them for an adapter.
+'''
+import threading
+import time
+import weakref
+from squall import Param, Select, Insert, BulkInsert, Update, Delete
+from squallerrors import InvalidSquallObjectException, InvalidParameterException
+from squallcache import ALL, tables
+
+
+class PreparedStatement(object):
+    '''
+    :Description:
+        A Select, Insert, Update or Delete compiled for an adapter. Calling
+        it with the values of the statement's Param() placeholders runs the
+        statement inside its own transaction:
+            - Select: returns the fetched rows, True or False for a
+              SelectExists
+            - Insert, Update, Delete: commits and returns the row count, or
+              the returned rows when the statement has returning columns;
+              rolls back and raises on errors
+
+    :Parameters:
+        - adapter: database specific SqlAdapter
+        - statement: Select, Insert, Update or Delete; the statement is
+          compiled when prepared, later changes to it are not seen
+    '''
+
+    def __init__(self, adapter, statement):
+        if not isinstance(statement, (Select, Insert, Update, Delete)) or \
+           isinstance(statement, BulkInsert):
+            raise InvalidSquallObjectException(
+                'Cannot prepare {}'.format(type(statement).__name__))
+        start = time.perf_counter()
+        self.adapter = adapter
+        self.statement = statement
+        self.select = isinstance(statement, Select)
+        self.returns = self.select or not statement.returning is None
+        self.sql, params = adapter.compile(statement)
+        # Named paramstyles give a dict of p1..pn in placeholder order
+        self.named = isinstance(params, dict)
+        self.keys = list(params.keys()) if self.named else None
+        self.constants = list(params.values()) if self.named else list(params)
+        # (index in the parameter list, name) of every Param
+        self.slots = [(i, v.name) for i, v in enumerate(self.constants)
+                      if isinstance(v, Param)]
+        self.names = frozenset(name for i, name in self.slots)
+        self.tables = tables(statement)
+        self.prepare_time = time.perf_counter() - start
+        self.lock = threading.Lock()
+        self.calls = 0
+        self.errors = 0
+        self.rows = 0
+        self.total_time = 0.0
+        self.max_time = 0.0
+
+    def bind(self, values):
+        '''
+        :Parameters:
+            - values: dict; a value for the name of every Param
+
+        :Returns:
+            - tuple or dict; the parameters for the prepared sql
+        '''
+        params = list(self.constants)
+        try:
+            for index, name in self.slots:
+                params[index] = values[name]
+        except KeyError as e:
+            raise InvalidParameterException(
+                'No value for parameter <{}>'.format(e.args[0]))
+        if len(values) > len(self.names):
+            raise InvalidParameterException('Unknown parameters {}'.format(
+                ', '.join(sorted(set(values) - self.names))))
+        if self.named:
+            return dict(zip(self.keys, params))
+        return tuple(params)
+
+    def __call__(self, **values):
+        '''
+        :Parameters:
+            - **values: dict; a value for the name of every Param
+
+        :Returns:
+            - list; rows of a Select or of a write with returning columns,
+              the row count of other writes
+        '''
+        start = time.perf_counter()
+        params = self.bind(values)
+        adapter = self.adapter
+        lookup = None
+        if self.select and not adapter.results is None and not ALL in self.tables:
+            lookup = adapter.results.lookup(self.tables, self.sql, params)
+        with adapter.checkout():
+            event = adapter.event(self.statement, time.perf_counter() - start)
+            try:
+                with event.executing(self.sql):
+                    if not lookup is None and not lookup.rows is None:
+                        event.cached = True
+                        event.result = lookup.rows
+                        event.rowcount = len(event.result)
+                    elif self.select:
+                        with event.timing('execute_time'):
+                            adapter.sql(self.sql, params)
+                        with event.timing('fetch_time'):
+                            event.result = adapter.cursor.fetchall()
+                        event.rowcount = len(event.result)
+                        if not lookup is None:
+                            lookup.store(event.result)
+                    else:
+                        with event.timing('execute_time'):
+                            adapter.sql(self.sql, params)
+                        if self.returns:
+                            with event.timing('fetch_time'):
+                                event.result = adapter.cursor.fetchall()
+                            event.rowcount = len(event.result)
+                        else:
+                            event.rowcount = adapter.cursor.rowcount
+                        with event.timing('execute_time'):
+                            adapter.conn.commit()
+                        adapter.invalidate(self.tables)
+            except Exception:
+                if not self.select:
+                    adapter.conn.rollback()
+                self.record(time.perf_counter() - start, 0, True)
+                raise
+        self.record(time.perf_counter() - start, max(event.rowcount, 0))
+        if self.select:
+            return self.statement.result(event.result)
+        return event.result if self.returns else event.rowcount
+
+    def record(self, elapsed, rows, error=False):
+        with self.lock:
+            self.calls += 1
+            self.errors += int(error)
+            self.rows += rows
+            self.total_time += elapsed
+            self.max_time = max(self.max_time, elapsed)
+
+    def stats(self):
+        '''
+        :Returns:
+            - dict; sql, calls, errors, rows, prepare_time and the total,
+              mean and max time of the calls in seconds
+        '''
+        with self.lock:
+            return {'sql': self.sql,
+                    'calls': self.calls,
+                    'errors': self.errors,
+                    'rows': self.rows,
+                    'prepare_time': self.prepare_time,
+                    'total_time': self.total_time,
+                    'mean_time': self.total_time / self.calls if self.calls else 0.0,
+                    'max_time': self.max_time}
+
+    def __repr__(self):
+        return self.sql
+
+
+class PreparingAdapter(object):
+    '''
+    :Description:
+        Mixin for database specific SqlAdapter classes that prepares
+        statements and keeps track of the ones still in use.
+    '''
+    prepared = None
+
+    def prepare(self, statement):
+        '''
+        :Returns:
+            - PreparedStatement; statement compiled for this adapter
+        '''
+        prepared = PreparedStatement(self, statement)
+        if self.prepared is None:
+            self.prepared = weakref.WeakSet()
+        self.prepared.add(prepared)
+        return prepared
+
+    def preparedstats(self):
+        '''
+        :Returns:
+            - list; stats() of every prepared statement of the adapter that
+              is still referenced, most called first
+        '''
+        if self.prepared is None:
+            return []
+        return sorted((p.stats() for p in list(self.prepared)),
+                      key=lambda stats: stats['calls'], reverse=True)
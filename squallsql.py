@@ -5,6 +5,10 @@ generic driver references.
 import squall
 import importlib
 from squallerrors import *
+from squallasync import AsyncSqlAdapter
+from squallinstrument import SlowQueryLog
+from squallpage import Paginator
+from squallstream import fetchhint
 
 class SqlAdapter(object):
     '''
@@ -30,8 +34,13 @@ class SqlAdapter(object):
            'Drop' : squall.Drop,
            'Create' : squall.Create,
            'Union' : squall.Union,
+           'Intersect' : squall.Intersect,
+           'Except' : squall.Except,
+           'SelectExists' : squall.SelectExists,
            'Select' : squall.Select,
            'Insert' : squall.Insert,
+           'BulkInsert' : squall.BulkInsert,
+           'Upsert' : squall.Upsert,
            'Delete' : squall.Delete,
            'Update' : squall.Update,
            'Where' : squall.Where,
@@ -39,11 +48,26 @@ class SqlAdapter(object):
            'Order' : squall.Order,
            'Exists' : squall.Exists,
            'Value' : squall.Value,
+           'Param' : squall.Param,
+           'Limit' : squall.Limit,
            'Table' : squall.Table,
+           'Join' : squall.Join,
+           'LeftJoin' : squall.LeftJoin,
+           'RightJoin' : squall.RightJoin,
+           'FullJoin' : squall.FullJoin,
+           'CrossJoin' : squall.CrossJoin,
            'Fields' : squall.Fields,
            'Field' : squall.Field,
            'Group' : squall.Group,
+           'Count' : squall.Count,
+           'Sum' : squall.Sum,
+           'Avg' : squall.Avg,
+           'Min' : squall.Min,
+           'Max' : squall.Max,
            'Having' : squall.Having,
+           'And' : squall.And,
+           'Or' : squall.Or,
+           'Not' : squall.Not,
            'Verbatim' : squall.Verbatim,
            'Key' : squall.Key,
            'PrimaryKey' : squall.PrimaryKey,
@@ -80,6 +104,9 @@ class SqlAdapter(object):
     def sql(self, *args, **kwargs):
         return self.sqladapter.sql(*args, **kwargs)
     
+    def sqlmany(self, *args, **kwargs):
+        return self.sqladapter.sqlmany(*args, **kwargs)
+    
     def Commit(self, *args, **kwargs):
         return self.sqladapter.commit()
     
@@ -91,6 +118,142 @@ class SqlAdapter(object):
         return self.sqladapter.sql_compat(sql, params)
     
     def Transaction(self, *args, **kwargs):
+        kwargs.setdefault('adapter', self.sqladapter)
         return self.sqladapter.transaction(*args, **kwargs)
     
+    def PoolStats(self):
+        '''
+        :Description:
+            Metrics of the adapter's connection pool: size, connections in
+            use, utilisation and time spent waiting for a connection.
+            
+        :Returns:
+            - dict; or None if the adapter was not connected with a pool
+        '''
+        return self.sqladapter.poolstats()
+    
+    def Async(self, max_workers=None):
+        '''
+        :Description:
+            Awaitable counterparts of running transactions and streaming
+            Selects for asyncio code, see squallasync. The adapter has to be
+            connected with a connection pool (pool_max=...); close() the
+            returned adapter when done with it.
+            
+        :Parameters:
+            - max_workers: int; driver calls in flight at once, the pool's
+              maximum size by default
+            
+        :Returns:
+            - AsyncSqlAdapter
+        '''
+        return AsyncSqlAdapter(self, max_workers)
+    
+    def Subscribe(self, listener):
+        '''
+        :Description:
+            Calls listener(event) after every statement execution with its
+            compile, execute and fetch times, row count and fingerprint.
+            See squallinstrument for the contents of the event.
+            
+        :Returns:
+            - listener
+        '''
+        return self.sqladapter.subscribe(listener)
+    
+    def Unsubscribe(self, listener):
+        return self.sqladapter.unsubscribe(listener)
+    
+    def SlowQueryLog(self, path, threshold=0.5, **kwargs):
+        '''
+        :Description:
+            Logs every execution slower than threshold seconds to a rotating
+            file, written from a background thread.
+            
+        :Parameters:
+            - path: string; log file
+            - threshold: float; seconds
+            - **kwargs: dict; maxbytes and backupcount of the rotation
+            
+        :Returns:
+            - SlowQueryLog; unsubscribe and close() it to stop logging
+        '''
+        return self.sqladapter.subscribe(SlowQueryLog(path, threshold, **kwargs))
+    
+    def Prepare(self, statement):
+        '''
+        :Description:
+            Compiles a Select, Insert, Update or Delete once; the returned
+            PreparedStatement is called with the values of its Param()
+            placeholders. Same as statement.prepare(sqlobj).
+            
+        :Returns:
+            - PreparedStatement; see squallprepare
+        '''
+        return self.sqladapter.prepare(statement)
+    
+    def PreparedStats(self):
+        '''
+        :Description:
+            Call counts and timings of the adapter's prepared statements
+            that are still in use.
+            
+        :Returns:
+            - list; a dict per prepared statement, most called first
+        '''
+        return self.sqladapter.preparedstats()
+    
+    def CacheStats(self):
+        '''
+        :Description:
+            Metrics of the adapter's result cache: entries, bytes used, hit
+            ratio, evictions, expirations and invalidations.
+            
+        :Returns:
+            - dict; or None if the adapter was not created with result_cache=True
+        '''
+        return self.sqladapter.cachestats()
+    
+    def Paginate(self, select, size=1000, **values):
+        '''
+        :Description:
+            Pages through the rows of a Select ordered on a unique key,
+            seeking past the last key seen instead of using OFFSET.
+            
+        :Parameters:
+            - select: Select; with an Order on a unique key
+            - size: int; rows per page
+            - **values: dict; values of the Param() placeholders of select
+            
+        :Returns:
+            - Paginator; iterate over it for lists of rows, see squallpage
+        '''
+        return Paginator(self.sqladapter, select, size, **values)
+    
+    def GroupCommit(self, **kwargs):
+        '''
+        :Description:
+            Writer that commits transactions from many threads together,
+            one database commit per batch.
+            
+        :Parameters:
+            - **kwargs: dict; passed to the adapter's group commit writer
+        '''
+        if not hasattr(self.sqladapter, 'groupcommit'):
+            raise NotImplementedException(
+                'Adapter {} has no group commit'.format(self.module.__name__))
+        return self.sqladapter.groupcommit(**kwargs)
+    
+    def Stream(self, select, batchsize=None):
+        '''
+        :Description:
+            Executes a Select outside of a transaction and returns its rows
+            as a ResultStream, fetched in batches as they are iterated.
+            On a pooled adapter the stream keeps a connection checked out
+            until it is exhausted or closed.
+        '''
+        with self.sqladapter.checkout():
+            sql, params = self.sqladapter.compile(select)
+            return self.sqladapter.stream(sql, params, fetchhint(select, batchsize))
+    
     
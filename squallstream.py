@@ -0,0 +1,154 @@
+'''
+:Description:
+    Module that contains the ResultStream, an iterator over the rows of an
+    executed Select that pulls them from the database with fetchmany()
+    instead of loading the whole result with fetchall().
+'''
+
+class ResultStream(object):
+    '''
+    :Description:
+        Iterates over the rows of an already executed cursor in batches.
+        The cursor stays open until every row has been read or close()
+        is called, so only one batch of rows is held in memory at a time.
+
+        Can be used as a context manager to make sure the cursor is closed
+        when the loop is left early.
+
+    :Parameters:
+        - cursor: DB-API cursor; a cursor that a select has been executed on.
+          The stream owns it and closes it.
+        - batchsize: int; number of rows per fetchmany() call. If None, the
+          batch size is adaptive: it starts at MIN_BATCHSIZE and doubles
+          with every batch the consumer asks for, up to MAX_BATCHSIZE.
+        - onclose: method; called once after the cursor is closed, e.g. to
+          give a pooled connection back
+        - event: StatementEvent; collects the time spent fetching and the
+          rows read, finished when the stream closes
+    '''
+    MIN_BATCHSIZE = 64
+    MAX_BATCHSIZE = 8192
+
+    def __init__(self, cursor, batchsize=None, onclose=None, event=None):
+        self.cursor = cursor
+        self.onclose = onclose
+        self.event = event
+        self.adaptive = batchsize is None
+        self.batchsize = self.MIN_BATCHSIZE if self.adaptive else batchsize
+        self.batch = []
+        self.position = 0
+        self.rowcount = 0
+        self.closed = False
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self.position >= len(self.batch):
+            self.fetch()
+        row = self.batch[self.position]
+        self.position += 1
+        self.rowcount += 1
+        return row
+
+    def nextbatch(self):
+        '''
+        :Description:
+            Returns the rest of the current batch, fetching a new one if it
+            has been used up, so rows can be consumed a batch at a time.
+
+        :Returns:
+            - list; rows, empty once the result is exhausted
+        '''
+        if self.position >= len(self.batch):
+            try:
+                self.fetch()
+            except StopIteration:
+                return []
+        batch = self.batch[self.position:]
+        self.position = len(self.batch)
+        self.rowcount += len(batch)
+        return batch
+
+    def fetch(self):
+        if self.closed:
+            raise StopIteration
+        if self.event is None:
+            self.batch = self.cursor.fetchmany(self.batchsize)
+        else:
+            with self.event.timing('fetch_time'):
+                self.batch = self.cursor.fetchmany(self.batchsize)
+            self.event.rowcount = max(self.event.rowcount, 0) + len(self.batch)
+        self.position = 0
+        if len(self.batch) == 0:
+            self.close()
+            raise StopIteration
+        if self.adaptive and self.batchsize < self.MAX_BATCHSIZE:
+            self.batchsize = min(self.batchsize * 2, self.MAX_BATCHSIZE)
+
+    def close(self):
+        '''
+        :Description:
+            Closes the underlying cursor and drops any buffered rows.
+        '''
+        if not self.closed:
+            self.closed = True
+            self.batch = []
+            try:
+                self.cursor.close()
+            finally:
+                if not self.onclose is None:
+                    self.onclose()
+                if not self.event is None:
+                    self.event.finish()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __del__(self):
+        try:
+            self.close()
+        except Exception:
+            pass
+
+
+def fetchhint(select, batchsize=None):
+    '''
+    :Description:
+        Batch size to stream select with: a Select with a Limit and no batch
+        size of its own is fetched in one batch of its limit, a single
+        round trip instead of an adaptive series of growing ones.
+
+    :Returns:
+        - int; or batchsize as given
+    '''
+    limit = getattr(select, 'limit', None)
+    if batchsize is None and not limit is None and not limit.count is None:
+        return max(1, min(limit.count, ResultStream.MAX_BATCHSIZE))
+    return batchsize
+
+
+def closing(*callbacks):
+    '''
+    :Description:
+        Joins onclose callbacks of a ResultStream into one that calls them
+        all in order, even when one of them fails.
+
+    :Returns:
+        - method; or None when every callback is None
+    '''
+    callbacks = [c for c in callbacks if not c is None]
+    if len(callbacks) == 0:
+        return None
+    if len(callbacks) == 1:
+        return callbacks[0]
+
+    def onclose():
+        try:
+            callbacks[0]()
+        finally:
+            closing(*callbacks[1:])()
+    return onclose
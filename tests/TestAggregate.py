@@ -0,0 +1,70 @@
+'''
+Created on Oct 18, 2026
+
+'''
+import unittest
+import squallsql
+from squall import *
+from squallerrors import InvalidSqlValueException, InvalidSqlConditionException
+from squallinlist import chunkable
+
+class Test(unittest.TestCase):
+
+    def setUp(self):
+        self.driver = squallsql.SqlAdapter(driver='squallsqlite3')
+        self.driver.Connect(database=':memory:')
+        self.driver.Transaction(Verbatim('CREATE TABLE orders(customer, item, total INTEGER);')).run()
+        self.rows = [('a', 'x', 10), ('a', 'y', 20), ('a', 'x', 30), ('b', 'x', 5), ('c', 'z', 50)]
+        self.driver.Transaction(BulkInsert(Table('orders'), Fields('customer', 'item', 'total'),
+                                           self.rows)).run()
+
+    def tearDown(self):
+        self.driver.Disconnect()
+
+    def select(self, query):
+        return self.driver.Transaction(query).run()[str(query)]
+
+    def testAggregates(self):
+        self.assertEqual(str(Count()), 'COUNT(*)')
+        self.assertEqual(str(Count(distinct='item', alias='items')), 'COUNT(DISTINCT item) AS items')
+        self.assertEqual(str(Sum('total', distinct=True)), 'SUM(DISTINCT total)')
+        self.assertEqual(Fields('customer', Avg('total'), Min('total'), Max('total')).fields,
+                         ('customer', 'AVG(total)', 'MIN(total)', 'MAX(total)'))
+        self.assertRaises(InvalidSqlValueException, Sum)
+        self.assertRaises(InvalidSqlValueException, Count, '*', True)
+        self.assertRaises(InvalidSqlValueException, Count, 'a', 'b')
+
+    def testRender(self):
+        query = Select(Table('orders'), Fields('customer', Sum('total')),
+                       Where('total', '>', Value(1), conditions=Order(fields=Fields('customer'))),
+                       group='customer', having=Condition(Sum('total'), '>', Value(20)))
+        self.assertEqual(str(query), 'SELECT customer, SUM(total) FROM orders WHERE total > 1 '
+                                     'GROUP BY customer HAVING SUM(total) > 20 ORDER BY customer')
+        self.assertEqual(query.compile(dialect='sqlite3')[1], (1, 20))
+        grouped = Select(Table('orders'), Fields('item', Count()), Order(fields=Fields('item')),
+                         group=Group('item', having=Having(Count(), '>', Value(1))))
+        self.assertEqual(str(grouped), 'SELECT item, COUNT(*) FROM orders '
+                                       'GROUP BY item HAVING COUNT(*) > 1 ORDER BY item')
+        self.assertFalse(chunkable(grouped))
+        self.assertRaises(InvalidSqlConditionException, Select, Table('orders'), Fields('item'),
+                          group=Group('item', having='COUNT(*) > 1'), having='COUNT(*) > 2')
+        # The shape of a grouped Select differs from the ungrouped one
+        plain = Select(Table('orders'), Fields('item', Count()), Order(fields=Fields('item')))
+        self.assertNotEqual(self.driver.sqladapter.compile(plain)[0],
+                            self.driver.sqladapter.compile(grouped)[0])
+
+    def testRun(self):
+        query = Select(Table('orders'), Fields('customer', Count(alias='n'), Sum('total'),
+                                               Count(distinct='item')),
+                       Order(fields=Fields('customer')), group=Group('customer'))
+        self.assertEqual(self.select(query), [('a', 3, 60, 2), ('b', 1, 5, 1), ('c', 1, 50, 1)])
+        having = Select(Table('orders'), Fields('customer', Max('total')),
+                        Where('item', '=', Value('x'), conditions=Order(fields=Fields('customer'))),
+                        group='customer', having=Condition(Max('total'), '>=', Value(5)), limit=1)
+        self.assertEqual(self.select(having), [('a', 30)])
+        total = Select(Table('orders'), Fields(Avg('total'), Min('total')))
+        self.assertEqual(self.select(total), [(23.0, 5)])
+
+if __name__ == "__main__":
+    #import sys;sys.argv = ['', 'Test.testName']
+    unittest.main()
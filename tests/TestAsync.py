@@ -0,0 +1,99 @@
+'''
+Created on Oct 18, 2026
+
+'''
+import asyncio
+import os
+import threading
+import unittest
+import squallsql
+from squall import *
+from squallerrors import AdapterException, TransactionCancelledException
+from squallasync import AsyncSqlAdapter
+
+class Test(unittest.TestCase):
+
+    database = 'async.db'
+    # Keeps sqlite busy long enough to be cancelled part way through
+    slow = Verbatim('WITH RECURSIVE c(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM c '
+                    'WHERE x < 2000000) SELECT COUNT(*) FROM c')
+
+    def setUp(self):
+        self.driver = squallsql.SqlAdapter(driver='squallsqlite3')
+        self.driver.Connect(database=self.database, pool_max=4)
+        self.driver.Transaction(Verbatim('CREATE TABLE t(x INTEGER, y, z, PRIMARY KEY(x ASC));')).run()
+        self.adapter = AsyncSqlAdapter(self.driver)
+
+    def tearDown(self):
+        self.adapter.close()
+        self.driver.Transaction(Verbatim('DROP TABLE IF EXISTS t;')).run()
+        self.driver.Disconnect()
+        if os.path.exists(self.database):
+            os.remove(self.database)
+
+    def count(self):
+        query = Select(Table('t'), Fields('COUNT(*)'))
+        return self.driver.Transaction(query).run()[str(query)][0][0]
+
+    def testRequiresPool(self):
+        driver = squallsql.SqlAdapter(driver='squallsqlite3')
+        self.assertRaises(AdapterException, AsyncSqlAdapter, driver)
+        self.assertRaises(AdapterException, driver.Async)
+
+    def testAsync(self):
+        adapter = self.driver.Async(max_workers=2)
+        try:
+            query = Select(Table('t'), Fields('x'))
+            async def main():
+                await adapter.run(self.driver.Transaction(
+                    Insert(Table('t'), Fields('x'), [Value(1)])))
+                return [row async for row in adapter.stream(query)]
+            self.assertEqual(asyncio.run(main()), [(1,)])
+        finally:
+            adapter.close()
+
+    def testRun(self):
+        async def main():
+            await asyncio.gather(*[self.adapter.run(self.driver.Transaction(
+                Insert(Table('t'), Fields('x'), [Value(i)]))) for i in range(20)])
+            query = Select(Table('t'), Fields('x'), Where('x', '<', Value(5)))
+            return await self.adapter.run(self.driver.Transaction(query))
+        output = asyncio.run(main())
+        self.assertEqual(len(list(output.values())[0]), 5)
+        self.assertEqual(self.count(), 20)
+
+    def testStream(self):
+        self.driver.Transaction(BulkInsert(Table('t'), Fields('x'),
+                                           ((i,) for i in range(300)))).run()
+        async def main():
+            rows = []
+            async for row in self.adapter.stream(Select(Table('t'), Fields('x')), batchsize=50):
+                rows.append(row)
+            return rows
+        self.assertEqual(len(asyncio.run(main())), 300)
+        self.assertEqual(self.driver.PoolStats()['in_use'], 0)
+
+    def testCancelEvent(self):
+        cancel = threading.Event()
+        cancel.set()
+        trans = self.driver.Transaction(Insert(Table('t'), Fields('x'), [Value(1)]))
+        self.assertRaises(TransactionCancelledException, trans.run, cancel=cancel)
+        self.assertEqual(self.count(), 0)
+
+    def testCancelRollsBack(self):
+        async def main():
+            trans = self.driver.Transaction(Insert(Table('t'), Fields('x'), [Value(1)]),
+                                            self.slow,
+                                            Insert(Table('t'), Fields('x'), [Value(2)]))
+            task = asyncio.ensure_future(self.adapter.run(trans))
+            await asyncio.sleep(0.05)
+            task.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await task
+        asyncio.run(main())
+        self.assertEqual(self.count(), 0, 'Cancelled transaction was not rolled back')
+        self.assertEqual(self.driver.PoolStats()['in_use'], 0)
+
+if __name__ == "__main__":
+    #import sys;sys.argv = ['', 'Test.testName']
+    unittest.main()
@@ -0,0 +1,43 @@
+'''
+Created on Oct 18, 2026
+
+'''
+import unittest
+from benchmarks import squallbench
+
+class Test(unittest.TestCase):
+
+    def report(self, **values):
+        return {'meta': {'groups': ['render', 'sqlite']},
+                'results': dict((name.replace('_', '.', 1), squallbench.result(
+                    value, 'ops/s' if name.startswith('render') else 's',
+                    'higher' if name.startswith('render') else 'lower'))
+                                for name, value in values.items())}
+
+    def testCompare(self):
+        baseline = self.report(render_a=100.0, render_b=100.0, sqlite_c=1.0, sqlite_d=1.0)
+        current = self.report(render_a=70.0, render_b=130.0, sqlite_c=1.1, sqlite_e=1.0)
+        rows = dict((row[0], row[4]) for row in squallbench.compare(current, baseline, 0.2))
+        self.assertEqual(rows, {'render.a': 'regression',
+                                'render.b': 'improvement',
+                                'sqlite.c': 'ok',
+                                'sqlite.d': 'missing',
+                                'sqlite.e': 'new'})
+
+    def testTrees(self):
+        for name, tree in squallbench.trees(0.01).items():
+            sql, params = tree.compile('qmark')
+            self.assertEqual(sql.count('?'), len(params), name)
+
+    def testFootprint(self):
+        results = squallbench.bench_nodes(100)
+        self.assertEqual(results['memory.insert_rows.statements']['unslotted'],
+                         squallbench.UNSLOTTED['statements'])
+        self.assertFalse('unslotted' in results['memory.insert_rows.frozen'])
+        lines = squallbench.footprint({'results': results})
+        self.assertEqual(len(lines), len(squallbench.UNSLOTTED))
+        self.assertTrue(lines[0].startswith('memory.insert_rows.statements'))
+
+if __name__ == "__main__":
+    #import sys;sys.argv = ['', 'Test.testName']
+    unittest.main()
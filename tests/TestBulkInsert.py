@@ -0,0 +1,66 @@
+'''
+Created on Oct 18, 2026
+
+'''
+import unittest
+import squallsql
+from squall import *
+from squallerrors import InvalidSqlValueException
+
+class Test(unittest.TestCase):
+
+    driver = squallsql.SqlAdapter(driver='squallsqlite3')
+
+    def setUp(self):
+        self.driver.Connect(database='rfid.db')
+        trans = self.driver.Transaction()
+        trans.add(Verbatim('CREATE TABLE t(x INTEGER, y, z, PRIMARY KEY(x ASC));'))
+        trans.run()
+
+    def tearDown(self):
+        trans = self.driver.Transaction()
+        trans.add(Verbatim('DROP TABLE IF EXISTS t;'))
+        trans.run()
+
+    def testChunks(self):
+        bulk = BulkInsert(Table('t'), Fields('x', 'y', 'z'),
+                          ((i, i, Value('z')) for i in range(10)))
+        chunks = list(bulk.chunks(max_variables=12))
+        self.assertEqual([len(params) for sql, params in chunks], [12, 12, 6])
+        self.assertEqual(chunks[0][0], 'INSERT INTO t (x, y, z) VALUES '
+                         '(?, ?, ?), (?, ?, ?), (?, ?, ?), (?, ?, ?)')
+        self.assertEqual(chunks[2][1], (8, 8, 'z', 9, 9, 'z'))
+
+    def testRowCap(self):
+        bulk = BulkInsert(Table('t'), Fields(), ([i, i] for i in range(2500)))
+        chunks = list(bulk.chunks(max_variables=2099, max_rows=1000))
+        self.assertEqual([len(params) // 2 for sql, params in chunks], [1000, 1000, 500])
+        self.assertTrue(chunks[0][0].startswith('INSERT INTO t VALUES (?, ?), (?, ?)'))
+
+    def testLazyRows(self):
+        pulled = []
+        def rows():
+            for i in range(10):
+                pulled.append(i)
+                yield (i, i, i)
+        chunks = BulkInsert(Table('t'), Fields('x', 'y', 'z'), rows()).chunks(max_variables=6)
+        next(chunks)
+        self.assertEqual(pulled, [0, 1], 'Rows consumed ahead of the current chunk')
+
+    def testInvalidRow(self):
+        bulk = BulkInsert(Table('t'), Fields('x', 'y'), [(1, 2), (1, 2, 3)])
+        self.assertRaises(InvalidSqlValueException, list, bulk.chunks())
+
+    def testBulkTransaction(self):
+        trans = self.driver.Transaction()
+        trans.add(BulkInsert(Table('t'), Fields('x', 'y', 'z'),
+                             ((i, i * 2, 'z') for i in range(2000))))
+        trans.run()
+        query = Select(Table('t'), Fields('COUNT(*)'))
+        trans.add(query)
+        output = trans.run()
+        self.assertEqual(output[str(query)], [(2000,)])
+
+if __name__ == "__main__":
+    #import sys;sys.argv = ['', 'Test.testName']
+    unittest.main()
@@ -0,0 +1,134 @@
+'''
+Created on Oct 18, 2026
+
+'''
+import os
+import shutil
+import tempfile
+import time
+import unittest
+import squallsql
+from squall import *
+from squallcache import ResultCache, tables, ALL
+
+class Test(unittest.TestCase):
+
+    def setUp(self):
+        self.driver = squallsql.SqlAdapter(driver='squallsqlite3', result_cache=True)
+        self.driver.Connect(database=':memory:')
+        self.driver.Transaction(Verbatim('CREATE TABLE t(x INTEGER, y);'),
+                                Verbatim('CREATE TABLE u(x INTEGER);')).run()
+        self.driver.Transaction(BulkInsert(Table('t'), Fields('x', 'y'),
+                                           [(i, i % 3) for i in range(10)])).run()
+        self.events = []
+        self.driver.Subscribe(self.events.append)
+
+    def tearDown(self):
+        self.driver.Disconnect()
+
+    def select(self, query):
+        return self.driver.Transaction(query).run()[str(query)]
+
+    def testTables(self):
+        query = Select(Table('t'), Fields('x'), Where('x', 'IN', Select(
+            Table('dbo.[U] alias'), Fields('x'))))
+        self.assertEqual(tables(query), frozenset(['t', 'u']))
+        self.assertEqual(tables(Update('T', Fields('x'), [Value(1)])), frozenset(['t']))
+        self.assertEqual(tables(Verbatim('DELETE FROM t')), frozenset([ALL]))
+
+    def testHit(self):
+        query = Select(Table('t'), Fields('x'), Where('y', '=', Value(1)))
+        first = self.select(query)
+        again = self.select(query)
+        self.assertEqual(first, again)
+        self.assertFalse(self.events[0]['cached'])
+        self.assertTrue(self.events[1]['cached'])
+        other = self.select(Select(Table('t'), Fields('x'), Where('y', '=', Value(2))))
+        self.assertNotEqual(other, first)
+        stats = self.driver.CacheStats()
+        self.assertEqual((stats['hits'], stats['misses'], stats['entries']), (1, 2, 2))
+        self.assertAlmostEqual(stats['hit_ratio'], 1 / 3.0)
+        self.assertGreater(stats['bytes'], 0)
+
+    def testInvalidation(self):
+        query = Select(Table('t'), Fields('COUNT(*)'))
+        lookup = Select(Table('u'), Fields('x'))
+        self.assertEqual(self.select(query), [(10,)])
+        self.select(lookup)
+        self.driver.Transaction(Insert(Table('t'), Fields('x', 'y'),
+                                       [Value(10), Value(0)])).run()
+        self.assertEqual(self.select(query), [(11,)])
+        self.assertTrue(self.events[-1]['cached'] is False)
+        self.select(lookup)
+        self.assertTrue(self.events[-1]['cached'], 'Write to t dropped the rows of u')
+        self.driver.Transaction(Verbatim('DELETE FROM t WHERE x = 10')).run()
+        self.assertEqual(self.select(query), [(10,)])
+
+    def testOwnWrites(self):
+        query = Select(Table('t'), Fields('COUNT(*)'))
+        self.select(query)
+        output = self.driver.Transaction(Delete(Table('t'), condition=Where('y', '=', Value(0))),
+                                         query).run()
+        self.assertEqual(output[str(query)], [(6,)])
+        self.assertEqual(self.select(query), [(6,)])
+
+    def testPrepared(self):
+        byid = Select(Table('t'), Fields('y'), Where('x', '=', Param('x'))).prepare(self.driver)
+        update = Update(Table('t'), Fields('y'), [Param('y')],
+                        condition=Where('x', '=', Param('x'))).prepare(self.driver)
+        self.assertEqual(byid(x=1), [(1,)])
+        self.assertEqual(byid(x=1), [(1,)])
+        self.assertTrue(self.events[-1]['cached'])
+        update(x=1, y=7)
+        self.assertEqual(byid(x=1), [(7,)])
+
+    def testNoCache(self):
+        query = Select(Table('t'), Fields('x'))
+        self.select(query)
+        self.driver.Transaction(query).run(cache=False)
+        self.assertFalse(self.events[-1]['cached'])
+        plain = squallsql.SqlAdapter(driver='squallsqlite3')
+        self.assertIsNone(plain.CacheStats())
+
+    def testGroupCommit(self):
+        tmp = tempfile.mkdtemp()
+        try:
+            driver = squallsql.SqlAdapter(driver='squallsqlite3', result_cache=True)
+            driver.Connect(database=os.path.join(tmp, 'cache.db'))
+            driver.Transaction(Verbatim('CREATE TABLE t(x INTEGER);')).run()
+            query = Select(Table('t'), Fields('COUNT(*)'))
+            self.assertEqual(driver.Transaction(query).run()[str(query)], [(0,)])
+            writer = driver.GroupCommit()
+            writer.run(Insert(Table('t'), Fields('x'), [Value(1)]))
+            writer.close()
+            self.assertEqual(driver.Transaction(query).run()[str(query)], [(1,)])
+            driver.Disconnect()
+        finally:
+            shutil.rmtree(tmp, ignore_errors=True)
+
+    def testBounds(self):
+        cache = ResultCache(maxbytes=2000, ttl=None)
+        for i in range(50):
+            lookup = cache.lookup(frozenset(['t']), 'SELECT ?', (i,))
+            lookup.store([(i, 'x' * 10)])
+        stats = cache.stats()
+        self.assertLessEqual(stats['bytes'], 2000)
+        self.assertGreater(stats['evictions'], 0)
+        self.assertIsNotNone(cache.lookup(frozenset(['t']), 'SELECT ?', (49,)).rows)
+        self.assertIsNone(cache.lookup(frozenset(['t']), 'SELECT ?', (0,)).rows)
+        expiring = ResultCache(ttl=0.01)
+        expiring.lookup(frozenset(['t']), 'SELECT 1', ()).store([(1,)])
+        time.sleep(0.02)
+        self.assertIsNone(expiring.lookup(frozenset(['t']), 'SELECT 1', ()).rows)
+        self.assertEqual(expiring.stats()['expirations'], 1)
+
+    def testStaleFill(self):
+        cache = ResultCache()
+        lookup = cache.lookup(frozenset(['t']), 'SELECT x FROM t', ())
+        cache.invalidate(frozenset(['t']))
+        lookup.store([(1,)])
+        self.assertEqual(cache.stats()['entries'], 0, 'Stored rows read before a write')
+
+if __name__ == "__main__":
+    #import sys;sys.argv = ['', 'Test.testName']
+    unittest.main()
@@ -0,0 +1,98 @@
+'''
+Created on Oct 18, 2026
+
+'''
+import unittest
+
+from squall import *
+from squallerrors import InvalidParamStyleException, InvalidSqlValueException
+from squallcompiler import StatementCache
+
+class Test(unittest.TestCase):
+
+    def testSelectCompile(self):
+        s = Select(Table('t'), Fields('*'), Where('x', '=', Value(1)))
+        self.assertEqual(s.compile(), ('SELECT * FROM t WHERE x = ?', (1,)))
+
+    def testSameShapeSameSql(self):
+        a = Select(Table('t'), Fields('x', 'y'), Where('x', '=', Value('foo')))
+        b = Select(Table('t'), Fields('x', 'y'), Where('x', '=', Value('bar')))
+        self.assertEqual(a.compile()[0], b.compile()[0], 'Different sql for the same shape')
+        self.assertNotEqual(a.compile()[1], b.compile()[1])
+
+    def testInsertCompile(self):
+        i = Insert(Table('t'), Fields('x', 'y'), [Value(1), Value("it's")])
+        self.assertEqual(i.compile(), ('INSERT INTO t (x, y) VALUES (?, ?)', (1, "it's")))
+
+    def testUpdateCompile(self):
+        u = Update(Table('t'), Fields('y', 'z'), [Value(5), Value(9)],
+                   condition=Where('x', '=', Value(1)))
+        self.assertEqual(u.compile(), ('UPDATE t SET y = ?, z = ? WHERE x = ?', (5, 9, 1)))
+        self.assertRaises(InvalidSqlValueException,
+                          Update(Table('t'), Fields('y', 'z'), [Value(5)]).compile)
+
+    def testDeleteCompile(self):
+        d = Delete(Table('t'), condition=Where('x', '=', Value(1),
+                                               conditions=[Where('y', '<', Value(3))]))
+        self.assertEqual(d.compile(), ('DELETE FROM t WHERE x = ? AND y < ?', (1, 3)))
+
+    def testWhereInCompile(self):
+        w = WhereIn(Fields('x'), ['a', 'b', 'c'])
+        self.assertEqual(w.compile(), ('WHERE x IN (?, ?, ?)', ('a', 'b', 'c')))
+        w = WhereIn('x', Value(('a', 'b')))
+        self.assertEqual(w.compile(), ('WHERE x IN (?, ?)', ('a', 'b')))
+
+    def testSubqueryCompile(self):
+        s = Select(Table('t'), Fields('x'),
+                   Where('x', 'IN', Select(Table('u'), Fields('x'), Where('y', '>', Value(2)))))
+        self.assertEqual(s.compile(),
+                         ('SELECT x FROM t WHERE x IN (SELECT x FROM u WHERE y > ?)', (2,)))
+
+    def testParamStyles(self):
+        s = Select(Table('t'), Fields('*'), Where('x', '=', Value(1),
+                                                  conditions=[Where('y', '=', Value(2))]))
+        self.assertEqual(s.compile('format'), ('SELECT * FROM t WHERE x = %s AND y = %s', (1, 2)))
+        self.assertEqual(s.compile('numeric'), ('SELECT * FROM t WHERE x = :1 AND y = :2', (1, 2)))
+        self.assertEqual(s.compile('named'), ('SELECT * FROM t WHERE x = :p1 AND y = :p2',
+                                              {'p1': 1, 'p2': 2}))
+        self.assertRaises(InvalidParamStyleException, s.compile, 'unknown')
+
+    def testVerbatimParams(self):
+        v = Verbatim('SELECT * FROM t WHERE x = ? AND y = ?', (1, 2))
+        self.assertEqual(v.compile('format'), ('SELECT * FROM t WHERE x = %s AND y = %s', (1, 2)))
+        self.assertEqual(Verbatim('DROP TABLE t').compile(), ('DROP TABLE t', ()))
+        self.assertRaises(InvalidSqlValueException, Verbatim('SELECT ?', (1, 2)).compile)
+
+    def testStatementCache(self):
+        cache = StatementCache(maxsize=2)
+        for i in range(5):
+            s = Select(Table('t'), Fields('x', 'y'),
+                       Where('x', '=', Value(i), conditions=[WhereIn('y', [i, i + 1])]))
+            self.assertEqual(cache.compile(s), s.compile(), 'Cached compile differs')
+        stats = cache.stats()
+        self.assertEqual(stats['misses'], 1)
+        self.assertEqual(stats['hits'], 4)
+        # Different operand, different shape
+        s = Select(Table('t'), Fields('x', 'y'),
+                   Where('x', '=', Value(1), operand='OR', conditions=[WhereIn('y', [1, 2])]))
+        self.assertEqual(cache.compile(s), s.compile())
+        s = Update(Table('t'), Fields('y'), [Value(1)], condition=Where('x', '=', Value(2)))
+        self.assertEqual(cache.compile(s), s.compile())
+        stats = cache.stats()
+        self.assertEqual(stats['size'], 2)
+        self.assertEqual(stats['evictions'], 1)
+
+    def testPredicateCache(self):
+        cache = StatementCache()
+        for i in range(3):
+            s = Select(Table('t'), Fields('x'),
+                       Where(And(Condition('x', '>', Value(i)),
+                                 Or(WhereIn('y', [i, i + 1]), Not(Condition('z', '=', Value(i)))))))
+            self.assertEqual(cache.compile(s), s.compile(), 'Cached compile differs')
+        self.assertEqual(s.compile(), ('SELECT x FROM t WHERE x > ? AND (y IN (?, ?) OR NOT z = ?)',
+                                       (2, 2, 3, 2)))
+        self.assertEqual(cache.stats()['hits'], 2)
+
+if __name__ == "__main__":
+    #import sys;sys.argv = ['', 'Test.testName']
+    unittest.main()
@@ -171,6 +171,55 @@ class Test(unittest.TestCase):
         self.assertGreater(len(query), 0, 
                            'Query failed to return inserted rows that get inserted when value exists')
         
+    def testBatch(self):
+        Value = self.sqlobj.SQL.get("Value")
+        Select = self.sqlobj.SQL.get("Select")
+        Where = self.sqlobj.SQL.get("Where")
+        first = Select(self.table, self.columns, condition=Where('x', '=', Value(4)))
+        second = Select(self.table, self.columns, condition=Where('x', '>', Value(4)))
+        self.createtransaction.add(
+            self.sqlobj.SQL.get("Insert")(self.table, self.columns,
+                                          [Value(4), Value(3), Value(2)]),
+            first,
+            self.sqlobj.SQL.get("Insert")(self.table, self.columns,
+                                          [Value(5), Value(3), Value(2)]),
+            second)
+        self.assertEqual(len(self.createtransaction.scripts()), 1,
+                         'Transaction was split over several round trips')
+        output = self.createtransaction.run(batch=True)
+        self.assertEqual(len(output[str(first)]), 1)
+        self.assertEqual(len(output[str(second)]), 1)
+        
+    def testBatchInList(self):
+        Value = self.sqlobj.SQL.get("Value")
+        Select = self.sqlobj.SQL.get("Select")
+        self.createtransaction.add(self.sqlobj.SQL.get("Insert")(
+            self.table, self.columns, [Value(7), Value(3), Value(2)]))
+        self.createtransaction.run()
+        # Longer than a statement can bind, loaded into a temporary table by the script
+        select = Select(self.table, self.columns,
+                        condition=squall.WhereIn('x', list(range(5000))))
+        self.createtransaction.add(select)
+        self.assertGreater(len(self.createtransaction.scripts()), 1)
+        self.assertEqual(len(self.createtransaction.run(batch=True)[str(select)]), 1)
+        
+    def testBatchTooManyParameters(self):
+        where = squall.Or(*[squall.WhereIn(c, list(range(900))) for c in ('x', 'y', 'z')])
+        self.createtransaction.add(self.sqlobj.SQL.get("Select")(self.table, self.columns,
+                                                                condition=where))
+        self.assertRaises(InvalidSqlValueException, self.createtransaction.run, batch=True)
+        
+    def testBatchRollsBack(self):
+        Value = self.sqlobj.SQL.get("Value")
+        Insert = self.sqlobj.SQL.get("Insert")
+        # The duplicate primary key aborts the batch, the first row goes too
+        self.createtransaction.add(Insert(self.table, self.columns, [Value(6), Value(3), Value(2)]),
+                                   Insert(self.table, self.columns, [Value(6), Value(3), Value(2)]))
+        self.assertRaises(Exception, self.createtransaction.run, batch=True)
+        select = self.sqlobj.SQL.get("Select")(self.table, self.columns)
+        self.createtransaction.add(select)
+        self.assertEqual(len(self.createtransaction.run()[str(select)]), 0)
+        
     def tearDown(self):
         self.createtransaction.clear()
         # Drop database
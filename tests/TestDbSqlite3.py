@@ -127,6 +127,29 @@ class Test(unittest.TestCase):
         assert isinstance(output[str(sqlselect)][0], tuple), 'Expected tuple as a result, got {}'.format(type(output[0]))
          
 
+    def testExecuteMany(self):
+        calls = []
+        sqlmany = self.sqlobj.sqladapter.sqlmany
+        def recorder(sql, params):
+            calls.append((sql, len(params)))
+            return sqlmany(sql, params)
+        self.sqlobj.sqladapter.sqlmany = recorder
+        try:
+            t = self.sqlobj.Transaction()
+            for i in range(50):
+                t.add(self.sqlobj.Insert(self.sqlobj.Table('t'), self.sqlobj.Fields('x', 'y'),
+                                         [self.sqlobj.Value(i), self.sqlobj.Value(i)]))
+            t.add(self.sqlobj.Update(self.sqlobj.Table('t'), self.sqlobj.Fields('y'),
+                                     [self.sqlobj.Value(-1)],
+                                     condition=self.sqlobj.Where('x', '=', self.sqlobj.Value(0))))
+            sqlselect = self.sqlobj.Select(self.sqlobj.Table('t'), self.sqlobj.Fields('COUNT(*)'))
+            t.add(sqlselect)
+            output = t.run()
+        finally:
+            del self.sqlobj.sqladapter.sqlmany
+        self.assertEqual(calls, [('INSERT INTO t (x, y) VALUES (?, ?)', 50)])
+        self.assertEqual(output[str(sqlselect)], [(50,)])
+
     @classmethod
     def tearDownClass(cls):
         cls.sqlobj.Disconnect()
@@ -0,0 +1,57 @@
+'''
+Created on Oct 18, 2026
+
+'''
+import unittest
+import squallsql
+from squall import *
+
+class Test(unittest.TestCase):
+
+    def setUp(self):
+        self.driver = squallsql.SqlAdapter(driver='squallsqlite3', result_cache=True)
+        self.driver.Connect(database=':memory:')
+        self.driver.Transaction(Verbatim('CREATE TABLE t(x INTEGER, y);')).run()
+        self.driver.Transaction(BulkInsert(Table('t'), Fields('x', 'y'),
+                                           [(i, i % 3) for i in range(10)])).run()
+
+    def tearDown(self):
+        self.driver.Disconnect()
+
+    def exists(self, query, **kwargs):
+        return self.driver.Transaction(query).run(**kwargs)[str(query)]
+
+    def testRender(self):
+        query = SelectExists(Table('t'), Where('x', '=', Value(4)))
+        self.assertEqual(str(query), 'SELECT EXISTS(SELECT 1 FROM t WHERE x = 4)')
+        self.assertEqual(query.compile(dialect='sqlserver'), ('SELECT TOP 1 1 FROM t WHERE x = ?', (4,)))
+        self.assertEqual(query.compile(dialect='firebird')[0], 'SELECT FIRST 1 1 FROM t WHERE x = ?')
+        # The rows of a Select are checked without its fields, order and limit
+        select = Select(Table('t'), Fields('x', 'y'), Where('y', '=', Value(1), conditions=Order(
+            fields=Fields('x'))), limit=5)
+        self.assertEqual(str(SelectExists(select)), 'SELECT EXISTS(SELECT 1 FROM t WHERE y = 1)')
+        # Used to raise on the missing format argument
+        self.assertEqual(str(Select(Table('t'), Fields('x'), Exists())), 'SELECT EXISTS(SELECT 1 FROM t)')
+
+    def testRun(self):
+        self.assertIs(self.exists(SelectExists(Table('t'), Where('x', '=', Value(4)))), True)
+        self.assertIs(self.exists(SelectExists(Table('t'), Where('x', '>', Value(40)))), False)
+        self.assertIs(self.exists(SelectExists(Table('t'), Where('x', '>', Value(40))),
+                                  stream=True), False)
+        grouped = SelectExists(Table('t'), group='y', having=Condition(Count(), '>', Value(3)))
+        self.assertIs(self.exists(grouped), True)
+        self.assertIs(self.exists(Select(Table('t'), Fields('x'), Exists())), True)
+
+    def testCachedAndPrepared(self):
+        query = SelectExists(Table('t'), Where('x', '=', Value(11)))
+        self.assertIs(self.exists(query), False)
+        self.driver.Transaction(Insert(Table('t'), Fields('x', 'y'), [Value(11), Value(0)])).run()
+        self.assertIs(self.exists(query), True)
+        self.assertIs(self.exists(query), True)
+        byx = SelectExists(Table('t'), Where('x', '=', Param('x'))).prepare(self.driver)
+        self.assertIs(byx(x=3), True)
+        self.assertIs(byx(x=30), False)
+
+if __name__ == "__main__":
+    #import sys;sys.argv = ['', 'Test.testName']
+    unittest.main()
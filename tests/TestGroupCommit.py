@@ -0,0 +1,89 @@
+'''
+Created on Oct 18, 2026
+
+'''
+import os
+import sqlite3
+import threading
+import unittest
+import squallsql
+from squall import *
+from squallerrors import GroupCommitClosedException, InvalidDatabaseNameException
+
+class Test(unittest.TestCase):
+
+    database = 'groupcommit.db'
+
+    def setUp(self):
+        self.driver = squallsql.SqlAdapter(driver='squallsqlite3')
+        self.driver.Connect(database=self.database)
+        self.driver.Transaction(Verbatim('CREATE TABLE t(x INTEGER, y, z, PRIMARY KEY(x ASC));')).run()
+        self.writer = self.driver.GroupCommit(window=0.01, maxsize=32)
+
+    def tearDown(self):
+        self.writer.close()
+        self.driver.Transaction(Verbatim('DROP TABLE IF EXISTS t;')).run()
+        self.driver.Disconnect()
+        if os.path.exists(self.database):
+            os.remove(self.database)
+
+    def count(self):
+        query = Select(Table('t'), Fields('COUNT(*)'))
+        return self.driver.Transaction(query).run()[str(query)][0][0]
+
+    def testConcurrentWriters(self):
+        errors = []
+        def work(n):
+            try:
+                for i in range(10):
+                    self.writer.run(Insert(Table('t'), Fields('x', 'y'),
+                                           [Value(n * 100 + i), Value(n)]))
+            except Exception as e:
+                errors.append(e)
+        threads = [threading.Thread(target=work, args=(n,)) for n in range(16)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(errors, [])
+        self.assertEqual(self.count(), 160)
+        stats = self.writer.stats()
+        self.assertEqual(stats['members'], 160)
+        self.assertLess(stats['batches'], 160, 'Transactions were not grouped')
+
+    def testFailingMemberIsolated(self):
+        good = self.writer.submit(Insert(Table('t'), Fields('x'), [Value(1)]),
+                                  Insert(Table('t'), Fields('x'), [Value(2)]))
+        # Second insert violates the primary key, the first one must not stay
+        bad = self.writer.submit(Insert(Table('t'), Fields('x'), [Value(3)]),
+                                 Insert(Table('t'), Fields('x'), [Value(1)]))
+        query = Select(Table('t'), Fields('x'))
+        read = self.writer.submit(query)
+        self.assertEqual(good.result(5), {})
+        self.assertRaises(Exception, bad.result, 5)
+        self.assertEqual(sorted(read.result(5)[str(query)]), [(1,), (2,)])
+        self.assertEqual(self.count(), 2)
+        self.assertGreaterEqual(self.writer.stats()['failures'], 1)
+
+    def testFailedRelease(self):
+        # The member drops the writer's savepoint, so RELEASE fails
+        failed = self.writer.submit(Verbatim('RELEASE squall_0'))
+        self.assertIsInstance(failed.exception(timeout=5), sqlite3.OperationalError)
+        # The writer keeps committing later batches
+        self.writer.run(Insert(Table('t'), Fields('x'), [Value(1)]), timeout=5)
+        self.assertEqual(self.count(), 1)
+
+    def testClosed(self):
+        self.writer.close()
+        self.assertRaises(GroupCommitClosedException, self.writer.submit,
+                          Insert(Table('t'), Fields('x'), [Value(1)]))
+
+    def testNeedsDatabaseFile(self):
+        driver = squallsql.SqlAdapter(driver='squallsqlite3')
+        driver.Connect(database=':memory:')
+        self.assertRaises(InvalidDatabaseNameException, driver.GroupCommit)
+        driver.Disconnect()
+
+if __name__ == "__main__":
+    #import sys;sys.argv = ['', 'Test.testName']
+    unittest.main()
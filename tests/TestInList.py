@@ -0,0 +1,103 @@
+'''
+Created on Oct 18, 2026
+
+'''
+import unittest
+import squallsql
+from squall import *
+from squallinlist import InListPlanner, CHUNKS, TABLE, TVP
+
+class Test(unittest.TestCase):
+
+    def setUp(self):
+        self.driver = squallsql.SqlAdapter(driver='squallsqlite3',
+                                           inlist_params=50, inlist_chunks=200)
+        self.driver.Connect(database=':memory:')
+        self.driver.Transaction(Verbatim('CREATE TABLE t(x INTEGER, y);')).run()
+        self.driver.Transaction(BulkInsert(Table('t'), Fields('x', 'y'),
+                                           [(i, i % 3) for i in range(1000)])).run()
+        self.events = []
+        self.driver.Subscribe(self.events.append)
+
+    def tearDown(self):
+        self.driver.Disconnect()
+
+    def temporary(self):
+        return self.driver.sqladapter.conn.execute(
+            'SELECT name FROM sqlite_temp_master').fetchall()
+
+    def run_select(self, query, **kwargs):
+        rows = self.driver.Transaction(query).run(**kwargs)[str(query)]
+        return sorted(r[0] for r in rows)
+
+    def testPlan(self):
+        planner = InListPlanner(params=50, chunks=200, tvp=None)
+        small = Select(Table('t'), Fields('x'), WhereIn('x', list(range(50))))
+        self.assertIsNone(planner.plan(small))
+        medium = Select(Table('t'), Fields('x'), WhereIn('x', list(range(100))))
+        self.assertEqual(planner.plan(medium).strategy, CHUNKS)
+        self.assertEqual(planner.plan(medium, stream=True).strategy, TABLE)
+        large = Select(Table('t'), Fields('x'), WhereIn('x', list(range(300))))
+        self.assertEqual(planner.plan(large).strategy, TABLE)
+        ored = Select(Table('t'), Fields('x'),
+                      Where(Or(WhereIn('x', list(range(100))), 'y = 1')))
+        self.assertEqual(planner.plan(ored).strategy, TABLE, 'Chunked an OR')
+        counted = Select(Table('t'), Fields('COUNT(*)'), WhereIn('x', list(range(100))))
+        self.assertEqual(planner.plan(counted).strategy, TABLE, 'Chunked an aggregate')
+        ordered = Select(Table('t'), Fields('x'), Where('y', '=', Value(1), conditions=[
+            WhereIn('x', list(range(100))), Order(fields=Fields('x'))]))
+        self.assertEqual(planner.plan(ordered).strategy, TABLE, 'Chunked an ORDER BY')
+        update = Update(Table('t'), Fields('y'), [Value(1)],
+                        condition=WhereIn('x', list(range(100))))
+        self.assertEqual(planner.plan(update).strategy, TABLE)
+        tvp = InListPlanner(params=50, chunks=200, tvp='dbo.SquallIds')
+        self.assertEqual(tvp.plan(large).strategy, TVP)
+
+    def testRewriteKeepsOriginal(self):
+        query = Select(Table('t'), Fields('x'), Where('y', '=', Value(1), conditions=[
+            WhereIn('x', list(range(100)))]))
+        text = str(query)
+        plan = InListPlanner(params=50).plan(query)
+        chunks = list(plan.chunked())
+        self.assertEqual(len(chunks), 2)
+        self.assertEqual(chunks[0].compile()[1], (1,) + tuple(range(50)))
+        self.assertEqual(str(plan.substituted(['tmp'])),
+                         'SELECT x FROM t WHERE y = 1 AND x IN (SELECT v FROM tmp )')
+        self.assertEqual(str(query), text)
+
+    def testChunks(self):
+        ids = list(range(0, 300, 2))[:120] + [0, 2]
+        query = Select(Table('t'), Fields('x'), Where('y', '=', Value(1), conditions=[
+            WhereIn('x', ids)]))
+        self.assertEqual(self.run_select(query),
+                         [i for i in sorted(set(ids)) if i % 3 == 1])
+        event = self.events[-1]
+        self.assertEqual(event['inlist']['strategy'], CHUNKS)
+        self.assertEqual(event['inlist']['params'], 50)
+        self.assertEqual(event['inlist']['chunks'], 200)
+        self.assertEqual(event['executions'], 3)
+
+    def testTable(self):
+        ids = list(range(0, 1000, 3)) + [None]
+        query = Select(Table('t'), Fields('x'),
+                       Where(Or(WhereIn('x', ids), Condition('x', '=', Value(1)))))
+        self.assertEqual(self.run_select(query), sorted([1] + list(range(0, 1000, 3))))
+        self.assertEqual(self.events[-1]['inlist']['strategy'], TABLE)
+        self.assertEqual(self.temporary(), [], 'Temporary table left behind')
+        self.assertEqual(self.run_select(query, stream=True), sorted([1] + list(range(0, 1000, 3))))
+        self.assertEqual(self.temporary(), [], 'Temporary table left behind by a stream')
+
+    def testWrites(self):
+        ids = list(range(300))
+        self.driver.Transaction(Update(Table('t'), Fields('y'), [Value(9)],
+                                       condition=WhereIn('x', ids))).run()
+        self.assertEqual(self.events[-1]['rowcount'], 300)
+        self.driver.Transaction(Delete(Table('t'), condition=WhereIn('x', ids[:100]))).run()
+        self.assertEqual(self.events[-1]['rowcount'], 100)
+        query = Select(Table('t'), Fields('x'), Where('y', '=', Value(9)))
+        self.assertEqual(self.run_select(query), ids[100:])
+        self.assertEqual(self.temporary(), [])
+
+if __name__ == "__main__":
+    #import sys;sys.argv = ['', 'Test.testName']
+    unittest.main()
@@ -0,0 +1,98 @@
+'''
+Created on Oct 18, 2026
+
+'''
+import json
+import os
+import unittest
+import squallsql
+from squall import *
+from squallinstrument import fingerprint, SlowQueryLog
+
+class Test(unittest.TestCase):
+
+    logfile = 'slow.log'
+
+    def setUp(self):
+        self.driver = squallsql.SqlAdapter(driver='squallsqlite3')
+        self.driver.Connect(database=':memory:')
+        self.driver.Transaction(Verbatim('CREATE TABLE t(x INTEGER, y, z, PRIMARY KEY(x ASC));')).run()
+        self.events = []
+        self.driver.Subscribe(self.events.append)
+
+    def tearDown(self):
+        self.driver.Disconnect()
+        for name in os.listdir('.'):
+            if name.startswith(self.logfile):
+                os.remove(name)
+
+    def testFingerprint(self):
+        self.assertEqual(fingerprint("SELECT x FROM t WHERE x IN (?, ?, ?) AND y = 'a'"),
+                         fingerprint("SELECT x  FROM t WHERE x IN (?) AND y = 'b''c'"))
+        self.assertEqual(fingerprint('INSERT INTO t (x, y) VALUES (?, ?), (?, ?)'),
+                         'INSERT INTO t (x, y) VALUES (?+)+')
+        self.assertEqual(fingerprint('DELETE FROM t1 WHERE x = 10'), 'DELETE FROM t1 WHERE x = ?')
+
+    def testEvents(self):
+        self.driver.Transaction(Insert(Table('t'), Fields('x'), [Value(1)]),
+                                Insert(Table('t'), Fields('x'), [Value(2)]),
+                                BulkInsert(Table('t'), Fields('x'), ((i,) for i in range(3, 10)))).run()
+        query = Select(Table('t'), Fields('x'), Where('x', '>', Value(4)))
+        self.driver.Transaction(query).run()
+        grouped, bulk, select = self.events
+        self.assertEqual(grouped['adapter'], 'sqlite3')
+        self.assertEqual(grouped['executions'], 2)
+        self.assertEqual(grouped['rowcount'], 2)
+        self.assertEqual(len(grouped['statements']), 2)
+        self.assertEqual(bulk['rowcount'], 7)
+        self.assertEqual(select['rowcount'], 5)
+        self.assertEqual(select['fingerprint'], 'SELECT x FROM t WHERE x > ?')
+        for key in ('compile_time', 'execute_time', 'fetch_time'):
+            self.assertGreaterEqual(select[key], 0.0)
+        self.assertGreater(select['total_time'], 0.0)
+        self.assertIsNone(select['error'])
+
+    def testCallbacks(self):
+        calls = []
+        self.driver.Transaction(BulkInsert(Table('t'), Fields('x'), ((i,) for i in range(3)))).run()
+        query = Select(Table('t'), Fields('x'),
+                       precallback=lambda **kwargs: calls.append(('pre', kwargs['fingerprint'])),
+                       postcallback=lambda **kwargs: calls.append(('post', kwargs['result'])))
+        self.driver.Transaction(query).run()
+        self.assertEqual(calls, [('pre', 'SELECT x FROM t'), ('post', [(0,), (1,), (2,)])])
+
+    def testStreamEvent(self):
+        self.driver.Transaction(BulkInsert(Table('t'), Fields('x'), ((i,) for i in range(100)))).run()
+        del self.events[:]
+        query = Select(Table('t'), Fields('x'))
+        stream = self.driver.Transaction(query).run(stream=True)[str(query)]
+        self.assertEqual(self.events, [], 'Stream finished before it was read')
+        self.assertEqual(len(list(stream)), 100)
+        self.assertEqual(self.events[0]['rowcount'], 100)
+
+    def testError(self):
+        trans = self.driver.Transaction(Insert(Table('t'), Fields('x'), [Value(1)]),
+                                        Verbatim('INSERT INTO missing VALUES (1)'))
+        self.assertRaises(Exception, trans.run)
+        self.assertIsNotNone(self.events[-1]['error'])
+
+    def testSlowQueryLog(self):
+        log = self.driver.SlowQueryLog(self.logfile, threshold=0.0)
+        self.driver.Transaction(Insert(Table('t'), Fields('x'), [Value(1)])).run()
+        self.driver.Unsubscribe(log)
+        log.close()
+        with open(self.logfile) as f:
+            entries = [json.loads(line) for line in f]
+        self.assertEqual(len(entries), 1)
+        self.assertEqual(entries[0]['fingerprint'], 'INSERT INTO t (x) VALUES (?+)')
+
+    def testSlowQueryThreshold(self):
+        log = SlowQueryLog(self.logfile, threshold=60)
+        self.driver.Subscribe(log)
+        self.driver.Transaction(Insert(Table('t'), Fields('x'), [Value(1)])).run()
+        log.close()
+        self.assertEqual(log.logged, 0)
+
+if __name__ == "__main__":
+    #import sys;sys.argv = ['', 'Test.testName']
+    unittest.main()
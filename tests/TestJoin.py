@@ -0,0 +1,67 @@
+'''
+Created on Oct 18, 2026
+
+'''
+import unittest
+import squallsql
+from squall import *
+from squallcache import tables
+from squallerrors import InvalidSqlConditionException, InvalidSqlCommandException
+
+class Test(unittest.TestCase):
+
+    def setUp(self):
+        self.driver = squallsql.SqlAdapter(driver='squallsqlite3', result_cache=True)
+        self.driver.Connect(database=':memory:')
+        self.driver.Transaction(Verbatim('CREATE TABLE users(id INTEGER, name);'),
+                                Verbatim('CREATE TABLE orders(user_id INTEGER, total);')).run()
+        self.driver.Transaction(
+            BulkInsert(Table('users'), Fields('id', 'name'), [(1, 'a'), (2, 'b'), (3, 'c')]),
+            BulkInsert(Table('orders'), Fields('user_id', 'total'), [(1, 10), (1, 20), (2, 5)])).run()
+        self.users = Table('users', alias='u')
+        self.orders = Table('orders', alias='o')
+        self.on = Condition('u.id', '=', 'o.user_id')
+
+    def tearDown(self):
+        self.driver.Disconnect()
+
+    def select(self, query):
+        return self.driver.Transaction(query).run()[str(query)]
+
+    def testRender(self):
+        fields = Fields(Fields('name', table=self.users), Fields('total', table='o'))
+        self.assertEqual(fields.fields, ('u.name', 'o.total'))
+        query = Select(LeftJoin(self.users, self.orders, And(self.on, Condition(
+            'o.total', '>', Value(5)))), fields, Where('u.id', '=', Value(1)))
+        self.assertEqual(str(query), 'SELECT u.name, o.total FROM users AS u LEFT JOIN orders AS o '
+                                     'ON u.id = o.user_id AND o.total > 5 WHERE u.id = 1')
+        self.assertEqual(query.compile(dialect='sqlite3')[1], (5, 1))
+        nested = Join('a', RightJoin('b', 'c', 'b.x = c.x'), 'a.x = b.x')
+        self.assertEqual(str(nested), 'a INNER JOIN (b RIGHT JOIN c ON b.x = c.x) ON a.x = b.x')
+        self.assertEqual(str(CrossJoin('a', 'b')), 'a CROSS JOIN b')
+        self.assertRaises(InvalidSqlConditionException, Join, 'a', 'b')
+        self.assertRaises(InvalidSqlCommandException, Select(FullJoin('a', 'b', 'a.x = b.x'),
+                          Fields('*')).compile, dialect='mysql')
+
+    def testRun(self):
+        fields = Fields(Fields('name', table=self.users), Fields('total', table=self.orders))
+        inner = Select(Join(self.users, self.orders, self.on), fields,
+                       Order(fields=Fields('u.id', 'o.total')))
+        self.assertEqual(self.select(inner), [('a', 10), ('a', 20), ('b', 5)])
+        left = Select(LeftJoin(self.users, self.orders, self.on), fields,
+                      Where('o.total', 'IS', 'NULL'))
+        self.assertEqual(self.select(left), [('c', None)])
+        cross = Select(CrossJoin(self.users, self.orders), Fields('COUNT(*)'))
+        self.assertEqual(self.select(cross), [(9,)])
+
+    def testCache(self):
+        query = Select(Join(self.users, self.orders, self.on), Fields('COUNT(*)'))
+        self.assertEqual(tables(query), frozenset(['users', 'orders']))
+        self.assertEqual(self.select(query), [(3,)])
+        self.driver.Transaction(Insert(Table('orders'), Fields('user_id', 'total'),
+                                       [Value(3), Value(1)])).run()
+        self.assertEqual(self.select(query), [(4,)])
+
+if __name__ == "__main__":
+    #import sys;sys.argv = ['', 'Test.testName']
+    unittest.main()
@@ -0,0 +1,82 @@
+'''
+Created on Oct 18, 2026
+
+'''
+import unittest
+import squallsql
+from squall import *
+from squallerrors import InvalidSqlValueException
+from squallstream import fetchhint
+
+class Test(unittest.TestCase):
+
+    def setUp(self):
+        self.ordered = Select(Table('t'), Fields('x'), Where('y', '=', Value(1), conditions=[
+            Order(fields=Fields('x'))]), limit=Limit(10, offset=20))
+        self.unordered = Select(Table('t'), Fields('x'), limit=Limit(5, offset=5))
+
+    def testStr(self):
+        self.assertEqual(str(self.ordered), 'SELECT x FROM t WHERE y = 1 ORDER BY x LIMIT 10 OFFSET 20')
+        self.assertEqual(str(Select(Table('t'), Fields('x'), limit=3)), 'SELECT x FROM t LIMIT 3')
+
+    def testDialects(self):
+        self.assertEqual(self.ordered.compile(dialect='sqlite3'),
+                         ('SELECT x FROM t WHERE y = ? ORDER BY x LIMIT ? OFFSET ?', (1, 10, 20)))
+        self.assertEqual(self.ordered.compile(dialect='sqlserver'),
+                         ('SELECT x FROM t WHERE y = ? ORDER BY x OFFSET ? ROWS FETCH NEXT ? ROWS ONLY',
+                          (1, 20, 10)))
+        self.assertEqual(self.unordered.compile(dialect='sqlserver')[0],
+                         'SELECT x FROM t ORDER BY (SELECT NULL) OFFSET ? ROWS FETCH NEXT ? ROWS ONLY')
+        top = Select(Table('t'), Fields('x'), Where('y', '=', Value(1)), limit=Limit(10))
+        self.assertEqual(top.compile(dialect='sqlserver'),
+                         ('SELECT TOP (?) x FROM t WHERE y = ?', (10, 1)))
+        self.assertEqual(self.ordered.compile(dialect='firebird'),
+                         ('SELECT FIRST (?) SKIP (?) x FROM t WHERE y = ? ORDER BY x', (10, 20, 1)))
+        skip = Select(Table('t'), Fields('x'), limit=Limit(offset=5))
+        self.assertEqual(skip.compile(dialect='sqlite3'), ('SELECT x FROM t LIMIT ? OFFSET ?', (-1, 5)))
+        self.assertEqual(skip.compile(dialect='postgres'), ('SELECT x FROM t OFFSET ?', (5,)))
+        self.assertEqual(skip.compile(dialect='mysql')[1], (Limit.MYSQL_ALL, 5))
+
+    def testDistinctTop(self):
+        select = Select(Table('t'), Fields('x', distinct=['x']), limit=Limit(5))
+        self.assertEqual(select.compile(dialect='sqlserver'),
+                         ('SELECT DISTINCT TOP (?) (x) FROM t', (5,)))
+        self.assertEqual(select.compile(dialect='sqlite3'),
+                         ('SELECT DISTINCT (x) FROM t LIMIT ?', (5,)))
+        paged = Select(Table('t'), Fields('x', distinct=['x']), Order(fields=Fields('x')),
+                       limit=Limit(5, offset=10))
+        self.assertEqual(paged.compile(dialect='sqlserver')[0],
+                         'SELECT DISTINCT (x) FROM t ORDER BY x OFFSET ? ROWS FETCH NEXT ? ROWS ONLY')
+
+    def testInvalid(self):
+        self.assertRaises(InvalidSqlValueException, Limit, -1)
+        self.assertRaises(InvalidSqlValueException, Limit, '10')
+
+    def testRun(self):
+        driver = squallsql.SqlAdapter(driver='squallsqlite3')
+        driver.Connect(database=':memory:')
+        try:
+            driver.Transaction(Verbatim('CREATE TABLE t(x INTEGER, y);')).run()
+            driver.Transaction(BulkInsert(Table('t'), Fields('x', 'y'),
+                                          [(i, i % 2) for i in range(100)])).run()
+            rows = driver.Transaction(self.ordered).run()[str(self.ordered)]
+            self.assertEqual([r[0] for r in rows], list(range(41, 61, 2)))
+            # Pages of the same query share one template
+            second = Select(Table('t'), Fields('x'), Where('y', '=', Value(1), conditions=[
+                Order(fields=Fields('x'))]), limit=Limit(10, offset=30))
+            self.assertEqual(driver.sqladapter.compile(second)[0],
+                             driver.sqladapter.compile(self.ordered)[0])
+            stream = driver.Stream(Select(Table('t'), Fields('x'), limit=7))
+            self.assertEqual(stream.batchsize, 7)
+            self.assertEqual(len(list(stream)), 7)
+        finally:
+            driver.Disconnect()
+
+    def testFetchHint(self):
+        self.assertEqual(fetchhint(self.ordered), 10)
+        self.assertEqual(fetchhint(self.ordered, 3), 3)
+        self.assertIsNone(fetchhint(Select(Table('t'), Fields('x'))))
+
+if __name__ == "__main__":
+    #import sys;sys.argv = ['', 'Test.testName']
+    unittest.main()
@@ -0,0 +1,78 @@
+'''
+Created on Oct 18, 2026
+
+'''
+import copy
+import pickle
+import unittest
+
+from squall import *
+from squallerrors import ImmutableSquallObjectException
+
+class Test(unittest.TestCase):
+
+    def statement(self):
+        return Select(Table('t'), Fields('x', 'y'),
+                      Where(Or(Condition('x', '=', Value(1)), Condition('y', '>', Value(2))),
+                            conditions=Order(fields=Fields('x'))))
+
+    def testNoDict(self):
+        nodes = [Value(1), Table('t'), Fields('x'), Condition('x', '=', Value(1)),
+                 Where('x', '=', Value(1)), WhereIn('x', [1, 2]), And('x = 1', 'y = 2'),
+                 Insert(Table('t'), Fields('x'), [Value(1)]), self.statement(),
+                 Update(Table('t'), Fields('x'), [Value(1)]), Delete(Table('t')),
+                 BulkInsert(Table('t'), Fields('x'), [])]
+        for node in nodes:
+            self.assertFalse(hasattr(node, '__dict__'),
+                             '{} has a __dict__'.format(type(node).__name__))
+
+    def testSharedCommand(self):
+        a = Insert(Table('t'), Fields('x'), [Value(1)])
+        b = Insert(Table('u'), Fields('y'), [Value(2)])
+        self.assertIs(a.command, b.command)
+        self.assertEqual(str(a.command), 'INSERT')
+
+    def testValue(self):
+        self.assertEqual(Value(1).value, (1,))
+        self.assertEqual(Value("it's", sanitize_quotes=True).value, ('itU+0027s',))
+
+    def testFreeze(self):
+        select = self.statement()
+        text, compiled = str(select), select.compile()
+        self.assertIs(freeze(select), select)
+        self.assertIsInstance(select, Select)
+        self.assertEqual(str(select), text)
+        self.assertEqual(select.compile(), compiled)
+        with self.assertRaises(ImmutableSquallObjectException):
+            select.table = Table('u')
+        with self.assertRaises(ImmutableSquallObjectException):
+            select.condition.field.conditions[0].operator = '<'
+        with self.assertRaises(ImmutableSquallObjectException):
+            del select.fields
+        # Frozen conditions are still predicates
+        self.assertEqual(str(Where(And(select.condition.field.conditions[0], 'z = 3'))),
+                         'WHERE x = 1 AND z = 3')
+
+    def testThaw(self):
+        select = freeze(self.statement())
+        duplicate = copy.copy(select)
+        duplicate.table = Table('u')
+        self.assertEqual(str(duplicate), str(select).replace('FROM t', 'FROM u'))
+        deep = copy.deepcopy(select)
+        deep.condition.field.conditions[1].operator = '<'
+        self.assertIn('y < 2', str(deep))
+        self.assertIn('y > 2', str(select))
+        mutable = thaw(select)
+        mutable.fields = Fields('z')
+        self.assertEqual(str(select.fields), 'x, y')
+        unpickled = pickle.loads(pickle.dumps(select))
+        self.assertEqual(str(unpickled), str(select))
+        self.assertRaises(ImmutableSquallObjectException, setattr, unpickled, 'table', 'u')
+
+    def testStableRepr(self):
+        order = freeze(Order('y', fields='x'))
+        self.assertEqual(str(order), str(order))
+
+if __name__ == "__main__":
+    #import sys;sys.argv = ['', 'Test.testName']
+    unittest.main()
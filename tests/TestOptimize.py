@@ -0,0 +1,139 @@
+'''
+Created on Oct 18, 2026
+
+'''
+import unittest
+import squallsql
+from squall import *
+from squalloptimize import simplify
+
+def eq(field, value, operator='='):
+    return Condition(field, operator, Value(value))
+
+class Test(unittest.TestCase):
+
+    def testDuplicates(self):
+        where = Where(And(eq('x', 1), eq('y', 2), eq('x', 1)))
+        self.assertEqual(str(simplify(where)), 'WHERE x = 1 AND y = 2')
+
+    def testEqualsToIn(self):
+        where = Where(Or(eq('x', 1), eq('x', 2), WhereIn('x', [2, 3]), eq('y', 1)))
+        self.assertEqual(str(simplify(where)), 'WHERE x IN (1, 2, 3) OR y = 1')
+
+    def testRanges(self):
+        where = Where(And(eq('x', 1, '>'), eq('x', 5, '>'), eq('x', 9, '<=')))
+        self.assertEqual(str(simplify(where)), 'WHERE x > 5 AND x <= 9')
+        where = Where(Or(eq('x', 3, '>'), eq('x', 5, '>='), eq('x', 0, '<')))
+        self.assertEqual(str(simplify(where)), 'WHERE x > 3 OR x < 0')
+        where = Where(And(eq('x', 3, '>='), eq('x', 3, '<=')))
+        self.assertEqual(str(simplify(where)), 'WHERE x = 3')
+        where = Where(And(WhereIn('x', [1, 2, 3]), eq('x', 1, '>')))
+        self.assertEqual(str(simplify(where)), 'WHERE x IN (2, 3)')
+
+    def testContradiction(self):
+        self.assertEqual(str(simplify(Where(And(eq('x', 1), eq('x', 2))))), 'WHERE 1 = 0')
+        self.assertEqual(str(simplify(Where(And(eq('x', 5, '>'), eq('x', 2, '<'))))),
+                         'WHERE 1 = 0')
+
+    def testContradictionUnderNot(self):
+        # x = 1 AND x = 2 is unknown, not false, when x is NULL
+        where = Where(Not(And(eq('x', 1), eq('x', 2))))
+        self.assertEqual(str(simplify(where)), str(where))
+        where = Where(Not(Or(eq('y', 1), And(eq('x', 5, '>'), eq('x', 2, '<')))))
+        self.assertEqual(str(simplify(where)), str(where))
+        where = Where(Not(And(WhereIn('x', [1, 2]), eq('x', 3))))
+        self.assertEqual(str(simplify(where)), str(where))
+        # Merging that keeps the meaning still happens under a NOT
+        where = Where(Not(And(eq('x', 1, '>'), eq('x', 5, '>'))))
+        self.assertEqual(str(simplify(where)), 'WHERE NOT x > 5')
+        # Under two NOTs the contradiction is folded again
+        where = Where(And(eq('y', 1), Not(Not(And(eq('x', 1), eq('x', 2))))))
+        self.assertEqual(str(simplify(where)), 'WHERE 1 = 0')
+
+    def testAdapterWhereIn(self):
+        driver = squallsql.SqlAdapter(driver='squallsqlite3', simplify=True)
+        driver.Connect(database=':memory:')
+        try:
+            driver.Transaction(Verbatim('CREATE TABLE t(x INTEGER);')).run()
+            driver.Transaction(BulkInsert(Table('t'), Fields('x'), [(i,) for i in range(10)])).run()
+            query = Select(Table('t'), Fields('x'), WhereIn('x', [1, 2, 12]))
+            rows = driver.Transaction(query).run()[str(query)]
+            self.assertEqual(sorted(r[0] for r in rows), [1, 2])
+        finally:
+            driver.Disconnect()
+
+    def testNullRows(self):
+        driver = squallsql.SqlAdapter(driver='squallsqlite3')
+        driver.Connect(database=':memory:')
+        try:
+            driver.Transaction(Verbatim('CREATE TABLE t(id INTEGER, x INTEGER);')).run()
+            driver.Transaction(BulkInsert(Table('t'), Fields('id', 'x'),
+                                          [(1, 1), (2, 2), (3, None), (4, 7)])).run()
+            wheres = [Where(Not(And(eq('x', 1), eq('x', 2)))),
+                      Where(Not(And(eq('x', 5, '>'), eq('x', 2, '<')))),
+                      Where(Not(And(WhereIn('x', [1, 2]), eq('x', 3)))),
+                      Where(Not(Or(eq('x', 1), eq('x', 2), eq('x', 0, '>')))),
+                      Where(And(eq('id', 0, '>'), Not(Not(And(eq('x', 1), eq('x', 2))))))]
+            for where in wheres:
+                query = Select(Table('t'), Fields('id'), where)
+                rows = driver.Transaction(query).run()[str(query)]
+                simplified = simplify(query)
+                same = driver.Transaction(simplified).run()[str(simplified)]
+                self.assertEqual(sorted(rows), sorted(same), str(where))
+        finally:
+            driver.Disconnect()
+
+    def testConstants(self):
+        where = Where(And('1 = 1', eq('a', 1), Or('1=0', eq('b', 2))))
+        self.assertEqual(str(simplify(where)), 'WHERE a = 1 AND b = 2')
+        self.assertEqual(simplify(Where(Or('1 = 1', eq('a', 1)))), '')
+        self.assertEqual(str(simplify(Where(Not(Not(eq('a', 1)))))), 'WHERE a = 1')
+
+    def testUntouched(self):
+        # Strings are not merged as ranges, column comparisons are left alone
+        where = Where(And(eq('name', 'a', '>'), eq('name', 'b', '>'), Condition('y', '>', 'x')))
+        self.assertEqual(str(simplify(where)), str(where))
+        where = Where(Or(eq('x', None, 'IS'), eq('x', 1)))
+        self.assertEqual(str(simplify(where)), str(where))
+
+    def testTrailingConditions(self):
+        where = Where(Or('1 = 1', eq('a', 1)), conditions=Order(fields=Fields('x')))
+        self.assertEqual(str(simplify(where)), 'ORDER BY x')
+        where = Where('x', '=', Value(1), conditions=[Where('x', '=', Value(1)),
+                                                        Order(fields=Fields('x'))])
+        self.assertEqual(str(simplify(where)), 'WHERE x = 1 ORDER BY x')
+
+    def testClauseType(self):
+        where = simplify(WhereIn('x', [1, 2, 2]))
+        self.assertEqual(str(where), 'WHERE x IN (1, 2, 2)')
+        having = simplify(Having(And(eq('COUNT(*)', 1, '>'), eq('COUNT(*)', 1, '>'))))
+        self.assertIsInstance(having, Having)
+        self.assertEqual(str(having), 'HAVING COUNT(*) > 1')
+
+    def testStatement(self):
+        select = Select(Table('t'), Fields('x'), Where(Or(eq('x', 1), eq('x', 2))))
+        simplified = simplify(select)
+        self.assertEqual(simplified.compile(), ('SELECT x FROM t WHERE x IN (?, ?)', (1, 2)))
+        self.assertEqual(str(select), 'SELECT x FROM t WHERE x = 1 OR x = 2',
+                         'simplify() changed the object it was given')
+        plain = Select(Table('t'), Fields('x'))
+        self.assertIs(simplify(plain), plain)
+
+    def testAdapter(self):
+        driver = squallsql.SqlAdapter(driver='squallsqlite3', simplify=True)
+        driver.Connect(database=':memory:')
+        try:
+            driver.Transaction(Verbatim('CREATE TABLE t(x INTEGER);')).run()
+            driver.Transaction(BulkInsert(Table('t'), Fields('x'), [(i,) for i in range(10)])).run()
+            query = Select(Table('t'), Fields('x'),
+                           Where(Or(eq('x', 1), eq('x', 3), eq('x', 8, '>'), eq('x', 9, '>='))))
+            self.assertEqual(driver.sqladapter.compile(query)[0],
+                             'SELECT x FROM t WHERE x IN (?, ?) OR x > ?')
+            rows = driver.Transaction(query).run()[str(query)]
+            self.assertEqual(sorted(r[0] for r in rows), [1, 3, 9])
+        finally:
+            driver.Disconnect()
+
+if __name__ == "__main__":
+    #import sys;sys.argv = ['', 'Test.testName']
+    unittest.main()
@@ -0,0 +1,64 @@
+'''
+Created on Oct 18, 2026
+
+'''
+import unittest
+import squallsql
+from squall import *
+from squallpage import Paginator, orderkeys
+from squallerrors import InvalidSqlConditionException
+
+class Test(unittest.TestCase):
+
+    def setUp(self):
+        self.driver = squallsql.SqlAdapter(driver='squallsqlite3')
+        self.driver.Connect(database=':memory:')
+        self.driver.Transaction(Verbatim('CREATE TABLE t(a INTEGER, b INTEGER, y);')).run()
+        self.rows = [(i // 10, i % 10, i % 2) for i in range(95)]
+        self.driver.Transaction(BulkInsert(Table('t'), Fields('a', 'b', 'y'), self.rows)).run()
+
+    def tearDown(self):
+        self.driver.Disconnect()
+
+    def testOrderKeys(self):
+        self.assertEqual(orderkeys(Order(fields=Fields('a', 'b'), sort='DESC')),
+                         [('a', 'ASC'), ('b', 'DESC')])
+        self.assertEqual(orderkeys(Order(fields=Fields('a DESC', 'b desc'))),
+                         [('a', 'DESC'), ('b', 'DESC')])
+
+    def testAscending(self):
+        select = Select(Table('t'), Fields('a', 'b'), Order(fields=Fields('a', 'b')))
+        pages = list(self.driver.Paginate(select, size=10))
+        self.assertEqual([len(p) for p in pages], [10] * 9 + [5])
+        self.assertEqual([r for p in pages for r in p], [r[:2] for r in self.rows])
+
+    def testDescendingFiltered(self):
+        select = Select(Table('t'), Fields('b'), Where('y', '=', Value(1), conditions=Order(
+            fields=Fields('a DESC', 'b DESC'))))
+        paginator = self.driver.Paginate(select, size=7)
+        self.assertIn('a <= ? AND (a < ? OR a = ? AND b < ?)', paginator.next.sql)
+        rows = [r for p in paginator for r in p]
+        self.assertEqual(rows, [(r[1],) for r in reversed(self.rows) if r[2] == 1])
+
+    def testResume(self):
+        select = Select(Table('t'), Fields('a', 'b'), Order(fields=Fields('a', 'b')))
+        paginator = Paginator(self.driver, select, size=40)
+        rows, after = paginator.fetch()
+        self.assertEqual(after, (3, 9))
+        rows, after = paginator.fetch((8, 9))
+        self.assertEqual(rows, [(9, b) for b in range(5)])
+        self.assertIsNone(after)
+
+    def testParams(self):
+        select = Select(Table('t'), Fields('a'), Where('b', '=', Param('b'), conditions=Order(
+            fields=Fields('a'))))
+        pages = list(self.driver.Paginate(select, size=4, b=3))
+        self.assertEqual([r[0] for p in pages for r in p], list(range(10)))
+
+    def testUnordered(self):
+        self.assertRaises(InvalidSqlConditionException, self.driver.Paginate,
+                          Select(Table('t'), Fields('a'), Where('y', '=', Value(1))))
+
+if __name__ == "__main__":
+    #import sys;sys.argv = ['', 'Test.testName']
+    unittest.main()
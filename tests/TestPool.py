@@ -0,0 +1,96 @@
+'''
+Created on Oct 18, 2026
+
+'''
+import os
+import sqlite3
+import threading
+import unittest
+import squallsql
+from squall import *
+from squallerrors import PoolTimeoutException, PoolClosedException
+from squallpool import ConnectionPool
+
+class Test(unittest.TestCase):
+
+    database = 'pool.db'
+
+    def setUp(self):
+        self.driver = squallsql.SqlAdapter(driver='squallsqlite3')
+        self.driver.Connect(database=self.database, pool_max=4, pool_timeout=10)
+        self.driver.Transaction(Verbatim('CREATE TABLE t(x INTEGER, y, z, PRIMARY KEY(x ASC));')).run()
+
+    def tearDown(self):
+        self.driver.Transaction(Verbatim('DROP TABLE IF EXISTS t;')).run()
+        self.driver.Disconnect()
+        if os.path.exists(self.database):
+            os.remove(self.database)
+
+    def testCheckoutCheckin(self):
+        pool = ConnectionPool(lambda: sqlite3.connect(':memory:'), minsize=1, maxsize=2,
+                              timeout=0.05)
+        a = pool.checkout()
+        b = pool.checkout()
+        self.assertRaises(PoolTimeoutException, pool.checkout)
+        pool.checkin(a)
+        self.assertIs(pool.checkout(), a, 'Idle connection not reused')
+        stats = pool.stats()
+        self.assertEqual(stats['in_use'], 2)
+        self.assertEqual(stats['utilisation'], 1.0)
+        self.assertEqual(stats['timeouts'], 1)
+        pool.checkin(a)
+        pool.checkin(b)
+        pool.close()
+        self.assertEqual(pool.stats()['size'], 0)
+        self.assertRaises(PoolClosedException, pool.checkout)
+
+    def testIdleTimeout(self):
+        pool = ConnectionPool(lambda: sqlite3.connect(':memory:'), minsize=0, maxsize=3,
+                              idle_timeout=0)
+        conns = [pool.checkout() for i in range(3)]
+        for conn in conns:
+            pool.checkin(conn)
+        pool.checkout()
+        self.assertEqual(pool.stats()['size'], 1, 'Idle connections were not closed')
+
+    def testHealthCheck(self):
+        pool = ConnectionPool(lambda: sqlite3.connect(':memory:'), minsize=1, maxsize=1)
+        conn = pool.checkout()
+        pool.checkin(conn)
+        conn.close()
+        replacement = pool.checkout()
+        self.assertIsNot(replacement, conn, 'Broken connection handed out')
+        self.assertEqual(pool.stats()['discarded'], 1)
+
+    def testThreadedTransactions(self):
+        errors = []
+        def work(n):
+            try:
+                for i in range(25):
+                    self.driver.Transaction(Insert(Table('t'), Fields('x', 'y'),
+                                                   [Value(n * 100 + i), Value(n)])).run()
+            except Exception as e:
+                errors.append(e)
+        threads = [threading.Thread(target=work, args=(n,)) for n in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(errors, [])
+        query = Select(Table('t'), Fields('COUNT(*)'))
+        self.assertEqual(self.driver.Transaction(query).run()[str(query)], [(200,)])
+        stats = self.driver.PoolStats()
+        self.assertLessEqual(stats['peak_in_use'], 4)
+        self.assertEqual(stats['in_use'], 0)
+
+    def testStreamHoldsConnection(self):
+        self.driver.Transaction(BulkInsert(Table('t'), Fields('x'), ((i,) for i in range(10)))).run()
+        query = Select(Table('t'), Fields('x'))
+        stream = self.driver.Transaction(query).run(stream=True)[str(query)]
+        self.assertEqual(self.driver.PoolStats()['in_use'], 1)
+        self.assertEqual(len(list(stream)), 10)
+        self.assertEqual(self.driver.PoolStats()['in_use'], 0)
+
+if __name__ == "__main__":
+    #import sys;sys.argv = ['', 'Test.testName']
+    unittest.main()
@@ -0,0 +1,90 @@
+'''
+Created on Oct 18, 2026
+
+'''
+import unittest
+import squallsql
+from squall import *
+from squallerrors import InvalidParameterException, InvalidSquallObjectException
+
+class Test(unittest.TestCase):
+
+    def setUp(self):
+        self.driver = squallsql.SqlAdapter(driver='squallsqlite3')
+        self.driver.Connect(database=':memory:')
+        self.driver.Transaction(Verbatim('CREATE TABLE t(x INTEGER, y);')).run()
+        self.driver.Transaction(BulkInsert(Table('t'), Fields('x', 'y'),
+                                           [(i, i % 3) for i in range(10)])).run()
+
+    def tearDown(self):
+        self.driver.Disconnect()
+
+    def testRender(self):
+        select = Select(Table('t'), Fields('x'),
+                        Where('x', '>', Param('low'), conditions=[Where('y', '=', Value(1))]))
+        self.assertEqual(str(select), 'SELECT x FROM t WHERE x > :low AND y = 1')
+        sql, params = select.compile()
+        self.assertEqual(sql, 'SELECT x FROM t WHERE x > ? AND y = ?')
+        self.assertIsInstance(params[0], Param)
+        self.assertEqual(params[1], 1)
+
+    def testSelect(self):
+        byid = Select(Table('t'), Fields('x', 'y'),
+                      Where('x', '=', Param('x'))).prepare(self.driver)
+        self.assertEqual(byid(x=4), [(4, 1)])
+        self.assertEqual(byid(x=40), [])
+        ranged = self.driver.Prepare(Select(Table('t'), Fields('x'), Where(And(
+            Condition('x', '>=', Param('low')), Condition('y', '=', Value(0)),
+            Condition('x', '<', Param('low'))))))
+        self.assertEqual(ranged(low=3), [])
+
+    def testWrites(self):
+        insert = Insert(Table('t'), Fields('x', 'y'), [Param('x'), Param('y')]).prepare(self.driver)
+        update = Update(Table('t'), Fields('y'), [Param('y')],
+                        condition=Where('x', '=', Param('x'))).prepare(self.driver)
+        delete = Delete(Table('t'), condition=Where('y', '=', Param('y'))).prepare(self.driver)
+        self.assertEqual(insert(x=100, y='new'), 1)
+        self.assertEqual(update(x=100, y='changed'), 1)
+        self.assertEqual(delete(y='changed'), 1)
+        self.assertEqual(delete(y=0), 4)
+        rows = self.driver.sqladapter.sql_compat('SELECT COUNT(*) FROM t')
+        self.assertEqual(rows, [(6,)])
+
+    def testParameters(self):
+        byid = Select(Table('t'), Fields('x'), Where('x', '=', Param('x'))).prepare(self.driver)
+        self.assertRaises(InvalidParameterException, byid)
+        self.assertRaises(InvalidParameterException, byid, x=1, z=2)
+        self.assertRaises(InvalidSquallObjectException, self.driver.Prepare,
+                          BulkInsert(Table('t'), Fields('x'), [(1,)]))
+
+    def testNotRebuilt(self):
+        select = Select(Table('t'), Fields('x'), Where('x', '=', Param('x')))
+        byid = select.prepare(self.driver)
+        select.fields = Fields('y')
+        self.assertEqual(byid(x=5), [(5,)])
+
+    def testStats(self):
+        events = []
+        self.driver.Subscribe(events.append)
+        byid = Select(Table('t'), Fields('x'), Where('x', '=', Param('x'))).prepare(self.driver)
+        for i in range(3):
+            byid(x=i)
+        stats = self.driver.PreparedStats()
+        self.assertEqual(len(stats), 1)
+        self.assertEqual(stats[0]['sql'], 'SELECT x FROM t WHERE x = ?')
+        self.assertEqual(stats[0]['calls'], 3)
+        self.assertEqual(stats[0]['rows'], 3)
+        self.assertGreater(stats[0]['total_time'], 0)
+        self.assertEqual(len(events), 3)
+        self.assertEqual(events[-1]['sql'], 'SELECT x FROM t WHERE x = ?')
+        self.assertEqual(events[-1]['rowcount'], 1)
+        failing = self.driver.Prepare(Insert(Table('missing'), Fields('x'), [Param('x')]))
+        self.assertRaises(Exception, failing, x=1)
+        self.assertEqual(failing.stats()['errors'], 1)
+        self.assertIsNotNone(events[-1]['error'])
+        del byid, failing
+        self.assertEqual(self.driver.PreparedStats(), [])
+
+if __name__ == "__main__":
+    #import sys;sys.argv = ['', 'Test.testName']
+    unittest.main()
@@ -0,0 +1,76 @@
+'''
+Created on Oct 18, 2026
+
+'''
+import unittest
+import squallsql
+from squall import *
+from squallerrors import InvalidSqlCommandException
+
+class Test(unittest.TestCase):
+
+    def setUp(self):
+        self.driver = squallsql.SqlAdapter(driver='squallsqlite3')
+        self.driver.Connect(database=':memory:')
+        self.driver.Transaction(Verbatim(
+            'CREATE TABLE t(id INTEGER PRIMARY KEY AUTOINCREMENT, name, n);')).run()
+
+    def tearDown(self):
+        self.driver.Disconnect()
+
+    def testDialects(self):
+        insert = Insert(Table('t'), Fields('name'), [Value('a')], returning=['id'])
+        self.assertEqual(str(insert), "INSERT INTO t (name) VALUES ('a') RETURNING id")
+        self.assertEqual(insert.compile(dialect='sqlserver'),
+                         ('INSERT INTO t (name) OUTPUT INSERTED.id VALUES (?)', ('a',)))
+        update = Update(Table('t'), Fields('name', 'n'), [Value('b'), Value(1)],
+                        condition=Where('id', '=', Value(1)), returning=Fields('id', 'DELETED.n'))
+        self.assertEqual(update.compile(dialect='sqlite3')[0],
+                         'UPDATE t SET name = ?, n = ? WHERE id = ? RETURNING id, DELETED.n')
+        self.assertEqual(update.compile(dialect='sqlserver')[0],
+                         'UPDATE t SET name = ?, n = ? OUTPUT INSERTED.id, DELETED.n WHERE id = ?')
+        delete = Delete(Table('t'), condition=Where('n', '>', Value(1)), returning='*')
+        self.assertEqual(delete.compile(dialect='sqlserver'),
+                         ('DELETE FROM t OUTPUT DELETED.* WHERE n > ?', (1,)))
+        self.assertRaises(InvalidSqlCommandException, delete.compile, dialect='mysql')
+        # Statements without returning columns render as before
+        self.assertEqual(str(Delete(Table('t'))), 'DELETE FROM t ')
+
+    def testOutput(self):
+        first = Insert(Table('t'), Fields('name', 'n'), [Value('a'), Value(1)], returning=['id'])
+        second = Insert(Table('t'), Fields('name', 'n'), [Value('b'), Value(2)], returning=['id'])
+        update = Update(Table('t'), Fields('name', 'n'), [Value('c'), Value(3)],
+                        condition=Where('id', '=', Value(2)), returning=['id', 'name'])
+        delete = Delete(Table('t'), condition=Where('n', '<', Value(3)), returning=['name'])
+        output = self.driver.Transaction(first, second, update, delete).run()
+        self.assertEqual(output[str(first)], [(1,)])
+        self.assertEqual(output[str(second)], [(2,)])
+        self.assertEqual(output[str(update)], [(2, 'c')])
+        self.assertEqual(output[str(delete)], [('a',)])
+
+    def testBulk(self):
+        self.driver.sqladapter.max_rows = 3
+        try:
+            bulk = BulkInsert(Table('t'), Fields('name', 'n'),
+                              [('r{}'.format(i), i) for i in range(7)], returning=['id', 'n'])
+            output = self.driver.Transaction(bulk).run()
+        finally:
+            del self.driver.sqladapter.max_rows
+        self.assertEqual(sorted(output[str(bulk)]), [(i + 1, i) for i in range(7)])
+        upsert = Upsert(Table('t'), Fields('id', 'name'), [(1, 'x'), (9, 'y')], keys=['id'],
+                        returning=['id', 'name'])
+        output = self.driver.Transaction(upsert).run()
+        self.assertEqual(sorted(output[str(upsert)]), [(1, 'x'), (9, 'y')])
+
+    def testPrepared(self):
+        insert = Insert(Table('t'), Fields('name'), [Param('name')],
+                        returning=['id']).prepare(self.driver)
+        self.assertEqual(insert(name='a'), [(1,)])
+        self.assertEqual(insert(name='b'), [(2,)])
+        rename = Update(Table('t'), Fields('name'), [Param('name')],
+                        condition=Where('id', '=', Param('id'))).prepare(self.driver)
+        self.assertEqual(rename(name='c', id=1), 1)
+
+if __name__ == "__main__":
+    #import sys;sys.argv = ['', 'Test.testName']
+    unittest.main()
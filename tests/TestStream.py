@@ -0,0 +1,89 @@
+'''
+Created on Oct 18, 2026
+
+'''
+import unittest
+import squallsql
+from squall import *
+from squallstream import ResultStream
+
+class Cursor(object):
+    '''
+    Stand-in cursor that records fetchmany() sizes
+    '''
+    def __init__(self, rows):
+        self.rows = rows
+        self.sizes = []
+        self.closed = False
+
+    def fetchmany(self, size):
+        self.sizes.append(size)
+        batch, self.rows = self.rows[:size], self.rows[size:]
+        return batch
+
+    def close(self):
+        self.closed = True
+
+class Test(unittest.TestCase):
+
+    driver = squallsql.SqlAdapter(driver='squallsqlite3')
+
+    def setUp(self):
+        self.driver.Connect(database='rfid.db')
+        trans = self.driver.Transaction()
+        trans.add(Verbatim('CREATE TABLE t(x INTEGER, y, z, PRIMARY KEY(x ASC));'))
+        trans.add(BulkInsert(Table('t'), Fields('x', 'y', 'z'),
+                             ((i, i, i) for i in range(1000))))
+        trans.run()
+
+    def tearDown(self):
+        trans = self.driver.Transaction()
+        trans.add(Verbatim('DROP TABLE IF EXISTS t;'))
+        trans.run()
+
+    def testAdaptiveBatches(self):
+        cursor = Cursor([(i,) for i in range(500)])
+        rows = list(ResultStream(cursor))
+        self.assertEqual(len(rows), 500)
+        self.assertEqual(cursor.sizes, [64, 128, 256, 512, 1024])
+        self.assertTrue(cursor.closed, 'Cursor not closed when exhausted')
+
+    def testFixedBatches(self):
+        cursor = Cursor([(i,) for i in range(10)])
+        with ResultStream(cursor, batchsize=4) as stream:
+            self.assertEqual(next(stream), (0,))
+        self.assertEqual(cursor.sizes, [4])
+        self.assertTrue(cursor.closed, 'Cursor not closed when leaving the context')
+        self.assertEqual(list(stream), [])
+
+    def testStreamTransaction(self):
+        query = Select(Table('t'), Fields('x'), Where('x', '>=', Value(100)))
+        trans = self.driver.Transaction(query)
+        output = trans.run(stream=True, batchsize=100)
+        stream = output[str(query)]
+        self.assertIsInstance(stream, ResultStream)
+        self.assertEqual(sum(1 for row in stream), 900)
+        self.assertTrue(stream.closed)
+
+    def testStream(self):
+        stream = self.driver.Stream(Select(Table('t'), Fields('x', 'y')))
+        self.assertEqual(next(stream), (0, 0))
+        stream.close()
+
+    def testStreamPooled(self):
+        driver = squallsql.SqlAdapter(driver='squallsqlite3')
+        driver.Connect(database='rfid.db', pool_max=2)
+        try:
+            stream = driver.Stream(Select(Table('t'), Fields('x', 'y')))
+            self.assertEqual(next(stream), (0, 0))
+            self.assertEqual(driver.PoolStats()['in_use'], 1,
+                             'Stream gave its connection back while open')
+            self.assertEqual(sum(1 for row in stream), 999)
+            self.assertEqual(driver.PoolStats()['in_use'], 0,
+                             'Stream kept its connection after it was exhausted')
+        finally:
+            driver.Disconnect()
+
+if __name__ == "__main__":
+    #import sys;sys.argv = ['', 'Test.testName']
+    unittest.main()
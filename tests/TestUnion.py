@@ -0,0 +1,77 @@
+'''
+Created on Oct 18, 2026
+
+'''
+import unittest
+import squallsql
+from squall import *
+from squallcache import tables
+from squallerrors import InvalidSqlValueException, InvalidSqlConditionException
+
+class Test(unittest.TestCase):
+
+    def setUp(self):
+        self.driver = squallsql.SqlAdapter(driver='squallsqlite3', result_cache=True)
+        self.driver.Connect(database=':memory:')
+        self.driver.Transaction(Verbatim('CREATE TABLE a(x INTEGER);'),
+                                Verbatim('CREATE TABLE b(x INTEGER);')).run()
+        self.driver.Transaction(BulkInsert(Table('a'), Fields('x'), [(i,) for i in range(0, 6)]),
+                                BulkInsert(Table('b'), Fields('x'), [(i,) for i in range(4, 10)])).run()
+        self.a = Select(Table('a'), Fields('x'))
+        self.b = Select(Table('b'), Fields('x'), Where('x', '<', Value(8)))
+
+    def tearDown(self):
+        self.driver.Disconnect()
+
+    def select(self, query):
+        return [r[0] for r in self.driver.Transaction(query).run()[str(query)]]
+
+    def testRender(self):
+        union = Union(self.a, self.b, order=Order(fields=Fields('x'), sort='DESC'))
+        self.assertEqual(str(union), 'SELECT x FROM a UNION SELECT x FROM b WHERE x < 8 ORDER BY x DESC')
+        limited = Union(self.a, self.b, all=True, limit=Limit(5, offset=2))
+        self.assertEqual(limited.compile(dialect='sqlserver'),
+                         ('SELECT * FROM (SELECT x FROM a UNION ALL SELECT x FROM b WHERE x < ?) '
+                          'AS compound ORDER BY (SELECT NULL) OFFSET ? ROWS FETCH NEXT ? ROWS ONLY',
+                          (8, 2, 5)))
+        nested = Except(Intersect(self.a, self.b), Select(Table('b'), Fields('x'), limit=1))
+        self.assertEqual(nested.compile(dialect='sqlite3')[0],
+                         'SELECT * FROM (SELECT x FROM a INTERSECT SELECT x FROM b WHERE x < ?) AS s1 '
+                         'EXCEPT SELECT * FROM (SELECT x FROM b LIMIT ?) AS s2')
+        self.assertRaises(InvalidSqlValueException, Union, self.a)
+        self.assertRaises(InvalidSqlValueException, Union, self.a, 'SELECT 1')
+
+    def testOrderedMember(self):
+        order = Order(fields=Fields('x'))
+        self.assertRaises(InvalidSqlConditionException, Union,
+                          Select(Table('a'), Fields('x'), order), self.b)
+        self.assertRaises(InvalidSqlConditionException, Except,
+                          Union(self.a, self.b, order=order), self.a)
+        top = Union(Select(Table('a'), Fields('x'), order, limit=2), self.b)
+        self.assertEqual(top.compile(dialect='sqlserver')[0],
+                         'SELECT * FROM (SELECT TOP (?) x FROM a ORDER BY x) AS s1 '
+                         'UNION SELECT x FROM b WHERE x < ?')
+
+    def testRun(self):
+        order = Order(fields=Fields('x'))
+        self.assertEqual(self.select(Union(self.a, self.b, order=order)), list(range(8)))
+        self.assertEqual(sorted(self.select(Union(self.a, self.b, all=True))),
+                         sorted(list(range(6)) + [4, 5, 6, 7]))
+        self.assertEqual(self.select(Intersect(self.a, self.b, order=order)), [4, 5])
+        self.assertEqual(self.select(Except(self.a, self.b, order=order)), [0, 1, 2, 3])
+        self.assertEqual(self.select(Union(self.a, self.b, order=order, limit=Limit(3, offset=2))),
+                         [2, 3, 4])
+        nested = Except(Union(self.a, self.b), Select(Table('a'), Fields('x'), order, limit=2),
+                        order=order)
+        self.assertEqual(self.select(nested), list(range(2, 8)))
+
+    def testCache(self):
+        union = Union(self.a, self.b)
+        self.assertEqual(tables(union), frozenset(['a', 'b']))
+        first = self.select(union)
+        self.driver.Transaction(Insert(Table('b'), Fields('x'), [Value(-1)])).run()
+        self.assertEqual(sorted(self.select(union)), sorted(first + [-1]))
+
+if __name__ == "__main__":
+    #import sys;sys.argv = ['', 'Test.testName']
+    unittest.main()
@@ -0,0 +1,69 @@
+'''
+Created on Oct 18, 2026
+
+'''
+import unittest
+import squallsql
+from squall import *
+from squallerrors import InvalidSqlValueException
+
+class Test(unittest.TestCase):
+
+    def setUp(self):
+        self.driver = squallsql.SqlAdapter(driver='squallsqlite3')
+        self.driver.Connect(database=':memory:')
+        self.driver.Transaction(Verbatim('CREATE TABLE t(id INTEGER PRIMARY KEY, name, n);')).run()
+        self.driver.Transaction(BulkInsert(Table('t'), Fields('id', 'name', 'n'),
+                                           [(i, 'old', 0) for i in range(5)])).run()
+
+    def tearDown(self):
+        self.driver.Disconnect()
+
+    def rows(self):
+        query = Select(Table('t'), Fields('id', 'name', 'n'), Order(fields=Fields('id')))
+        return self.driver.Transaction(query).run()[str(query)]
+
+    def testDialects(self):
+        upsert = Upsert(Table('t'), Fields('id', 'name'), [(1, 'a')], keys=['id'])
+        self.assertEqual(str(upsert), 'INSERT INTO t (id, name) VALUES (?, ?), ... '
+                                      'ON CONFLICT (id) DO UPDATE SET name = excluded.name')
+        self.assertEqual(upsert.compile(dialect='mysql'),
+                         ('INSERT INTO t (id, name) VALUES (?, ?) '
+                          'ON DUPLICATE KEY UPDATE name = VALUES(name)', (1, 'a')))
+        self.assertEqual(upsert.compile(dialect='sqlserver')[0],
+                         'MERGE INTO t WITH (HOLDLOCK) AS target USING (VALUES (?, ?)) '
+                         'AS source (id, name) ON target.id = source.id '
+                         'WHEN MATCHED THEN UPDATE SET name = source.name '
+                         'WHEN NOT MATCHED THEN INSERT (id, name) VALUES (source.id, source.name);')
+        ignore = Upsert(Table('t'), Fields('id', 'name'), [(1, 'a')], keys=Fields('id'), update=[])
+        self.assertTrue(ignore.compile(dialect='sqlite3')[0].endswith('ON CONFLICT (id) DO NOTHING'))
+        self.assertNotIn('WHEN MATCHED', ignore.compile(dialect='sqlserver')[0])
+
+    def testInvalid(self):
+        self.assertRaises(InvalidSqlValueException, Upsert, Table('t'), Fields(), [], keys=['id'])
+        self.assertRaises(InvalidSqlValueException, Upsert, Table('t'), Fields('id'), [], keys=['x'])
+        self.assertRaises(InvalidSqlValueException, Upsert, Table('t'), Fields('id'), [], keys=[])
+
+    def testRun(self):
+        rows = ((i, 'new', i) for i in range(3, 8))
+        self.driver.Transaction(Upsert(Table('t'), Fields('id', 'name', 'n'), rows,
+                                       keys=['id'], update=['name'])).run()
+        self.assertEqual(self.rows(), [(i, 'old', 0) for i in range(3)] +
+                         [(i, 'new', 0) for i in range(3, 5)] +
+                         [(i, 'new', i) for i in range(5, 8)])
+
+    def testChunks(self):
+        self.driver.sqladapter.max_rows = 2
+        events = []
+        self.driver.Subscribe(events.append)
+        try:
+            self.driver.Transaction(Upsert(Table('t'), Fields('id', 'name', 'n'),
+                                           [(i, 'x', 1) for i in range(10)], keys=['id'])).run()
+        finally:
+            del self.driver.sqladapter.max_rows
+        self.assertEqual(events[0]['executions'], 5)
+        self.assertEqual(self.rows(), [(i, 'x', 1) for i in range(10)])
+
+if __name__ == "__main__":
+    #import sys;sys.argv = ['', 'Test.testName']
+    unittest.main()
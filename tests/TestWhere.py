@@ -6,6 +6,7 @@ Created on 2013-08-19
 import unittest
 
 from squall import *
+from squallerrors import InvalidSqlConditionException
 class Test(unittest.TestCase):
 
     where = None
@@ -37,6 +38,40 @@ class Test(unittest.TestCase):
                   conditions=self.where)
         assert w == "WHERE abc = 'foo' AND x = 'hello world'", 'Where Clause with two wheres failed'
 
+    def testValueContainingWhere(self):
+        w = Where('x', '=', Value('a WHERE b'), conditions=[Where('y', '=', Value('WHERE'))])
+        self.assertEqual(str(w), "WHERE x = 'a WHERE b' AND y = 'WHERE'")
+        
+    def testNestedOperands(self):
+        w = Where('x', '=', Value(1), conditions=[
+            Where('y', '=', Value(2), operand='OR', conditions=[Where('z', '=', Value(3))])])
+        self.assertEqual(str(w), 'WHERE x = 1 AND (y = 2 OR z = 3)')
+        
+    def testPredicates(self):
+        a, b, c = Condition('a', '=', Value(1)), Condition('b', '=', Value(2)), Condition('c', '=', Value(3))
+        self.assertEqual(str(And(a, Or(b, c))), 'a = 1 AND (b = 2 OR c = 3)')
+        self.assertEqual(str(Or(a, And(b, c))), 'a = 1 OR b = 2 AND c = 3')
+        self.assertEqual(str(Not(And(a, b))), 'NOT (a = 1 AND b = 2)')
+        self.assertEqual(str(Where(Not(a))), 'WHERE NOT a = 1')
+        self.assertEqual(str(Having(Or(a, b))), 'HAVING a = 1 OR b = 2')
+        self.assertRaises(InvalidSqlConditionException, And)
+        
+    def testFlatten(self):
+        a, b, c = Condition('a', '=', Value(1)), Condition('b', '=', Value(2)), Condition('c', '=', Value(3))
+        self.assertEqual(str(And(And(a, And(b)), Where('c', '=', Value(3)))),
+                         'a = 1 AND b = 2 AND c = 3')
+        self.assertEqual(str(Or(Or(a, b), And(c))), 'a = 1 OR b = 2 OR c = 3')
+        
+    def testDeepChain(self):
+        where = Where('x', '=', Value(0))
+        for i in range(1, 5000):
+            where = Where('x', '=', Value(i), conditions=[where])
+        sql = str(where)
+        self.assertEqual(sql.count(' AND '), 4999)
+        sql, params = where.compile()
+        self.assertEqual(len(params), 5000)
+        self.assertEqual(params[0], 4999)
+        
     def testOrder(self):
         # Proper test:
         o = Order(fields=Fields('x'))